@@ -3,24 +3,59 @@ from flask import Flask
 
 from .config import settings
 from .extensions import (
-    db, migrate, ma, jwt, restx_api, celery
+    db, migrate, ma, jwt, restx_api, celery, cache, denylist
 )
 
+from .database import configure as configure_database, pool_metrics
+from .metrics import metrics
+from .monitoring.ingest import ingestor
+from .monitoring.latest import latest_state
+from .monitoring.pubsub import broker
+from .passwords import hasher
+from .memory.store import memory_index
+from .chat.context import context_builder
+from .chat.stream import streamer
+
 # 只导入 register_namespaces，而不是整个 app.api 模块
 from .api import register_namespaces
 
 
+def _bind_celery(app: Flask):
+    """让所有 Celery 任务在应用上下文中执行, 以便使用 db 等扩展"""
+    class ContextTask(celery.Task):
+        def __call__(self, *args, **kwargs):
+            with app.app_context():
+                return self.run(*args, **kwargs)
+
+    celery.Task = ContextTask
+
+
 def create_app() -> Flask:
     app = Flask(__name__)
     app.config.from_object(settings)
 
     # 初始化扩展
+    configure_database(app)
     db.init_app(app)
+    pool_metrics.init_app(app, db)
     migrate.init_app(app, db)
     ma.init_app(app)
     jwt.init_app(app)
+    denylist.init_app(app)
+    jwt.token_in_blocklist_loader(denylist.check)
     restx_api.init_app(app)          # ⬅️ 这里用 restx_api
-    celery.conf.update(app.config)
+    # Celery 的旧式配置名是 BROKER_URL, CELERY_BROKER_URL 需要显式映射
+    celery.conf.update(app.config, BROKER_URL=app.config["CELERY_BROKER_URL"])
+    _bind_celery(app)
+    cache.init_app(app)
+    ingestor.init_app(app)
+    latest_state.init_app(app)
+    broker.init_app(app)
+    hasher.init_app(app)
+    memory_index.init_app(app)
+    context_builder.init_app(app)
+    streamer.init_app(app)
+    metrics.init_app(app, db, celery)
 
     # 注册各个 namespace
     register_namespaces(restx_api)
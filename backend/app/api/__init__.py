@@ -3,4 +3,16 @@ from flask_restx import Namespace
 def register_namespaces(api):
     # 防止循环导入，延迟导入蓝图
     from .auth import ns as auth_ns
+    from .characters import ns as characters_ns
+    from .chat import ns as chat_ns
+    from .emotion import ns as emotion_ns
+    from .memories import ns as memories_ns
+    from .monitoring import ns as monitoring_ns
+    from .reports import ns as reports_ns
     api.add_namespace(auth_ns, path="/api/v1/auth")
+    api.add_namespace(characters_ns, path="/api/v1/characters")
+    api.add_namespace(chat_ns, path="/api/v1/chat")
+    api.add_namespace(emotion_ns, path="/api/v1/emotion")
+    api.add_namespace(memories_ns, path="/api/v1/memories")
+    api.add_namespace(monitoring_ns, path="/api/v1/monitoring")
+    api.add_namespace(reports_ns, path="/api/v1/reports")
@@ -1,12 +1,20 @@
+from flask import current_app
 from flask_restx import Namespace, Resource, fields
-from werkzeug.security import check_password_hash, generate_password_hash
 from flask_jwt_extended import (
-    create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+    create_access_token, create_refresh_token, jwt_required, get_jwt, get_jwt_identity
 )
-from app.extensions import db
+from app.cache import TTLCache
+from app.database import read_replica
+from app.extensions import db, denylist
 from app.models.user import User
+from app.passwords import HasherBusy, hasher
 from loguru import logger
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException, TooManyRequests
 ns = Namespace("auth", description="认证相关")
 
 # 请求参数模型
@@ -40,21 +48,22 @@ class Register(Resource):
     @ns.marshal_with(token_model)
     def post(self):
         data = ns.payload
-        if User.query.filter_by(username=data["username"]).first():
-            ns.abort(400, "Username already exists")
-        if User.query.filter_by(email=data["email"]).first():
-            ns.abort(400, "Email already exists")
-        
-        user = User(
+        user_id = str(uuid4())
+        values = dict(
+            id=user_id,
             username=data["username"],
-            password_hash=generate_password_hash(data["password"]),
+            password_hash=_hash_password(data["password"]),
             email=data["email"],
             user_type=data["userType"],
-            profile=data["profile"]
+            profile=data["profile"],
+            created_at=datetime.now(timezone.utc),
         )
-        db.session.add(user)
+        # 唯一性由数据库保证: 一条 INSERT, 冲突时不插入, 并发注册同名用户也不会出错
+        if not _insert_user(values):
+            db.session.rollback()
+            ns.abort(400, _conflict_message(data["username"], data["email"]))
         db.session.commit()
-        return _issue_tokens(user)
+        return _issue_tokens(user_id)
 
 @ns.route("/login")
 class Login(Resource):
@@ -63,11 +72,18 @@ class Login(Resource):
     def post(self):
         data = ns.payload
         user = User.query.filter_by(username=data["username"]).first()
-        if not user or not check_password_hash(user.password_hash, data["password"]):
+        if not user:
             ns.abort(401, "Invalid credentials")
+        valid, new_hash = _verify_password(user.password_hash, data["password"])
+        if not valid:
+            ns.abort(401, "Invalid credentials")
+        if new_hash:
+            # 哈希参数已调整, 借这次登录换成新哈希
+            user.password_hash = new_hash
         tokens = _issue_tokens(user)
         user.last_login = datetime.now(timezone.utc)
         db.session.commit()
+        profile_cache().delete(user.id)
         logger.debug(f"User {user.username} logged in successfully")
         return tokens
 
@@ -84,9 +100,17 @@ class RefreshToken(Resource):
                 ns.abort(400, "Invalid refresh token: No user identity found.")
             
             logger.debug(f"Valid refresh token for user: {current_user}")  # 打印有效的 refresh_token
-            user = User.query.get(current_user)
-            tokens = _issue_tokens(user)  # 生成新的 access_token 和 refresh_token
+            if _load_profile(current_user) is None:
+                ns.abort(400, "Invalid refresh token: user no longer exists.")
+            # 轮换: 用过的 refresh token 和与它同一对的 access token 立即吊销
+            claims = get_jwt()
+            denylist.revoke(claims["jti"], claims["exp"])
+            if claims.get("ajti"):
+                denylist.revoke(claims["ajti"], claims["aexp"])
+            tokens = _issue_tokens(current_user)  # 生成新的 access_token 和 refresh_token
             return tokens
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error refreshing token: {str(e)}")
             ns.abort(400, f"Error refreshing token: {str(e)}")  # 返回错误信息
@@ -95,28 +119,121 @@ class RefreshToken(Resource):
 class Logout(Resource):
     @jwt_required()
     def post(self):
+        """吊销当前 access token 以及与它一起签发的 refresh token"""
+        claims = get_jwt()
+        denylist.revoke(claims["jti"], claims["exp"])
+        if claims.get("rjti"):
+            denylist.revoke(claims["rjti"], claims["rexp"])
         return {"success": True, "message": "登出成功"}
 
 @ns.route("/me")
 class Me(Resource):
     @jwt_required()
+    @read_replica
     def get(self):
         uid = get_jwt_identity()
-        user = User.query.get_or_404(uid)
+        profile = _load_profile(uid)
+        if profile is None:
+            ns.abort(404)
         logger.debug(f"Current JWT Token: {uid}") 
-        return {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "userType": user.user_type,
-            "profile": user.profile,
-            "createdAt": user.created_at.isoformat() if user.created_at else None,
-            "last_login": user.last_login.isoformat() if user.last_login else None
-        }
-    
-def _issue_tokens(user: User):
-    access = create_access_token(identity=user.id)
-    refresh = create_refresh_token(identity=user.id)
+        return profile
+
+
+def _insert_user(values) -> bool:
+    """插入用户, 用户名或邮箱冲突时返回 False"""
+    dialect = db.engine.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        module = postgresql if dialect == "postgresql" else sqlite
+        stmt = module.insert(User).values(**values).on_conflict_do_nothing().returning(User.id)
+        return db.session.execute(stmt).first() is not None
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(User).values(**values))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _conflict_message(username: str, email: str) -> str:
+    """只在冲突时查询一次, 判断是用户名还是邮箱已存在"""
+    taken = db.session.execute(
+        select(User.username).where(or_(User.username == username, func.lower(User.email) == email.lower()))
+    ).scalars().all()
+    return "Username already exists" if username in taken else "Email already exists"
+
+
+def _hash_password(password: str) -> str:
+    try:
+        return hasher.hash(password)
+    except HasherBusy as e:
+        raise TooManyRequests(str(e), retry_after=1)
+
+
+def _verify_password(pwhash: str, password: str):
+    try:
+        return hasher.verify(pwhash, password)
+    except HasherBusy as e:
+        raise TooManyRequests(str(e), retry_after=1)
+
+
+_profiles = None
+
+
+def profile_cache() -> TTLCache:
+    """进程内的用户资料缓存, 条目 PROFILE_CACHE_TTL 秒后过期"""
+    global _profiles
+    if _profiles is None:
+        _profiles = TTLCache(
+            maxsize=current_app.config.get("PROFILE_CACHE_MAX_ENTRIES", 4096),
+            ttl=current_app.config.get("PROFILE_CACHE_TTL", 30),
+        )
+    return _profiles
+
+
+def _load_profile(uid: str):
+    """/me 返回的用户资料, 先查缓存; 用户不存在时返回 None"""
+    profile = profile_cache().get(uid)
+    if profile is not None:
+        return profile
+    user = db.session.get(User, uid)
+    if user is None:
+        return None
+    profile = {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "userType": user.user_type,
+        "profile": user.profile,
+        "createdAt": user.created_at.isoformat() if user.created_at else None,
+        "last_login": user.last_login.isoformat() if user.last_login else None
+    }
+    profile_cache().set(uid, profile)
+    return profile
+
+
+def _expiry(setting: str) -> int:
+    expires = current_app.config[setting]
+    if isinstance(expires, int):
+        expires = timedelta(seconds=expires)
+    return int((datetime.now(timezone.utc) + expires).timestamp())
+
+
+def _issue_tokens(user):
+    """签发一对 token, 两者互相记下对方的 jti 和 exp
+
+    登出时用 access token 吊销整对; 刷新时用 refresh token 吊销整对(轮换),
+    旧的 refresh token 不能再用, 刷新之前签发的 access token 也随之失效。
+    """
+    user_id = user.id if isinstance(user, User) else user
+    access_jti, refresh_jti = str(uuid4()), str(uuid4())
+    access_exp = _expiry("JWT_ACCESS_TOKEN_EXPIRES")
+    refresh_exp = _expiry("JWT_REFRESH_TOKEN_EXPIRES")
+    refresh = create_refresh_token(identity=user_id, additional_claims={
+        "jti": refresh_jti, "exp": refresh_exp, "ajti": access_jti, "aexp": access_exp,
+    })
+    access = create_access_token(identity=user_id, additional_claims={
+        "jti": access_jti, "exp": access_exp, "rjti": refresh_jti, "rexp": refresh_exp,
+    })
     return {
         "access_token": access,
         "refresh_token": refresh
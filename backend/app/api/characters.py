@@ -1,7 +1,14 @@
-from flask_restx import Namespace, Resource, fields
-from flask import request
-from app.extensions import db
+import json
+
+from flask_restx import Namespace, Resource, fields, marshal
+from flask import Response, request, stream_with_context
+from sqlalchemy import insert, or_, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import load_only
+from app.database import read_replica
+from app.extensions import db, cache
 from app.models.character import Character
+from app.api.pagination import decode_cursor, encode_cursor
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from loguru import logger
 
@@ -12,29 +19,81 @@ character_model = ns.model("Character", {
     "id": fields.String,
     "name": fields.String,
     "avatar": fields.String,
-    "mbtiType": fields.String,
-    "zodiacSign": fields.String,
+    "mbtiType": fields.String(attribute="mbti_type"),
+    "zodiacSign": fields.String(attribute="zodiac_sign"),
     "personality": fields.String,
-    "speakingStyle": fields.String,
-    "emotionalTriggers": fields.List(fields.String),
+    "speakingStyle": fields.String(attribute="speaking_style"),
+    "emotionalTriggers": fields.List(fields.String, attribute="emotional_triggers"),
     "talkativeness": fields.Integer,
-    "emotions": fields.Nested({
+    "emotions": fields.Nested(ns.model("CharacterEmotions", {
         "happy": fields.List(fields.String),
         "sad": fields.List(fields.String),
         "angry": fields.List(fields.String),
         "fearful": fields.List(fields.String),
         "jealous": fields.List(fields.String),
         "nervous": fields.List(fields.String)
-    }),
-    "openingLine": fields.String,
-    "skillIds": fields.List(fields.String),
-    "defaultScene": fields.String,
-    "defaultScript": fields.String,
-    "isPublic": fields.Boolean,
-    "createdAt": fields.String,
-    "updatedAt": fields.String
+    })),
+    "openingLine": fields.String(attribute="opening_line"),
+    "skillIds": fields.List(fields.String, attribute="skill_ids"),
+    "defaultScene": fields.String(attribute="default_scene"),
+    "defaultScript": fields.String(attribute="default_script"),
+    "isPublic": fields.Boolean(attribute="is_public"),
+    "createdAt": fields.String(attribute="created_at"),
+    "updatedAt": fields.String(attribute="updated_at")
+})
+
+# 接口字段名 -> 数据库列, 用于 fields= 稀疏字段集
+FIELD_COLUMNS = {
+    name: getattr(Character, getattr(field, "attribute", None) or name)
+    for name, field in character_model.items()
+}
+# 列表默认不返回大文本的场景和剧本, 需要时通过 fields= 显式指定
+LIST_FIELDS = [name for name in character_model if name not in ("defaultScene", "defaultScript")]
+MAX_PAGE_SIZE = 100
+
+# 批量导入: 每个事务插入的行数, 以及错误报告最多保留的条数
+BULK_CHUNK_SIZE = 500
+BULK_MAX_ERRORS = 1000
+EXPORT_YIELD_PER = 500
+
+# 批量导入时每个字段允许的 JSON 类型
+IMPORT_FIELD_TYPES = {
+    "name": str, "avatar": str, "mbtiType": str, "zodiacSign": str,
+    "personality": str, "speakingStyle": str, "emotionalTriggers": list,
+    "talkativeness": int, "emotions": dict, "openingLine": str, "skillIds": list,
+    "defaultScene": str, "defaultScript": str, "isPublic": bool,
+}
+
+bulk_result_model = ns.model("BulkImportResult", {
+    "inserted": fields.Integer,
+    "failed": fields.Integer,
+    "errors": fields.List(fields.Raw, description="[{line, error}]"),
 })
 
+list_parser = ns.parser()
+list_parser.add_argument("cursor", type=str, location="args", help="上一页返回的 X-Next-Cursor")
+list_parser.add_argument("limit", type=int, default=10, location="args", help="每页数量, 最大 100")
+list_parser.add_argument("fields", type=str, location="args", help="逗号分隔的返回字段, 如 id,name,avatar")
+list_parser.add_argument("is_public", type=str, location="args", help="true/false")
+list_parser.add_argument("mbti_type", type=str, location="args")
+list_parser.add_argument("zodiac_sign", type=str, location="args")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        ns.abort(400, "Invalid cursor")
+
+
+def _parse_bool(value: str) -> bool:
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    ns.abort(400, f"Invalid boolean value: {value}")
+
+
 # 创建角色
 @ns.route("/")
 class CreateCharacter(Resource):
@@ -65,6 +124,7 @@ class CreateCharacter(Resource):
             )
             db.session.add(character)
             db.session.commit()
+            cache.invalidate("characters")
 
             logger.info(f"Character {data['name']} created by user {user_id}")
             return character, 201  # 返回创建的角色信息并设置 HTTP 状态码为 201
@@ -76,23 +136,62 @@ class CreateCharacter(Resource):
 # 获取所有角色列表
 @ns.route("/")
 class CharacterList(Resource):
-    @ns.marshal_with(character_model)
+    @ns.expect(list_parser)
+    @ns.response(200, "Success", [character_model])
+    @read_replica
     def get(self):
-        """获取所有角色"""
-        page = request.args.get('page', 1, type=int)  # 页码
-        per_page = request.args.get('per_page', 10, type=int)  # 每页的角色数量
+        """获取角色列表（按创建时间的游标分页, 下一页游标在 X-Next-Cursor 响应头中）
+
+        响应会被缓存; 没有配置 Redis 时每个 worker 各自缓存, 其他 worker 上的修改
+        最多 CACHE_LOCAL_TTL 秒（默认 5 秒）后可见。
+        """
+        args = list_parser.parse_args()
+        limit = max(1, min(args["limit"] or 10, MAX_PAGE_SIZE))
+        names = [f.strip() for f in args["fields"].split(",") if f.strip()] if args["fields"] else LIST_FIELDS
+        unknown = [name for name in names if name not in FIELD_COLUMNS]
+        if unknown:
+            ns.abort(400, f"Unknown fields: {', '.join(unknown)}")
+        is_public = _parse_bool(args["is_public"]) if args["is_public"] else None
+        cursor = _decode_cursor(args["cursor"]) if args["cursor"] else None
+
+        def load():
+            # 只加载需要的列, 游标所需的 id/created_at 总是加载
+            columns = {FIELD_COLUMNS[name] for name in names} | {Character.id, Character.created_at}
+            query = Character.query.options(load_only(*columns))
+            if is_public is not None:
+                query = query.filter(Character.is_public.is_(is_public))
+            if args["mbti_type"]:
+                query = query.filter(Character.mbti_type == args["mbti_type"].upper())
+            if args["zodiac_sign"]:
+                query = query.filter(Character.zodiac_sign == args["zodiac_sign"])
+            if cursor:
+                query = query.filter(tuple_(Character.created_at, Character.id) > tuple_(*cursor))
+            rows = query.order_by(Character.created_at, Character.id).limit(limit + 1).all()
+
+            headers = {}
+            if len(rows) > limit:
+                rows = rows[:limit]
+                headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+            return marshal(rows, {name: character_model[name] for name in names}), headers
 
-        characters = Character.query.paginate(page, per_page, False).items
-        return characters
+        key = ":".join(str(v) for v in (
+            "list", args["cursor"], limit, ",".join(names), is_public, args["mbti_type"], args["zodiac_sign"]
+        ))
+        # 命中缓存时直接返回序列化好的 JSON, 支持 If-None-Match
+        return cache.respond("characters", key, load, with_headers=True)
 
 # 获取指定角色的详细信息
 @ns.route("/<string:id>")
 class CharacterDetail(Resource):
-    @ns.marshal_with(character_model)
+    @ns.response(200, "Success", character_model)
+    @read_replica
     def get(self, id):
-        """根据角色ID获取单个角色的详细信息"""
-        character = Character.query.get_or_404(id)
-        return character
+        """根据角色ID获取单个角色的详细信息
+
+        缓存规则与角色列表相同: 没有 Redis 时修改最多 CACHE_LOCAL_TTL 秒后可见。
+        """
+        return cache.respond("characters", f"id:{id}",
+                             lambda: marshal(Character.query.get_or_404(id), character_model))
 
 @ns.route("/<string:id>")
 class UpdateCharacter(Resource):
@@ -126,6 +225,7 @@ class UpdateCharacter(Resource):
             character.is_public = data["isPublic"]
 
             db.session.commit()
+            cache.invalidate("characters")
 
             logger.info(f"Character {character.name} updated by user {user_id}")
             return character
@@ -147,9 +247,104 @@ class DeleteCharacter(Resource):
 
             db.session.delete(character)
             db.session.commit()
+            cache.invalidate("characters")
 
             logger.info(f"Character {character.name} deleted by user {user_id}")
             return {"success": True, "message": "Character deleted successfully"}, 200
         except Exception as e:
             logger.error(f"Error deleting character: {str(e)}")
             ns.abort(500, f"Error deleting character: {str(e)}")
+
+
+def _import_row(data, user_id) -> dict:
+    """把一行导入数据校验并转换为列值, 不合法时抛出 ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("row must be a JSON object")
+    if not isinstance(data.get("name"), str) or not data["name"].strip():
+        raise ValueError("name is required")
+    row = {"created_by": user_id}
+    for name, value in data.items():
+        expected = IMPORT_FIELD_TYPES.get(name)
+        if expected is None or value is None:
+            continue  # id/createdAt 等只读字段和空值忽略
+        # bool 是 int 的子类, 需要单独排除
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise ValueError(f"{name} must be {expected.__name__}")
+        if expected is list and not all(isinstance(v, str) for v in value):
+            raise ValueError(f"{name} must be a list of strings")
+        row[FIELD_COLUMNS[name].key] = value
+    if len(row.get("mbti_type") or "") > 4:
+        raise ValueError("mbtiType must be at most 4 characters")
+    return row
+
+
+def _insert_chunk(rows, result):
+    """一个分块一个事务, 失败时整块回滚并记入错误报告"""
+    if not rows:
+        return
+    try:
+        db.session.execute(insert(Character), [row for _, row in rows])
+        db.session.commit()
+        result["inserted"] += len(rows)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"Bulk insert chunk failed: {str(e)}")
+        result["failed"] += len(rows)
+        for lineno, _ in rows:
+            if len(result["errors"]) < BULK_MAX_ERRORS:
+                result["errors"].append({"line": lineno, "error": "database error: chunk rolled back"})
+
+
+# 批量导入角色
+@ns.route("/bulk")
+class BulkImportCharacters(Resource):
+    @ns.doc(consumes=["application/x-ndjson"])
+    @ns.marshal_with(bulk_result_model)
+    @jwt_required()
+    def post(self):
+        """以 NDJSON 批量导入角色, 每行一个角色, 按块提交并返回逐行错误报告"""
+        user_id = get_jwt_identity()
+        result = {"inserted": 0, "failed": 0, "errors": []}
+        chunk = []
+        for lineno, line in enumerate(request.stream, 1):
+            if not line.strip():
+                continue
+            try:
+                chunk.append((lineno, _import_row(json.loads(line), user_id)))
+            except ValueError as e:  # json.JSONDecodeError 也是 ValueError
+                result["failed"] += 1
+                if len(result["errors"]) < BULK_MAX_ERRORS:
+                    result["errors"].append({"line": lineno, "error": str(e)})
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                _insert_chunk(chunk, result)
+                chunk = []
+        _insert_chunk(chunk, result)
+
+        if result["inserted"]:
+            cache.invalidate("characters")
+        logger.info(f"Bulk import by user {user_id}: {result['inserted']} inserted, {result['failed']} failed")
+        return result
+
+
+# 导出角色
+@ns.route("/export")
+class ExportCharacters(Resource):
+    @ns.produces(["application/x-ndjson"])
+    @jwt_required()
+    @read_replica
+    def get(self):
+        """以 NDJSON 流式导出公开角色和当前用户创建的角色"""
+        user_id = get_jwt_identity()
+        stmt = (
+            select(Character.__table__)
+            .where(or_(Character.is_public.is_(True), Character.created_by == user_id))
+            .order_by(Character.created_at, Character.id)
+            # 服务端游标, 每次只取 EXPORT_YIELD_PER 行
+            .execution_options(yield_per=EXPORT_YIELD_PER)
+        )
+
+        def generate():
+            for row in db.session.execute(stmt):
+                yield json.dumps(marshal(row._mapping, character_model), ensure_ascii=False) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
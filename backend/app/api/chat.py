@@ -0,0 +1,305 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+from flask import Response, current_app, stream_with_context
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from loguru import logger
+
+from app.chat.context import context_builder
+from app.chat.stream import streamer
+from app.extensions import db
+from app.memory.store import search_memories
+from app.models.chat_message import ChatMessage
+from app.api.pagination import decode_cursor, encode_cursor
+from app.api.permissions import resolve_user_id
+
+ns = Namespace("chat", description="聊天对话")
+
+MAX_PAGE_SIZE = 100
+
+message_model = ns.model("ChatMessage", {
+    "id": fields.String,
+    "userId": fields.String(attribute="user_id"),
+    "characterId": fields.String(attribute="character_id"),
+    "content": fields.String,
+    "sender": fields.String,
+    "messageType": fields.String(attribute="message_type"),
+    "metadata": fields.Raw(attribute="message_metadata"),
+    "parentMessageId": fields.String(attribute="parent_message_id"),
+    "createdAt": fields.DateTime(dt_format="iso8601", attribute="created_at"),
+})
+
+reply_model = ns.model("ChatReply", {
+    "content": fields.String(required=True),
+    "messageType": fields.String(enum=["text", "voice", "image"]),
+    "metadata": fields.Raw,
+})
+
+send_model = ns.model("SendChatMessage", {
+    "userId": fields.String,
+    "characterId": fields.String(required=True),
+    "content": fields.String(required=True),
+    "sender": fields.String(enum=["user", "assistant"]),
+    "messageType": fields.String(enum=["text", "voice", "image"]),
+    "metadata": fields.Raw,
+    # 可选: 同一次请求写入助手回复, 两条消息一次 INSERT
+    "reply": fields.Nested(reply_model, allow_null=True),
+})
+
+send_result_model = ns.model("SendChatMessageResult", {
+    "message": fields.Nested(message_model),
+    "aiResponse": fields.Nested(message_model, allow_null=True),
+})
+
+history_model = ns.model("ChatHistory", {
+    "messages": fields.List(fields.Nested(message_model)),
+    "pagination": fields.Nested(ns.model("CursorPagination", {
+        "limit": fields.Integer,
+        "nextCursor": fields.String,
+    })),
+})
+
+stream_model = ns.model("StreamChatMessage", {
+    "userId": fields.String,
+    "characterId": fields.String(required=True),
+    "content": fields.String(required=True),
+    "messageType": fields.String(enum=["text", "voice", "image"]),
+    "metadata": fields.Raw,
+    "voice": fields.Boolean(default=True, description="是否同时合成语音"),
+})
+
+context_model = ns.model("ChatContext", {
+    "messages": fields.List(fields.Raw, description='[{"role", "content"}], 第一条是角色设定'),
+    "tokens": fields.Integer(description="估算的提示词 token 数"),
+    "personaTokens": fields.Integer(attribute="persona_tokens"),
+    "historyTurns": fields.Integer(attribute="history_turns"),
+})
+
+context_stats_model = ns.model("ChatContextStats", {
+    "personaHits": fields.Integer,
+    "personaMisses": fields.Integer,
+    "windowHits": fields.Integer,
+    "windowMisses": fields.Integer,
+    "personas": fields.Integer,
+    "sessions": fields.Integer,
+    "evictedTurns": fields.Integer,
+})
+
+context_parser = ns.parser()
+context_parser.add_argument("userId", type=str, location="args")
+context_parser.add_argument("characterId", type=str, required=True, location="args")
+context_parser.add_argument("content", type=str, location="args", help="本轮用户消息, 不写入历史")
+
+history_parser = ns.parser()
+history_parser.add_argument("userId", type=str, location="args")
+history_parser.add_argument("characterId", type=str, location="args")
+history_parser.add_argument("startDate", type=str, location="args", help="ISO 8601 日期或时间")
+history_parser.add_argument("endDate", type=str, location="args", help="ISO 8601 日期或时间, 日期时包含当天")
+history_parser.add_argument("limit", type=int, default=20, location="args")
+history_parser.add_argument("cursor", type=str, location="args")
+
+
+def _parse_date(value: str, end: bool = False) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        ns.abort(400, f"Invalid date: {value}")
+    # 只有日期时, 结束日期包含当天
+    if end and len(value) <= 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+@ns.route("/messages")
+class ChatMessages(Resource):
+    @ns.expect(send_model, validate=True)
+    @ns.marshal_with(send_result_model, code=201)
+    @jwt_required()
+    def post(self):
+        """发送消息, 可同时写入助手回复"""
+        data = ns.payload
+        user_id = resolve_user_id(data.get("userId"))
+        message = {
+            "content": data["content"],
+            "sender": data.get("sender") or "user",
+            "message_type": data.get("messageType"),
+            "message_metadata": data.get("metadata"),
+        }
+        reply = None
+        if data.get("reply"):
+            reply = {
+                "content": data["reply"]["content"],
+                "sender": "assistant",
+                "message_type": data["reply"].get("messageType"),
+                "message_metadata": data["reply"].get("metadata"),
+            }
+        try:
+            rows = ChatMessage.insert_turn(user_id, data["characterId"], message, reply)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            ns.abort(400, "Unknown user or character")
+        context_builder.record(rows)
+        logger.debug(f"Chat message stored for user {user_id}, character {data['characterId']}")
+        return {"message": rows[0], "aiResponse": rows[1] if len(rows) > 1 else None}, 201
+
+    @ns.expect(history_parser)
+    @ns.marshal_with(history_model)
+    @jwt_required()
+    def get(self):
+        """获取聊天历史, 按时间倒序的游标分页"""
+        args = history_parser.parse_args()
+        user_id = resolve_user_id(args["userId"])
+        limit = max(1, min(args["limit"] or 20, MAX_PAGE_SIZE))
+
+        query = ChatMessage.query.filter(ChatMessage.user_id == user_id, ChatMessage.is_deleted.is_(False))
+        if args["characterId"]:
+            query = query.filter(ChatMessage.character_id == args["characterId"])
+        # created_at 上的范围条件同时让 PostgreSQL 只扫描相关月份的分区
+        if args["startDate"]:
+            query = query.filter(ChatMessage.created_at >= _parse_date(args["startDate"]))
+        if args["endDate"]:
+            query = query.filter(ChatMessage.created_at < _parse_date(args["endDate"], end=True))
+        if args["cursor"]:
+            try:
+                cursor = decode_cursor(args["cursor"])
+            except ValueError:
+                ns.abort(400, "Invalid cursor")
+            query = query.filter(tuple_(ChatMessage.created_at, ChatMessage.id) < tuple_(*cursor))
+
+        rows = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        return {"messages": rows, "pagination": {"limit": limit, "nextCursor": next_cursor}}
+
+
+def _sse(kind: str, data) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@ns.route("/messages/stream")
+class ChatMessageStream(Resource):
+    @ns.expect(stream_model, validate=True)
+    @ns.produces(["text/event-stream"])
+    @ns.response(503, "Chat model is not configured")
+    @jwt_required()
+    def post(self):
+        """发送消息并以 Server-Sent Events 流式返回助手回复
+
+        回复文本逐段以 token 事件推送; 每凑齐一句推送 sentence 事件并立即送去
+        语音合成, 音频以 audio 事件(16kHz 16 位单声道 PCM, base64)按句子顺序
+        推送。结束时两条消息一起写入, done 事件带消息 id 和首 token / 首段音频
+        的耗时。
+        """
+        if streamer.model is None:
+            ns.abort(503, "Chat model is not configured")
+        started = time.perf_counter()
+        data = ns.payload
+        user_id = resolve_user_id(data.get("userId"))
+        character_id = data["characterId"]
+        recall = current_app.config.get("CHAT_MEMORY_RECALL", 3)
+        memories = [m.content for m, _ in search_memories(user_id, data["content"], recall)] if recall else []
+        context = context_builder.build(user_id, character_id, data["content"], memories)
+        if context is None:
+            ns.abort(404, "Character not found")
+        reply = streamer.start(context.messages, voice=data.get("voice", True))
+        reply.started = started
+        heartbeat = current_app.config.get("MONITOR_STREAM_HEARTBEAT", 15)
+        # 回忆检索和上下文组装已经用完请求的会话, 推流可能持续几十秒,
+        # 先结束事务把连接还给连接池; 写入时再用一个新的会话, 用完即还
+        db.session.remove()
+
+        def store():
+            message = {
+                "content": data["content"],
+                "sender": "user",
+                "message_type": data.get("messageType"),
+                "message_metadata": data.get("metadata"),
+            }
+            answer = {"content": reply.text, "sender": "assistant", "message_type": "text"} if reply.text else None
+            try:
+                rows = ChatMessage.insert_turn(user_id, character_id, message, answer)
+                db.session.commit()
+                context_builder.record(rows)
+                return [row.id for row in rows]
+            except IntegrityError:
+                db.session.rollback()
+                return None
+            finally:
+                db.session.remove()
+
+        def generate():
+            ids = None
+            try:
+                yield _sse("start", {"sampleRate": streamer.sample_rate, "format": "pcm_s16le",
+                                     "voice": reply.voice_factory is not None})
+                for event in reply.events(heartbeat):
+                    if event is None:
+                        yield ": ping\n\n"
+                    elif event[0] == "reply":
+                        # 文本生成完就写入, 不等语音播完, 下一轮对话能立即看到这条回复
+                        ids = store()
+                        if ids is None:
+                            yield _sse("error", {"stage": "store", "message": "Unknown user or character"})
+                    elif event[0] != "voice_done":
+                        yield _sse(*event)
+                timings = reply.timings()
+                logger.debug(f"Streamed reply for user {user_id}: {len(reply.sentences)} sentences, {timings}")
+                yield _sse("done", {
+                    "messageId": ids[0] if ids else None,
+                    "replyId": ids[1] if ids and len(ids) > 1 else None,
+                    **timings,
+                })
+            finally:
+                reply.cancel()
+
+        return Response(stream_with_context(generate()), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+
+
+@ns.route("/messages/<string:id>")
+class ChatMessageDetail(Resource):
+    @jwt_required()
+    def delete(self, id):
+        """删除消息（软删除）"""
+        message = ChatMessage.query.filter_by(id=id, is_deleted=False).first()
+        if message is None:
+            ns.abort(404, "Message not found")
+        if message.user_id != get_jwt_identity():
+            ns.abort(403, "You do not have permission to delete this message.")
+        message.is_deleted = True
+        db.session.commit()
+        context_builder.forget(message.user_id, message.character_id, message.id)
+        return {"success": True, "message": "消息删除成功"}
+
+
+@ns.route("/context")
+class ChatContext(Resource):
+    @ns.expect(context_parser)
+    @ns.marshal_with(context_model)
+    @jwt_required()
+    def get(self):
+        """组装下一轮回复的提示词: 角色设定 + 预算内的最近对话"""
+        args = context_parser.parse_args()
+        user_id = resolve_user_id(args["userId"])
+        context = context_builder.build(user_id, args["characterId"], args["content"])
+        if context is None:
+            ns.abort(404, "Character not found")
+        return context
+
+
+@ns.route("/context/stats")
+class ChatContextStats(Resource):
+    @ns.marshal_with(context_stats_model)
+    @jwt_required()
+    def get(self):
+        """本进程提示词缓存的命中计数"""
+        return context_builder.stats()
@@ -0,0 +1,97 @@
+import wave
+
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required
+from werkzeug.datastructures import FileStorage
+from loguru import logger
+
+from app.extensions import db
+from app.models.emotion_result import EmotionResult
+from app.api.permissions import resolve_user_id
+from app.tasks import emotion as emotion_tasks
+
+ns = Namespace("emotion", description="情绪分析")
+
+analyze_text_model = ns.model("AnalyzeText", {
+    "text": fields.String(required=True),
+    "userId": fields.String,
+    "context": fields.Nested(ns.model("AnalyzeContext", {
+        "characterId": fields.String,
+        "sessionId": fields.String,
+    }), allow_null=True),
+})
+
+task_model = ns.model("EmotionTask", {
+    "taskId": fields.String,
+    "status": fields.String(enum=["pending", "completed", "failed"]),
+})
+
+emotion_result_model = ns.model("EmotionResult", {
+    "id": fields.String,
+    "userId": fields.String(attribute="user_id"),
+    "type": fields.String(attribute="emotion_type"),
+    "intensity": fields.Float,
+    "confidence": fields.Float,
+    "analysis": fields.Raw,
+    "inputType": fields.String(attribute="input_type"),
+    "inputData": fields.String(attribute="input_data"),
+    "processingTime": fields.Integer(attribute="processing_time"),
+    "modelVersion": fields.String(attribute="model_version"),
+    "timestamp": fields.DateTime(dt_format="iso8601", attribute="created_at"),
+})
+
+task_status_model = ns.inherit("EmotionTaskStatus", task_model, {
+    "emotionResult": fields.Nested(emotion_result_model, allow_null=True),
+})
+
+voice_parser = ns.parser()
+voice_parser.add_argument("audioFile", type=FileStorage, location="files", required=True, help="16 位 PCM WAV")
+voice_parser.add_argument("userId", type=str, location="form")
+voice_parser.add_argument("characterId", type=str, location="form")
+
+
+@ns.route("/analyze/text")
+class AnalyzeText(Resource):
+    @ns.expect(analyze_text_model, validate=True)
+    @ns.marshal_with(task_model, code=202)
+    @jwt_required()
+    def post(self):
+        """提交文本情绪分析, 立即返回任务 id; 文本会与其他请求合批打分"""
+        data = ns.payload
+        user_id = resolve_user_id(data.get("userId"))
+        task_id = emotion_tasks.submit_text(user_id, data["text"], data.get("context"))
+        if task_id is None:
+            ns.abort(503, "Emotion analysis queue is full, please retry later")
+        return {"taskId": task_id, "status": "pending"}, 202
+
+
+@ns.route("/analyze/voice")
+class AnalyzeVoice(Resource):
+    @ns.expect(voice_parser)
+    @ns.marshal_with(task_model, code=202)
+    @jwt_required()
+    def post(self):
+        """提交语音情绪分析: 上传流逐块提取韵律特征, 结果异步写库, 返回任务 id"""
+        args = voice_parser.parse_args()
+        user_id = resolve_user_id(args["userId"])
+        try:
+            task_id = emotion_tasks.submit_voice(user_id, args["audioFile"], args["characterId"])
+        except (ValueError, EOFError, wave.Error):
+            ns.abort(400, "Invalid audio file, expected 16-bit PCM WAV")
+        logger.debug(f"Voice emotion task {task_id} submitted for user {user_id}")
+        return {"taskId": task_id, "status": "pending"}, 202
+
+
+@ns.route("/tasks/<string:task_id>")
+class EmotionTask(Resource):
+    @ns.marshal_with(task_status_model)
+    @jwt_required()
+    def get(self, task_id):
+        """轮询分析任务; 结果写入后返回 completed 和分析结果"""
+        result = db.session.scalar(db.select(EmotionResult).filter_by(task_id=task_id))
+        if result is not None:
+            resolve_user_id(result.user_id)
+            return {"taskId": task_id, "status": "completed", "emotionResult": result}
+        # 还在微批队列或 Celery 队列里的任务, 以及未知的 id, 都视为 pending
+        status = "failed" if emotion_tasks.task_state(task_id) == "FAILURE" else "pending"
+        return {"taskId": task_id, "status": status, "emotionResult": None}
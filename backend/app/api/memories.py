@@ -0,0 +1,178 @@
+from datetime import datetime, timezone
+
+from flask import request
+from flask_restx import Namespace, Resource, fields, marshal
+from flask_jwt_extended import jwt_required
+from sqlalchemy import tuple_
+
+from app.extensions import db
+from app.memory import embedding
+from app.memory.store import encode, memory_index, search_memories
+from app.models.memory import Memory
+from app.api.pagination import decode_cursor, encode_cursor
+from app.api.permissions import resolve_user_id
+
+ns = Namespace("memories", description="回忆管理与检索")
+
+MAX_PAGE_SIZE = 100
+MAX_SEARCH_K = 50
+MEMORY_TYPES = ["happy", "sad", "important", "daily", "nostalgic", "fearful"]
+
+memory_model = ns.model("Memory", {
+    "id": fields.String(readonly=True),
+    "userId": fields.String(attribute="user_id"),
+    "characterId": fields.String(attribute="character_id"),
+    "content": fields.String(required=True),
+    "timestamp": fields.DateTime(dt_format="iso8601", attribute="occurred_at"),
+    "importance": fields.Integer(min=1, max=10, default=5),
+    "type": fields.String(attribute="memory_type", enum=MEMORY_TYPES, default="daily"),
+    "tags": fields.List(fields.String),
+    "createdAt": fields.DateTime(dt_format="iso8601", attribute="created_at", readonly=True),
+    "updatedAt": fields.DateTime(dt_format="iso8601", attribute="updated_at", readonly=True),
+})
+
+search_hit_model = ns.inherit("MemorySearchHit", memory_model, {
+    "score": fields.Float,
+})
+
+list_parser = ns.parser()
+list_parser.add_argument("userId", type=str, location="args")
+list_parser.add_argument("characterId", type=str, location="args")
+list_parser.add_argument("type", type=str, choices=MEMORY_TYPES, location="args")
+list_parser.add_argument("limit", type=int, default=20, location="args", help="每页数量, 最大 100")
+list_parser.add_argument("cursor", type=str, location="args", help="上一页返回的 X-Next-Cursor")
+
+search_parser = ns.parser()
+search_parser.add_argument("q", type=str, required=True, location="args", help="检索文本, 通常是患者刚说的话")
+search_parser.add_argument("userId", type=str, location="args")
+search_parser.add_argument("k", type=int, default=5, location="args", help="返回条数, 最大 50")
+search_parser.add_argument("mode", type=str, default="semantic", choices=["semantic", "keyword"], location="args",
+                           help="semantic 为向量相似度, keyword 为全文检索")
+
+
+def _parse_timestamp(value) -> datetime:
+    """ISO 8601 时间统一转成 UTC 的 naive datetime, 缺省为当前时间"""
+    if not value:
+        return datetime.utcnow()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        ns.abort(400, "timestamp must be ISO 8601")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _decode_cursor(cursor: str):
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        ns.abort(400, "Invalid cursor")
+
+
+def _fill(memory: Memory, data):
+    """把请求数据写入 memory, 并重新生成检索用的词串和向量"""
+    memory.content = data["content"]
+    memory.character_id = data.get("characterId")
+    memory.occurred_at = _parse_timestamp(data.get("timestamp"))
+    memory.importance = data.get("importance") or 5
+    memory.memory_type = data.get("type") or "daily"
+    memory.tags = data.get("tags") or []
+    memory.search_text = embedding.search_text(memory.content)
+    memory.embedding = encode(embedding.embed([memory.content])[0])
+    memory.embedding_model = embedding.MODEL_VERSION
+    memory.updated_at = datetime.utcnow()
+
+
+def _get_memory(memory_id: str) -> Memory:
+    memory = db.session.get(Memory, memory_id)
+    if memory is None:
+        ns.abort(404, "Memory not found")
+    resolve_user_id(memory.user_id)
+    return memory
+
+
+@ns.route("/")
+class MemoryList(Resource):
+    @ns.expect(list_parser)
+    @ns.response(200, "Success", [memory_model])
+    @jwt_required()
+    def get(self):
+        """回忆列表, 按发生时间倒序的游标分页, 下一页游标在 X-Next-Cursor 响应头中"""
+        args = list_parser.parse_args()
+        user_id = resolve_user_id(args["userId"])
+        limit = max(1, min(args["limit"] or 20, MAX_PAGE_SIZE))
+        query = Memory.query.filter(Memory.user_id == user_id)
+        if args["characterId"]:
+            query = query.filter(Memory.character_id == args["characterId"])
+        if args["type"]:
+            query = query.filter(Memory.memory_type == args["type"])
+        if args["cursor"]:
+            cursor = _decode_cursor(args["cursor"])
+            query = query.filter(tuple_(Memory.occurred_at, Memory.id) < tuple_(*cursor))
+        rows = query.order_by(Memory.occurred_at.desc(), Memory.id.desc()).limit(limit + 1).all()
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(rows[-1].occurred_at, rows[-1].id)
+        return marshal(rows, memory_model), 200, headers
+
+    @ns.expect(memory_model, validate=True)
+    @ns.marshal_with(memory_model, code=201)
+    @jwt_required()
+    def post(self):
+        """新建回忆"""
+        data = request.json
+        memory = Memory(user_id=resolve_user_id(data.get("userId")), created_at=datetime.utcnow())
+        _fill(memory, data)
+        db.session.add(memory)
+        db.session.commit()
+        memory_index.apply(memory.user_id, upserts=[(memory.id, memory.embedding, memory.updated_at)])
+        return memory, 201
+
+
+@ns.route("/search")
+class MemorySearch(Resource):
+    @ns.expect(search_parser)
+    @ns.response(200, "Success", [search_hit_model])
+    @jwt_required()
+    def get(self):
+        """检索与文本相关的回忆, 按得分降序"""
+        args = search_parser.parse_args()
+        user_id = resolve_user_id(args["userId"])
+        k = max(1, min(args["k"] or 5, MAX_SEARCH_K))
+        # 每条命中只序列化一次: 回忆本身按 memory_model, 再补上得分
+        return [
+            {**marshal(memory, memory_model), "score": round(score, 4)}
+            for memory, score in search_memories(user_id, args["q"], k, args["mode"])
+        ]
+
+
+@ns.route("/<string:memory_id>")
+class MemoryDetail(Resource):
+    @ns.marshal_with(memory_model)
+    @jwt_required()
+    def get(self, memory_id):
+        """获取单条回忆"""
+        return _get_memory(memory_id)
+
+    @ns.expect(memory_model, validate=True)
+    @ns.marshal_with(memory_model)
+    @jwt_required()
+    def put(self, memory_id):
+        """更新回忆"""
+        memory = _get_memory(memory_id)
+        _fill(memory, request.json)
+        db.session.commit()
+        memory_index.apply(memory.user_id, upserts=[(memory.id, memory.embedding, memory.updated_at)])
+        return memory
+
+    @jwt_required()
+    def delete(self, memory_id):
+        """删除回忆"""
+        memory = _get_memory(memory_id)
+        user_id = memory.user_id
+        db.session.delete(memory)
+        db.session.commit()
+        memory_index.apply(user_id, removed=[memory_id])
+        return {"success": True, "message": "回忆删除成功"}
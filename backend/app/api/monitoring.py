@@ -0,0 +1,225 @@
+import json
+import time
+
+from flask import Response, current_app, request, stream_with_context
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required
+from loguru import logger
+
+from app.api.permissions import resolve_user_id
+from app.database import pool_metrics
+from app.extensions import db
+from app.monitoring.ingest import ingestor, parse_sample
+from app.monitoring.latest import latest_state
+from app.monitoring.pubsub import broker
+
+ns = Namespace("monitoring", description="实时监测")
+
+# 一次请求里多少条攒一批放进写入队列, 以及最多返回多少条错误
+SUBMIT_CHUNK_SIZE = 1000
+MAX_ERRORS = 100
+
+ingest_result_model = ns.model("PhysiologicalIngestResult", {
+    "accepted": fields.Integer,
+    "dropped": fields.Integer,
+    "invalid": fields.Integer,
+    "errors": fields.List(fields.Nested(ns.model("PhysiologicalIngestError", {
+        "index": fields.Integer,
+        "error": fields.String,
+    }))),
+})
+
+ingest_stats_model = ns.model("PhysiologicalIngestStats", {
+    "accepted": fields.Integer,
+    "dropped": fields.Integer,
+    "pending": fields.Integer,
+    "written": fields.Integer,
+    "failed": fields.Integer,
+    "batches": fields.Integer,
+})
+
+pool_stats_model = ns.model("DatabasePoolStats", {
+    "checkouts": fields.Integer,
+    "checkins": fields.Integer,
+    "connects": fields.Integer(description="新建的连接数"),
+    "invalidated": fields.Integer,
+    "timeouts": fields.Integer(description="等待超过 DB_POOL_TIMEOUT 的次数"),
+    "waiting": fields.Integer(description="当前正在等待连接的线程数"),
+    "waitTotalMs": fields.Float,
+    "waitMaxMs": fields.Float,
+    "waitAvgMs": fields.Float,
+    "waitBuckets": fields.Raw(description="取连接耗时分布, 键为上界(秒)"),
+    "size": fields.Integer,
+    "checkedIn": fields.Integer,
+    "checkedOut": fields.Integer,
+    "overflow": fields.Integer,
+    "maxOverflow": fields.Integer,
+})
+
+current_emotion_model = ns.model("CurrentEmotion", {
+    "currentEmotion": fields.Nested(ns.model("EmotionState", {
+        "type": fields.String(enum=["positive", "negative", "neutral"]),
+        "intensity": fields.Float,
+        "confidence": fields.Float,
+        "lastUpdated": fields.String,
+    }), allow_null=True),
+})
+
+physiological_state_model = ns.model("LatestPhysiological", {
+    "physiologicalData": fields.Nested(ns.model("PhysiologicalState", {
+        "heartRate": fields.Integer,
+        "stressLevel": fields.Float,
+        "engagement": fields.Float,
+        "arousal": fields.Float,
+        "deviceId": fields.String,
+        "timestamp": fields.String,
+    }), allow_null=True),
+})
+
+
+def _iter_samples():
+    """请求体可以是单个对象、数组、{"samples": [...]} 或 NDJSON, 依次产出 (序号, 数据)
+
+    NDJSON 逐行产出未解析的 bytes, 由调用方解析, 以便单行 JSON 错误只影响该行。
+    """
+    if request.mimetype == "application/x-ndjson":
+        for index, line in enumerate(request.stream):
+            if line.strip():
+                yield index, line
+        return
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and isinstance(payload.get("samples"), list):
+        payload = payload["samples"]
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        ns.abort(400, "Expected a JSON object, array or NDJSON body")
+    yield from enumerate(payload)
+
+
+@ns.route("/physiological")
+class PhysiologicalIngest(Resource):
+    @ns.doc(consumes=["application/json", "application/x-ndjson"])
+    @ns.marshal_with(ingest_result_model, code=202)
+    @jwt_required()
+    def post(self):
+        """上报生理数据, 支持批量; 数据进入写入队列后立即返回"""
+        result = {"accepted": 0, "dropped": 0, "invalid": 0, "errors": []}
+        allowed = {}
+        chunk = []
+        for index, data in _iter_samples():
+            try:
+                if isinstance(data, bytes):
+                    data = json.loads(data)
+                user_id = data.get("userId") if isinstance(data, dict) else None
+                if user_id not in allowed:
+                    allowed[user_id] = resolve_user_id(user_id)
+                chunk.append(parse_sample(data, allowed[user_id]))
+            except ValueError as e:
+                result["invalid"] += 1
+                if len(result["errors"]) < MAX_ERRORS:
+                    result["errors"].append({"index": index, "error": str(e)})
+            if len(chunk) >= SUBMIT_CHUNK_SIZE:
+                _submit(chunk, result)
+                chunk = []
+        _submit(chunk, result)
+        if result["dropped"]:
+            logger.warning(f"Physiological queue full, dropped {result['dropped']} samples")
+        return result, 202
+
+
+def _submit(rows, result):
+    accepted = ingestor.submit(rows) if rows else 0
+    result["accepted"] += accepted
+    result["dropped"] += len(rows) - accepted
+
+
+@ns.route("/physiological/stats")
+class PhysiologicalIngestStats(Resource):
+    @ns.marshal_with(ingest_stats_model)
+    @jwt_required()
+    def get(self):
+        """本进程写入队列的计数"""
+        return ingestor.stats()
+
+
+@ns.route("/database/pool")
+class DatabasePoolStats(Resource):
+    @ns.marshal_with(ns.model("DatabasePools", {"*": fields.Wildcard(fields.Nested(pool_stats_model))}))
+    @jwt_required()
+    def get(self):
+        """本进程各数据库连接池(default, replica)的使用情况"""
+        return pool_metrics.stats()
+
+
+@ns.route("/emotion/current/<string:user_id>")
+class CurrentEmotion(Resource):
+    @ns.marshal_with(current_emotion_model)
+    @jwt_required()
+    def get(self, user_id):
+        """当前情绪状态, 从内存索引读取"""
+        user_id = resolve_user_id(user_id)
+        return {"currentEmotion": latest_state.get("emotion", user_id)}
+
+
+@ns.route("/physiological/<string:user_id>")
+class LatestPhysiological(Resource):
+    @ns.marshal_with(physiological_state_model)
+    @jwt_required()
+    def get(self, user_id):
+        """最新生理数据, 从内存索引读取"""
+        user_id = resolve_user_id(user_id)
+        return {"physiologicalData": latest_state.get("physiological", user_id)}
+
+
+def _sse(kind: str, state) -> str:
+    return f"event: {kind}\ndata: {json.dumps(state, ensure_ascii=False)}\n\n"
+
+
+@ns.route("/stream/<string:user_id>")
+class MonitoringStream(Resource):
+    @ns.produces(["text/event-stream"])
+    @ns.doc(params={"jwt": "浏览器 EventSource 无法设置请求头时, 用查询参数传 access token"})
+    @jwt_required(locations=["headers", "query_string"])
+    def get(self, user_id):
+        """以 Server-Sent Events 推送用户的情绪和生理数据更新
+
+        连接后先推送当前状态; 之后同一类事件在 MONITOR_STREAM_INTERVAL 毫秒内
+        只推送最新的一条, 空闲时每 MONITOR_STREAM_HEARTBEAT 秒发送一次心跳。
+        """
+        user_id = resolve_user_id(user_id)
+        interval = current_app.config.get("MONITOR_STREAM_INTERVAL", 1000) / 1000
+        heartbeat = current_app.config.get("MONITOR_STREAM_HEARTBEAT", 15)
+        subscription = broker.subscribe(user_id)
+        snapshot = {kind: latest_state.get(kind, user_id) for kind in ("emotion", "physiological")}
+        # 连接可能持续数小时: 先结束事务并把连接还给连接池, generate() 中不再访问数据库
+        db.session.remove()
+
+        def generate():
+            try:
+                yield f"retry: {int(interval * 1000) * 3}\n\n"
+                for kind, state in snapshot.items():
+                    if state is not None:
+                        yield _sse(kind, state)
+                last_sent = time.monotonic()
+                while True:
+                    events = subscription.wait(heartbeat)
+                    if not events:
+                        yield ": ping\n\n"
+                        continue
+                    # 节流: 距上次推送不足 interval 时先等一等, 期间到达的同类事件被合并
+                    delay = last_sent + interval - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                        events.update(subscription.wait(0))
+                    for kind, state in events.items():
+                        yield _sse(kind, state)
+                    last_sent = time.monotonic()
+            finally:
+                broker.unsubscribe(subscription)
+                logger.debug(f"Monitoring stream for user {user_id} closed")
+
+        return Response(stream_with_context(generate()), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # 关闭 nginx 缓冲, 事件立即送达
+        })
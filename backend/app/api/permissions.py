@@ -0,0 +1,16 @@
+from flask_restx import abort
+from flask_jwt_extended import get_jwt_identity
+
+from app.extensions import db
+from app.models.user import User
+
+
+def resolve_user_id(user_id: str = None) -> str:
+    """本人或护理者/管理员才能访问某个用户的数据, 返回目标用户 id"""
+    current = get_jwt_identity()
+    if not user_id or user_id == current:
+        return current
+    viewer = db.session.get(User, current)
+    if viewer is None or viewer.user_type not in ("caregiver", "admin"):
+        abort(403, "You do not have permission to access this user's data.")
+    return user_id
@@ -0,0 +1,338 @@
+import os
+from datetime import date, datetime, timedelta
+
+from flask import current_app, send_file, url_for
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import func, select
+
+from app.api.permissions import resolve_user_id
+from app.extensions import db
+from app.models.emotion_rollup import EMOTION_TYPES
+from app.models.memory import Memory
+from app.models.report_export import ReportExport
+from app.reports import export, rollups
+from app.tasks import reports as report_tasks
+
+ns = Namespace("reports", description="报表")
+
+PERIOD_DAYS = {"week": 7, "month": 30, "quarter": 90}
+MAX_RANGE_DAYS = 366
+# 季度报表按周出点, 其余按天
+POINT_DAYS = {"week": 1, "month": 1, "quarter": 7}
+# 前后两半均值之差超过阈值才算 improving/declining
+EMOTION_TREND_THRESHOLD = 0.05
+PAD_TREND_THRESHOLD = 0.3
+
+TREND = ["improving", "stable", "declining"]
+
+# 回忆类型 -> 情绪分类; 怀旧按积极计, 重要和日常回忆不带情绪倾向
+MEMORY_TYPE_EMOTION = {
+    "happy": "positive", "nostalgic": "positive",
+    "sad": "negative", "fearful": "negative",
+    "important": "neutral", "daily": "neutral",
+}
+# 每个情绪分类最多列出的回忆条数, 按重要程度和时间倒序
+MEMORY_REPORT_ITEMS = 20
+
+report_parser = ns.parser()
+report_parser.add_argument("userId", type=str, location="args")
+report_parser.add_argument("period", type=str, default="week", choices=list(PERIOD_DAYS), location="args")
+report_parser.add_argument("startDate", type=str, location="args", help="YYYY-MM-DD, 默认按 period 从 endDate 往前推")
+report_parser.add_argument("endDate", type=str, location="args", help="YYYY-MM-DD, 包含当天, 默认今天(UTC)")
+
+emotion_trend_model = ns.model("EmotionTrendReport", {
+    "weeklyTrend": fields.List(fields.Nested(ns.model("EmotionTrendPoint", {
+        "date": fields.String,
+        "positive": fields.Float,
+        "negative": fields.Float,
+        "neutral": fields.Float,
+        "count": fields.Integer,
+    }))),
+    "summary": fields.Nested(ns.model("EmotionTrendSummary", {
+        "averagePositive": fields.Float,
+        "averageNegative": fields.Float,
+        "averageNeutral": fields.Float,
+        "stdPositive": fields.Float,
+        "stdNegative": fields.Float,
+        "stdNeutral": fields.Float,
+        "totalAnalyses": fields.Integer,
+        "trend": fields.String(enum=TREND),
+    })),
+})
+
+pad_trends_model = ns.model("PadTrendsReport", {
+    "padTrends": fields.List(fields.Nested(ns.model("PadTrendPoint", {
+        "date": fields.String,
+        "pleasure": fields.Float,
+        "arousal": fields.Float,
+        "dominance": fields.Float,
+    }))),
+    "analysis": fields.Nested(ns.model("PadTrendAnalysis", {
+        "pleasureTrend": fields.String(enum=TREND),
+        "arousalTrend": fields.String(enum=TREND),
+        "dominanceTrend": fields.String(enum=TREND),
+        "overallImprovement": fields.Float(description="愉悦度后半段相对前半段的变化百分比"),
+    })),
+})
+
+memory_item_model = ns.model("MemoryItem", {
+    "content": fields.String,
+    "timestamp": fields.String,
+    "intensity": fields.Float,
+    "category": fields.String,
+})
+
+memory_classification_model = ns.model("MemoryClassificationReport", {
+    "memoryClassification": fields.Nested(ns.model("MemoryClassification", {
+        emotion: fields.List(fields.Nested(memory_item_model)) for emotion in EMOTION_TYPES
+    })),
+    "statistics": fields.Nested(ns.model("MemoryStatistics", {
+        "totalMemories": fields.Integer,
+        "positiveCount": fields.Integer,
+        "negativeCount": fields.Integer,
+        "neutralCount": fields.Integer,
+        "categoryDistribution": fields.Raw(description="回忆类型 -> 条数"),
+    })),
+})
+
+export_request_model = ns.model("ReportExportRequest", {
+    "userId": fields.String,
+    "period": fields.String(enum=list(PERIOD_DAYS), default="month"),
+    "format": fields.String(enum=list(export.FORMATS), default="json"),
+    "sections": fields.List(fields.String(enum=list(export.SECTIONS))),
+    "startDate": fields.String(description="YYYY-MM-DD"),
+    "endDate": fields.String(description="YYYY-MM-DD, 包含当天"),
+})
+
+export_job_model = ns.model("ReportExport", {
+    "reportId": fields.String(attribute="id"),
+    "status": fields.String(enum=["pending", "running", "completed", "failed", "expired"]),
+    "format": fields.String,
+    "sections": fields.List(fields.String),
+    "startDate": fields.Date(attribute="start_date"),
+    "endDate": fields.Date(attribute="end_date"),
+    "rowCount": fields.Integer(attribute="row_count"),
+    "size": fields.Integer,
+    "error": fields.String,
+    "reportUrl": fields.String(attribute=lambda job: url_for("report_export_download", export_id=job.id)),
+    "generatedAt": fields.DateTime(dt_format="iso8601", attribute="completed_at"),
+    "expiresAt": fields.DateTime(dt_format="iso8601", attribute="expires_at"),
+})
+
+
+def _report_range(args):
+    """解析查询参数, 返回 (用户 id, 开始日期, 结束日期), 日期均包含在内"""
+    user_id = resolve_user_id(args.get("userId"))
+    try:
+        end = date.fromisoformat(args["endDate"]) if args.get("endDate") else datetime.utcnow().date()
+        start = (date.fromisoformat(args["startDate"]) if args.get("startDate")
+                 else end - timedelta(days=PERIOD_DAYS[args["period"]] - 1))
+    except ValueError:
+        ns.abort(400, "startDate and endDate must be YYYY-MM-DD")
+    if start > end:
+        ns.abort(400, "startDate must not be after endDate")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        ns.abort(400, f"Report range must not exceed {MAX_RANGE_DAYS} days")
+    return user_id, start, end
+
+
+def _points(daily, start: date, days: int):
+    """把天桶按 days 天一组合并, 产出 (组开始日期, 合并后的桶)"""
+    groups = {}
+    for rollup in daily:
+        offset = (rollup.bucket_start.date() - start).days // days
+        rollups.merge(groups.setdefault(offset, rollups.empty_bucket()), rollup)
+    for offset in sorted(groups):
+        yield start + timedelta(days=offset * days), groups[offset]
+
+
+def _halves(daily):
+    """前后两半天桶各自合并, 用来判断趋势"""
+    middle = len(daily) // 2
+    return rollups.combine(daily[:middle]), rollups.combine(daily[middle:])
+
+
+def _trend(before, after, threshold: float) -> str:
+    if before is None or after is None:
+        return "stable"
+    if after - before > threshold:
+        return "improving"
+    if before - after > threshold:
+        return "declining"
+    return "stable"
+
+
+def _round(value, digits: int = 4):
+    return round(value, digits) if value is not None else None
+
+
+def _net(bucket):
+    positive, negative = rollups.mean(bucket, "positive"), rollups.mean(bucket, "negative")
+    return positive - negative if positive is not None and negative is not None else None
+
+
+@ns.route("/emotion-trend")
+class EmotionTrend(Resource):
+    @ns.expect(report_parser)
+    @ns.marshal_with(emotion_trend_model)
+    @jwt_required()
+    def get(self):
+        """正/负/中性得分的趋势, 只读取天级预聚合"""
+        args = report_parser.parse_args()
+        user_id, start, end = _report_range(args)
+        daily = rollups.daily_rollups(user_id, start, end)
+        trend = [
+            {"date": day.isoformat(), "count": bucket["total"],
+             **{emotion: _round(rollups.mean(bucket, emotion)) for emotion in EMOTION_TYPES}}
+            for day, bucket in _points(daily, start, POINT_DAYS[args["period"]])
+        ]
+        total = rollups.combine(daily)
+        before, after = _halves(daily)
+        summary = {"totalAnalyses": total["total"], "trend": _trend(_net(before), _net(after), EMOTION_TREND_THRESHOLD)}
+        for emotion in EMOTION_TYPES:
+            summary[f"average{emotion.capitalize()}"] = _round(rollups.mean(total, emotion))
+            summary[f"std{emotion.capitalize()}"] = _round(rollups.std(total, emotion))
+        return {"weeklyTrend": trend, "summary": summary}
+
+
+@ns.route("/pad-trends")
+class PadTrends(Resource):
+    @ns.expect(report_parser)
+    @ns.marshal_with(pad_trends_model)
+    @jwt_required()
+    def get(self):
+        """PAD 三维(1-10)的趋势, 只读取天级预聚合; 数值上升记为 improving"""
+        args = report_parser.parse_args()
+        user_id, start, end = _report_range(args)
+        daily = rollups.daily_rollups(user_id, start, end)
+        trend = [
+            {"date": day.isoformat(), **{dim: _round(rollups.mean(bucket, dim), 2) for dim in ("pleasure", "arousal", "dominance")}}
+            for day, bucket in _points(daily, start, POINT_DAYS[args["period"]])
+        ]
+        before, after = _halves(daily)
+        analysis = {
+            f"{dim}Trend": _trend(rollups.mean(before, dim), rollups.mean(after, dim), PAD_TREND_THRESHOLD)
+            for dim in ("pleasure", "arousal", "dominance")
+        }
+        first, last = rollups.mean(before, "pleasure"), rollups.mean(after, "pleasure")
+        analysis["overallImprovement"] = round((last - first) / first * 100, 1) if first and last is not None else 0.0
+        return {"padTrends": trend, "analysis": analysis}
+
+
+@ns.route("/memory-classification")
+class MemoryClassification(Resource):
+    @ns.expect(report_parser)
+    @ns.marshal_with(memory_classification_model)
+    @jwt_required()
+    def get(self):
+        """时间范围内发生的回忆按情绪分类, 分类由回忆类型决定(见 MEMORY_TYPE_EMOTION)
+
+        statistics 统计全部回忆; 每个分类只列出最重要的 MEMORY_REPORT_ITEMS 条。
+        """
+        args = report_parser.parse_args()
+        user_id, start, end = _report_range(args)
+        in_range = (
+            Memory.user_id == user_id,
+            Memory.occurred_at >= datetime.combine(start, datetime.min.time()),
+            Memory.occurred_at < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        )
+        distribution = dict(db.session.execute(
+            select(Memory.memory_type, func.count()).where(*in_range).group_by(Memory.memory_type)
+        ).all())
+        counts = {emotion: 0 for emotion in EMOTION_TYPES}
+        for memory_type, count in distribution.items():
+            counts[MEMORY_TYPE_EMOTION.get(memory_type, "neutral")] += count
+        emotional = [t for t, e in MEMORY_TYPE_EMOTION.items() if e != "neutral"]
+        classification = {}
+        for emotion in EMOTION_TYPES:
+            if emotion == "neutral":
+                # 未知类型也归入中性
+                condition = Memory.memory_type.notin_(emotional)
+            else:
+                condition = Memory.memory_type.in_([t for t, e in MEMORY_TYPE_EMOTION.items() if e == emotion])
+            rows = db.session.execute(
+                select(Memory.content, Memory.occurred_at, Memory.importance, Memory.memory_type)
+                .where(*in_range, condition)
+                .order_by(Memory.importance.desc(), Memory.occurred_at.desc())
+                .limit(MEMORY_REPORT_ITEMS)
+            ).all() if counts[emotion] else []
+            classification[emotion] = [
+                {"content": row.content, "timestamp": row.occurred_at.isoformat(),
+                 "intensity": row.importance / 10, "category": row.memory_type}
+                for row in rows
+            ]
+        return {
+            "memoryClassification": classification,
+            "statistics": {
+                "totalMemories": sum(distribution.values()),
+                **{f"{emotion}Count": counts[emotion] for emotion in EMOTION_TYPES},
+                "categoryDistribution": distribution,
+            },
+        }
+
+
+@ns.route("/export")
+class ReportExportCreate(Resource):
+    @ns.expect(export_request_model, validate=True)
+    @ns.marshal_with(export_job_model, code=202)
+    @jwt_required()
+    def post(self):
+        """提交完整报告导出, 立即返回任务; 文件由 Celery 任务流式生成"""
+        data = {"period": "month", **ns.payload}
+        user_id, start, end = _report_range(data)
+        sections = data.get("sections") or list(export.SECTIONS)
+        unknown = set(sections) - set(export.SECTIONS)
+        if unknown:
+            ns.abort(400, f"Unknown sections: {', '.join(sorted(unknown))}")
+        job = ReportExport(
+            user_id=user_id,
+            requested_by=get_jwt_identity(),
+            format=data.get("format") or "json",
+            sections=list(dict.fromkeys(sections)),
+            start_date=start,
+            end_date=end,
+            expires_at=datetime.utcnow() + timedelta(hours=current_app.config.get("REPORT_EXPORT_TTL", 24)),
+        )
+        db.session.add(job)
+        db.session.commit()
+        report_tasks.export_report.apply_async(args=[job.id], task_id=job.id)
+        db.session.refresh(job)
+        return job, 202
+
+
+def _get_job(export_id: str) -> ReportExport:
+    job = db.session.get(ReportExport, export_id)
+    if job is None:
+        ns.abort(404, "Report not found")
+    resolve_user_id(job.user_id)
+    return job
+
+
+@ns.route("/export/<string:export_id>")
+class ReportExportStatus(Resource):
+    @ns.marshal_with(export_job_model)
+    @jwt_required()
+    def get(self, export_id):
+        """查询导出任务状态"""
+        return _get_job(export_id)
+
+
+@ns.route("/export/<string:export_id>/download", endpoint="report_export_download")
+class ReportExportDownload(Resource):
+    @ns.produces(["application/json", "application/zip"])
+    @ns.doc(params={"jwt": "下载链接无法设置请求头时, 用查询参数传 access token"})
+    @jwt_required(locations=["headers", "query_string"])
+    def get(self, export_id):
+        """下载导出文件, 支持 Range 请求断点续传"""
+        job = _get_job(export_id)
+        if job.status == "expired" or job.expires_at < datetime.utcnow():
+            ns.abort(410, "Report has expired")
+        if job.status != "completed":
+            ns.abort(409, f"Report is {job.status}")
+        path = report_tasks.export_path(job)
+        if not os.path.exists(path):
+            ns.abort(410, "Report file is no longer available")
+        name = f"report-{job.start_date}-{job.end_date}-{job.id[:8]}.{export.FORMATS[job.format]}"
+        # conditional=True 由 werkzeug 处理 Range / If-Range, 返回 206 部分内容
+        return send_file(path, as_attachment=True, download_name=name, conditional=True, max_age=0)
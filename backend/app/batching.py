@@ -0,0 +1,99 @@
+import atexit
+import threading
+import time
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+
+class MicroBatcher:
+    """进程内微批处理器: 攒够 max_size 条或等待满 max_wait 秒后整批交给 flush_fn
+
+    submit() 不阻塞; 后台线程在第一次提交时才启动, 避免 gunicorn fork 前
+    创建线程。队列超过 max_pending 时新数据被丢弃并计数, 内存占用有上界。
+    """
+
+    def __init__(self, flush_fn: Callable[[List], None], max_size: int = 64,
+                 max_wait: float = 0.05, max_pending: int = 10000, name: str = "batcher"):
+        self.flush_fn = flush_fn
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.name = name
+        self.accepted = 0
+        self.dropped = 0
+        self.flushed_batches = 0
+        self._items: List = []
+        self._first_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(self, item) -> bool:
+        """加入一条数据, 返回是否被接受"""
+        return self.submit_many([item]) == 1
+
+    def submit_many(self, items: List) -> int:
+        """加入多条数据, 返回被接受的条数"""
+        with self._cond:
+            self._ensure_thread()
+            room = max(self.max_pending - len(self._items), 0)
+            accepted = items[:room]
+            self.dropped += len(items) - len(accepted)
+            if accepted:
+                if not self._items:
+                    self._first_at = time.monotonic()
+                self._items.extend(accepted)
+                self.accepted += len(accepted)
+                self._cond.notify()
+            return len(accepted)
+
+    def pending(self) -> int:
+        return len(self._items)
+
+    def flush(self):
+        """立即把当前积压的数据全部交给 flush_fn"""
+        with self._cond:
+            batch, self._items, self._first_at = self._items, [], None
+        self._flush(batch)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._items) >= self.max_size:
+                        break
+                    if self._items:
+                        remaining = self._first_at + self.max_wait - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+                batch = self._items[:self.max_size]
+                self._items = self._items[self.max_size:]
+                self._first_at = time.monotonic() if self._items else None
+            self._flush(batch)
+
+    def _flush(self, batch: List):
+        if not batch:
+            return
+        try:
+            self.flush_fn(batch)
+            self.flushed_batches += 1
+        except Exception as e:
+            logger.error(f"{self.name}: flushing {len(batch)} items failed: {e}")
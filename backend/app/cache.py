@@ -0,0 +1,166 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Response, request
+from loguru import logger
+
+# 缓存值: (etag, 已序列化的 JSON 字节, 额外响应头)
+Entry = Tuple[str, bytes, Dict[str, str]]
+
+
+class TTLCache:
+    """进程内 LRU + TTL 缓存"""
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: Optional[int] = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    """读穿透的响应缓存: 进程内 LRU 一级, 可选 Redis 二级
+
+    每个命名空间有一个代数(generation), 写操作只需把代数加一, 旧 key
+    自然失效并被 LRU/TTL 淘汰。配置了 Redis 时代数存在 Redis 中,
+    多个 worker 之间的失效是一致的。没有 Redis 时代数只在本进程内,
+    其他 worker 的修改要等本地缓存过期才可见, 所以本地有效期缩短为
+    CACHE_LOCAL_TTL 秒, 这也是多 worker 部署下读到旧数据的上限。
+    """
+
+    def __init__(self):
+        self.local = TTLCache()
+        self.redis = None
+        self.prefix = "ris:cache:"
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        redis_url = app.config.get("REDIS_URL")
+        if redis_url:
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+                self.redis.ping()
+            except Exception as e:
+                logger.warning(f"Response cache falls back to in-process store: {e}")
+                self.redis = None
+        ttl = app.config.get("CACHE_TTL", 300)
+        if self.redis is None:
+            ttl = min(ttl, app.config.get("CACHE_LOCAL_TTL", 5))
+            logger.info(f"Response cache is per process, other workers' updates may be up to {ttl}s stale")
+        self.local = TTLCache(maxsize=app.config.get("CACHE_MAX_ENTRIES", 1024), ttl=ttl)
+        app.extensions["response_cache"] = self
+
+    # ---- 代数 ----
+
+    def generation(self, namespace: str) -> int:
+        if self.redis is not None:
+            try:
+                value = self.redis.get(f"{self.prefix}{namespace}:gen")
+                return int(value or 0)
+            except Exception as e:
+                logger.warning(f"Redis generation lookup failed: {e}")
+        return self._generations.get(namespace, 0)
+
+    def invalidate(self, namespace: str):
+        """让命名空间下的所有缓存失效"""
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        if self.redis is not None:
+            try:
+                self.redis.incr(f"{self.prefix}{namespace}:gen")
+            except Exception as e:
+                logger.warning(f"Redis invalidation failed: {e}")
+
+    # ---- 读写 ----
+
+    def get(self, key: str) -> Optional[Entry]:
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(self.prefix + key)
+            except Exception as e:
+                logger.warning(f"Redis get failed: {e}")
+                raw = None
+            if raw:
+                etag, headers, body = raw.split(b"\n", 2)
+                entry = (etag.decode(), body, json.loads(headers))
+                self.local.set(key, entry)
+                return entry
+        return None
+
+    def set(self, key: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> Entry:
+        entry = (hashlib.sha1(body).hexdigest(), body, headers or {})
+        self.local.set(key, entry)
+        if self.redis is not None:
+            try:
+                raw = b"\n".join([entry[0].encode(), json.dumps(entry[2]).encode(), body])
+                self.redis.set(self.prefix + key, raw, ex=self.local.ttl)
+            except Exception as e:
+                logger.warning(f"Redis set failed: {e}")
+        return entry
+
+    def fetch(self, namespace: str, key: str, loader: Callable[[], object],
+              with_headers: bool = False) -> Entry:
+        """命中则直接返回, 否则调用 loader 取数据并序列化后写入缓存
+
+        with_headers 为 True 时 loader 返回 (payload, headers), headers 随缓存一起保存。
+        """
+        full_key = f"{namespace}:{self.generation(namespace)}:{key}"
+        entry = self.get(full_key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        payload, headers = loader() if with_headers else (loader(), None)
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self.set(full_key, body, headers)
+
+    def respond(self, namespace: str, key: str, loader: Callable[[], object],
+                with_headers: bool = False) -> Response:
+        """返回带 ETag 的 JSON 响应, If-None-Match 匹配时返回 304"""
+        etag, body, headers = self.fetch(namespace, key, loader, with_headers)
+        if etag in request.if_none_match:
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(body, mimetype="application/json", headers=headers)
+        response.set_etag(etag)
+        return response
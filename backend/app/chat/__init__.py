@@ -0,0 +1 @@
+"""对话生成: 角色设定 + 最近对话的提示词组装"""
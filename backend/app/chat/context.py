@@ -0,0 +1,309 @@
+"""提示词上下文组装
+
+每轮回复需要的提示词由三部分组成: 角色设定块(按角色版本缓存)、相关回忆
+(可选)、最近的对话。最近对话按 (userId, characterId) 在内存中保存一个
+滚动窗口, 超出 token 预算时从最早的一轮开始淘汰。
+
+没有可用的分词器, token 数按汉字和标点各 1 个、英文单词每 4 个字符 1 个
+估算, 和常见 BPE 分词的量级一致, 只用于预算。
+"""
+import math
+import re
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.character import Character
+from app.models.chat_message import ChatMessage
+
+_TOKEN = re.compile(r"[㐀-鿿]|[A-Za-z0-9]+|\S")
+
+# 角色设定中 emotions 各键的中文名
+EMOTION_NAMES = {
+    "happy": "开心", "sad": "难过", "angry": "生气",
+    "fearful": "害怕", "jealous": "嫉妒", "nervous": "紧张",
+}
+ROLES = {"user": "user", "assistant": "assistant"}
+
+
+def count_tokens(text: str) -> int:
+    count = 0
+    for token in _TOKEN.findall(text or ""):
+        count += math.ceil(len(token) / 4) if token[0].isascii() and token[0].isalnum() else 1
+    return count
+
+
+def render_persona(character: Character) -> str:
+    """角色设定 -> system 提示词, 空字段不出现"""
+    lines = [f"你是「{character.name}」, 正在陪伴一位老人聊天。请始终以这个角色的身份回答。"]
+    traits = "、".join(t for t in (character.mbti_type, character.zodiac_sign) if t)
+    if traits:
+        lines.append(f"角色特征: {traits}")
+    if character.personality:
+        lines.append(f"性格: {character.personality}")
+    if character.speaking_style:
+        lines.append(f"说话风格: {character.speaking_style}")
+    if character.emotional_triggers:
+        lines.append(f"情绪触发点: {'、'.join(character.emotional_triggers)}")
+    for key, reactions in (character.emotions or {}).items():
+        if reactions:
+            lines.append(f"{EMOTION_NAMES.get(key, key)}时的表现: {'、'.join(reactions)}")
+    if character.default_scene:
+        lines.append(f"场景: {character.default_scene}")
+    if character.default_script:
+        lines.append(f"剧本: {character.default_script}")
+    return "\n".join(lines)
+
+
+class PersonaBlock:
+    """编译好的角色设定: 文本和 token 数, version 为角色的 updated_at"""
+
+    __slots__ = ("character_id", "version", "text", "tokens")
+
+    def __init__(self, character: Character):
+        self.character_id = character.id
+        self.version = character.updated_at
+        self.text = render_persona(character)
+        self.tokens = count_tokens(self.text)
+
+
+class Turn:
+    __slots__ = ("id", "sender", "content", "tokens", "created_at")
+
+    def __init__(self, id: str, sender: str, content: str, created_at: datetime):
+        self.id = id
+        self.sender = sender
+        self.content = content
+        self.tokens = count_tokens(content)
+        self.created_at = created_at
+
+
+class SessionWindow:
+    """一个会话最近的若干轮对话, 总 token 数不超过 budget, 条数不超过 max_turns"""
+
+    def __init__(self, budget: int, max_turns: int, version: Optional[datetime] = None):
+        self.budget = budget
+        self.max_turns = max_turns
+        # 会话中最新一条消息(含已删除的)的 created_at, 与数据库对比判断是否过期
+        self.version = version
+        self.turns: Deque[Turn] = deque()
+        self.tokens = 0
+
+    def append(self, turn: Turn) -> int:
+        """追加一轮, 返回因超出预算被淘汰的轮数"""
+        if self.version is None or turn.created_at > self.version:
+            self.version = turn.created_at
+        if self.turns and turn.created_at < self.turns[-1].created_at:
+            return 0
+        self.turns.append(turn)
+        self.tokens += turn.tokens
+        evicted = 0
+        while self.turns and (self.tokens > self.budget or len(self.turns) > self.max_turns):
+            self.tokens -= self.turns.popleft().tokens
+            evicted += 1
+        return evicted
+
+    def remove(self, message_id: str) -> bool:
+        for turn in self.turns:
+            if turn.id == message_id:
+                self.turns.remove(turn)
+                self.tokens -= turn.tokens
+                return True
+        return False
+
+    def fit(self, budget: int) -> List[Turn]:
+        """从最新往前取, 总 token 数不超过 budget 的那些轮, 按时间正序"""
+        selected, used = [], 0
+        for turn in reversed(self.turns):
+            if used + turn.tokens > budget:
+                break
+            selected.append(turn)
+            used += turn.tokens
+        selected.reverse()
+        return selected
+
+
+class PromptContext:
+    """组装结果: messages 为 [{"role", "content"}], 可直接交给对话模型"""
+
+    __slots__ = ("messages", "tokens", "persona_tokens", "history_turns")
+
+    def __init__(self, messages: List[Dict], tokens: int, persona_tokens: int, history_turns: int):
+        self.messages = messages
+        self.tokens = tokens
+        self.persona_tokens = persona_tokens
+        self.history_turns = history_turns
+
+
+class ContextBuilder:
+    """每轮回复的提示词组装, 角色设定和最近对话都不必每次从数据库重建
+
+    角色设定块按 (characterId, updated_at) 缓存, 每轮只查一次角色的
+    updated_at(主键查找)确认版本; 最近对话窗口在本进程写入时追加, 每轮
+    用一条走 (user_id, character_id, created_at) 索引的 max 查询确认没有
+    其他 worker 写入的新消息, 有时才重新加载。
+    """
+
+    def __init__(self):
+        self.max_tokens = 3000
+        self.reply_tokens = 512
+        self.max_turns = 40
+        self.max_sessions = 4096
+        self.max_personas = 512
+        self.persona_hits = 0
+        self.persona_misses = 0
+        self.window_hits = 0
+        self.window_misses = 0
+        self.evicted_turns = 0
+        self._personas: "OrderedDict[str, PersonaBlock]" = OrderedDict()
+        self._sessions: "OrderedDict[Tuple[str, str], SessionWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_tokens = app.config.get("CHAT_CONTEXT_MAX_TOKENS", 3000)
+        self.reply_tokens = app.config.get("CHAT_CONTEXT_REPLY_TOKENS", 512)
+        self.max_turns = app.config.get("CHAT_CONTEXT_MAX_TURNS", 40)
+        self.max_sessions = app.config.get("CHAT_CONTEXT_MAX_SESSIONS", 4096)
+        self.max_personas = app.config.get("CHAT_CONTEXT_MAX_PERSONAS", 512)
+
+    def persona(self, character_id: str) -> Optional[PersonaBlock]:
+        """角色设定块, 角色不存在时返回 None"""
+        found = db.session.execute(
+            select(Character.updated_at).where(Character.id == character_id)
+        ).first()
+        if found is None:
+            return None
+        with self._lock:
+            block = self._personas.get(character_id)
+            if block is not None and block.version == found.updated_at:
+                self._personas.move_to_end(character_id)
+                self.persona_hits += 1
+                return block
+        character = db.session.get(Character, character_id)
+        if character is None:
+            return None
+        block = PersonaBlock(character)
+        with self._lock:
+            self.persona_misses += 1
+            self._personas[character_id] = block
+            self._personas.move_to_end(character_id)
+            while len(self._personas) > self.max_personas:
+                self._personas.popitem(last=False)
+        return block
+
+    def window(self, user_id: str, character_id: str) -> SessionWindow:
+        key = (user_id, character_id)
+        newest = db.session.execute(
+            select(func.max(ChatMessage.created_at)).where(
+                ChatMessage.user_id == user_id, ChatMessage.character_id == character_id)
+        ).scalar()
+        with self._lock:
+            window = self._sessions.get(key)
+            if window is not None and window.version == newest:
+                self._sessions.move_to_end(key)
+                self.window_hits += 1
+                return window
+        window = self._load_window(user_id, character_id, newest)
+        with self._lock:
+            self.window_misses += 1
+            self._sessions[key] = window
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return window
+
+    def record(self, messages: Iterable[ChatMessage]):
+        """本进程写入消息后调用, 追加到已缓存的窗口; 没有缓存的会话下次组装时再加载
+
+        追加会把窗口的 version 推进到新消息的时间, 所以先确认窗口与数据库是连续的:
+        新消息之前最新的一条必须正是窗口的 version。否则说明窗口加载之后其他 worker
+        写入过消息, 直接丢弃窗口, 下次组装时重新加载, 不会漏掉那条消息。
+        """
+        sessions: Dict[Tuple[str, str], List[ChatMessage]] = {}
+        for message in messages:
+            sessions.setdefault((message.user_id, message.character_id), []).append(message)
+        for key, rows in sessions.items():
+            with self._lock:
+                window = self._sessions.get(key)
+            if window is None:
+                continue
+            earliest = min(row.created_at for row in rows)
+            previous = db.session.execute(
+                select(func.max(ChatMessage.created_at)).where(
+                    ChatMessage.user_id == key[0], ChatMessage.character_id == key[1],
+                    ChatMessage.created_at < earliest)
+            ).scalar()
+            with self._lock:
+                if self._sessions.get(key) is not window:
+                    continue
+                if window.version != previous:
+                    del self._sessions[key]
+                    continue
+                for row in rows:
+                    self.evicted_turns += window.append(Turn(row.id, row.sender, row.content, row.created_at))
+
+    def forget(self, user_id: str, character_id: str, message_id: str):
+        """本进程删除消息后调用, 从窗口中移除; 其他进程的删除要等窗口重新加载才可见"""
+        with self._lock:
+            window = self._sessions.get((user_id, character_id))
+            if window is not None:
+                window.remove(message_id)
+
+    def build(self, user_id: str, character_id: str, user_text: Optional[str] = None,
+              memories: Sequence[str] = ()) -> Optional[PromptContext]:
+        """组装提示词; user_text 是尚未写入历史的本轮用户消息, memories 是检索到的相关回忆"""
+        persona = self.persona(character_id)
+        if persona is None:
+            return None
+        system = persona.text
+        system_tokens = persona.tokens
+        if memories:
+            memory_text = "\n可以自然地提到这些与老人有关的回忆:\n" + "\n".join(f"- {m}" for m in memories)
+            system += memory_text
+            system_tokens += count_tokens(memory_text)
+        current_tokens = count_tokens(user_text) if user_text else 0
+        budget = self.max_tokens - self.reply_tokens - system_tokens - current_tokens
+        window = self.window(user_id, character_id)
+        with self._lock:
+            history = window.fit(max(budget, 0))
+        messages = [{"role": "system", "content": system}]
+        messages.extend({"role": ROLES.get(turn.sender, "user"), "content": turn.content} for turn in history)
+        if user_text:
+            messages.append({"role": "user", "content": user_text})
+        tokens = system_tokens + current_tokens + sum(turn.tokens for turn in history)
+        return PromptContext(messages, tokens, persona.tokens, len(history))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "personaHits": self.persona_hits,
+                "personaMisses": self.persona_misses,
+                "windowHits": self.window_hits,
+                "windowMisses": self.window_misses,
+                "personas": len(self._personas),
+                "sessions": len(self._sessions),
+                "evictedTurns": self.evicted_turns,
+            }
+
+    def _load_window(self, user_id: str, character_id: str, version: Optional[datetime]) -> SessionWindow:
+        """从数据库加载最近 max_turns 条未删除的消息"""
+        window = SessionWindow(self.max_tokens - self.reply_tokens, self.max_turns, version)
+        rows = db.session.execute(
+            select(ChatMessage.id, ChatMessage.sender, ChatMessage.content, ChatMessage.created_at)
+            .where(ChatMessage.user_id == user_id, ChatMessage.character_id == character_id,
+                   ChatMessage.is_deleted.is_(False))
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            .limit(self.max_turns)
+        ).all()
+        for row in reversed(rows):
+            window.append(Turn(row.id, row.sender, row.content, row.created_at))
+        logger.debug(f"Chat window for user {user_id}, character {character_id} loaded: {len(rows)} turns")
+        return window
+
+
+context_builder = ContextBuilder()
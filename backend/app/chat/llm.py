@@ -0,0 +1,85 @@
+"""对话模型客户端
+
+stream(messages) 逐段产出回复文本。HTTPChatModel 对接 OpenAI 兼容的
+/chat/completions 流式接口; FakeChatModel 是本地替身, 按设定的首 token
+延迟和生成速度输出固定句式的回复, 用于开发和基准测试。
+"""
+import json
+import time
+import urllib.request
+from typing import Dict, Iterator, List, Optional
+
+from loguru import logger
+
+
+class ChatModelError(Exception):
+    pass
+
+
+class FakeChatModel:
+    def __init__(self, first_token_ms: float = 300.0, token_ms: float = 40.0, chars_per_token: int = 2):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.chars_per_token = chars_per_token
+
+    def reply_text(self, messages: List[Dict]) -> str:
+        said = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        return (f"听你说「{said[:20]}」, 我很想多听一些。那时候是什么样子的呢? "
+                "你慢慢说, 我一直在这儿陪着你。要是累了, 我们就先歇一歇, 喝口水。")
+
+    def stream(self, messages: List[Dict]) -> Iterator[str]:
+        text = self.reply_text(messages)
+        time.sleep(self.first_token_ms / 1000)
+        for start in range(0, len(text), self.chars_per_token):
+            if start:
+                time.sleep(self.token_ms / 1000)
+            yield text[start:start + self.chars_per_token]
+
+
+class HTTPChatModel:
+    """OpenAI 兼容接口: POST {url} stream=true, 按行解析 "data: {...}" 事件"""
+
+    def __init__(self, url: str, model: str, api_key: str = "", max_tokens: int = 512, timeout: float = 30.0):
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+
+    def stream(self, messages: List[Dict]) -> Iterator[str]:
+        body = json.dumps({
+            "model": self.model, "messages": messages, "stream": True, "max_tokens": self.max_tokens,
+        }).encode()
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                for raw in response:
+                    line = raw.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+        except (OSError, ValueError) as e:
+            logger.warning(f"Chat model request failed: {e}")
+            raise ChatModelError(str(e)) from e
+
+
+def create_chat_model(config) -> Optional[object]:
+    """按 CHAT_LLM_BACKEND 创建对话模型; 未配置(none)时返回 None, 不会悄悄用替身回复患者"""
+    backend = config.get("CHAT_LLM_BACKEND", "none")
+    if backend == "http":
+        return HTTPChatModel(
+            config["CHAT_LLM_URL"], config.get("CHAT_LLM_MODEL", ""), config.get("CHAT_LLM_API_KEY", ""),
+            max_tokens=config.get("CHAT_CONTEXT_REPLY_TOKENS", 512), timeout=config.get("CHAT_LLM_TIMEOUT", 30),
+        )
+    if backend == "fake":
+        return FakeChatModel()
+    return None
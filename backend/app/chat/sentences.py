@@ -0,0 +1,68 @@
+"""流式回复的断句
+
+对话模型逐 token 输出, 句子一完整就交给语音合成, 老人不用等整段回复生成完
+才听到声音。第一句允许在逗号处提前断开, 尽快出第一段音频; 之后的句子在
+逗号处断开的长度更长, 避免语音被切得太碎。
+"""
+from typing import List, Optional
+
+# 句末标点; 英文句号只有后面跟空白时才算(避免切开 3.5 这样的数字)
+HARD_BREAKS = "。！？!?；;\n…"
+SOFT_BREAKS = "，,、：:"
+# 紧跟在句末标点后面、应归入上一句的字符
+CLOSERS = "”’\"'）)」』】"
+
+
+class SentenceSplitter:
+    """feed(token) 返回新凑齐的句子列表, flush() 返回剩余的部分"""
+
+    def __init__(self, min_chars: int = 2, first_soft_chars: int = 6, soft_chars: int = 20, max_chars: int = 50):
+        self.min_chars = min_chars
+        self.first_soft_chars = first_soft_chars
+        self.soft_chars = soft_chars
+        self.max_chars = max_chars
+        self.count = 0
+        self._buf = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buf += text
+        sentences = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                return sentences
+            sentence, self._buf = self._buf[:cut].strip(), self._buf[cut:]
+            if sentence:
+                sentences.append(sentence)
+                self.count += 1
+
+    def flush(self) -> List[str]:
+        sentence, self._buf = self._buf.strip(), ""
+        if not sentence:
+            return []
+        self.count += 1
+        return [sentence]
+
+    def _find_cut(self) -> Optional[int]:
+        buf = self._buf
+        soft_chars = self.first_soft_chars if self.count == 0 else self.soft_chars
+        i = 0
+        while i < len(buf):
+            ch = buf[i]
+            if ch in HARD_BREAKS or (ch == "." and i + 1 < len(buf) and buf[i + 1].isspace()):
+                j = i + 1
+                while j < len(buf) and (buf[j] in HARD_BREAKS or buf[j] in CLOSERS):
+                    j += 1
+                if j == len(buf) and ch != "\n":
+                    # 后面可能还有 "？！" 或引号, 等下一个 token 再断
+                    return None
+                if len(buf[:j].strip()) >= self.min_chars:
+                    return j
+                i = j
+                continue
+            if ch in SOFT_BREAKS and i + 1 >= soft_chars:
+                return i + 1
+            i += 1
+        if len(buf) >= self.max_chars:
+            return self.max_chars
+        return None
@@ -0,0 +1,197 @@
+"""流式回复流水线
+
+ReplyStream 用两个后台线程: 模型线程逐 token 读取回复并断句, 每凑齐一句
+立即作为一个任务发给语音服务; 语音线程在请求开始时就建立连接, 按句子顺序
+转发音频帧(后面句子的帧先到时暂存)。两者把事件放进同一个队列, 由 SSE
+生成器在请求线程中取出。模型生成第二句时, 第一句已经在合成和播放。
+
+事件: token {text}, sentence {index, text}, audio {sentence, seq, pcm(base64)},
+sentence_end {index}, error {stage, message}; 全部完成后是 reply {text}
+和 voice_done。
+"""
+import base64
+import queue
+import threading
+import time
+import uuid
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from app.chat.llm import create_chat_model
+from app.chat.sentences import SentenceSplitter
+from app.chat.voice import MSG_AUDIO, MSG_END, SAMPLE_RATE, VoiceError, create_voice_session
+
+Event = Tuple[str, Dict]
+
+
+class ReplyStream:
+    def __init__(self, model, messages: List[Dict], voice_factory=None):
+        self.model = model
+        self.messages = messages
+        self.voice_factory = voice_factory
+        self.started = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.first_audio: Optional[float] = None
+        self.text = ""
+        self.sentences: List[str] = []
+        self.failed = False
+        self._events: "queue.Queue[Event]" = queue.Queue()
+        self._cancel = threading.Event()
+        self._connected = threading.Event()
+        self._cond = threading.Condition()
+        self._tasks: List[str] = []
+        self._text_done = False
+        self._voice = None
+        threading.Thread(target=self._generate, name="reply-model", daemon=True).start()
+        if voice_factory is not None:
+            threading.Thread(target=self._speak, name="reply-voice", daemon=True).start()
+        else:
+            self._connected.set()
+
+    def events(self, heartbeat: float = 15.0) -> Iterator[Optional[Event]]:
+        """依次产出事件; 等待超过 heartbeat 秒时产出 None, 供调用方发送心跳"""
+        pending = {"reply", "voice_done"} if self.voice_factory is not None else {"reply"}
+        while pending:
+            try:
+                kind, data = self._events.get(timeout=heartbeat)
+            except queue.Empty:
+                yield None
+                continue
+            pending.discard(kind)
+            if kind == "token" and self.first_token is None:
+                self.first_token = time.perf_counter()
+            elif kind == "audio" and self.first_audio is None:
+                self.first_audio = time.perf_counter()
+            yield kind, data
+
+    def cancel(self):
+        self._cancel.set()
+        self._connected.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._voice is not None:
+            self._voice.close()
+
+    def timings(self) -> Dict:
+        def since(t):
+            return round((t - self.started) * 1000, 1) if t is not None else None
+        return {"ttftMs": since(self.first_token), "ttfaMs": since(self.first_audio),
+                "totalMs": since(time.perf_counter())}
+
+    def _generate(self):
+        splitter = SentenceSplitter()
+        try:
+            for token in self.model.stream(self.messages):
+                if self._cancel.is_set():
+                    return
+                self.text += token
+                self._events.put(("token", {"text": token}))
+                for sentence in splitter.feed(token):
+                    self._dispatch(sentence)
+            for sentence in splitter.flush():
+                self._dispatch(sentence)
+        except Exception as e:
+            self.failed = True
+            logger.warning(f"Reply generation failed: {e}")
+            self._events.put(("error", {"stage": "model", "message": str(e)}))
+        finally:
+            with self._cond:
+                self._text_done = True
+                self._cond.notify_all()
+            self._events.put(("reply", {"text": self.text}))
+
+    def _dispatch(self, sentence: str):
+        index = len(self.sentences)
+        self.sentences.append(sentence)
+        self._events.put(("sentence", {"index": index, "text": sentence}))
+        if self.voice_factory is None:
+            return
+        self._connected.wait()
+        if self._voice is None or self._cancel.is_set():
+            return
+        task_id = uuid.uuid4().hex[:8]
+        with self._cond:
+            self._tasks.append(task_id)
+            self._cond.notify_all()
+        try:
+            self._voice.send(task_id, sentence)
+        except VoiceError as e:
+            # 发送失败时接收线程会在 recv() 上得到同样的错误并结束
+            logger.warning(f"Voice dispatch failed: {e}")
+
+    def _speak(self):
+        try:
+            self._voice = self.voice_factory()
+        except (OSError, VoiceError) as e:
+            logger.warning(f"Voice server unavailable, replying with text only: {e}")
+            self._events.put(("error", {"stage": "voice", "message": str(e)}))
+        self._connected.set()
+        try:
+            if self._voice is not None:
+                self._relay()
+        except VoiceError as e:
+            if not self._cancel.is_set():
+                logger.warning(f"Voice stream interrupted: {e}")
+                self._events.put(("error", {"stage": "voice", "message": str(e)}))
+        finally:
+            if self._voice is not None:
+                self._voice.close()
+            self._events.put(("voice_done", {}))
+
+    def _relay(self):
+        """按句子顺序转发音频; 其他任务的帧先暂存, 轮到它时再发出"""
+        head = 0
+        seq = 0
+        held: Dict[str, List[Tuple[int, bytes]]] = {}
+        while True:
+            with self._cond:
+                while head >= len(self._tasks) and not self._text_done and not self._cancel.is_set():
+                    self._cond.wait()
+                if self._cancel.is_set() or (head >= len(self._tasks) and self._text_done):
+                    return
+            msg_type, task_id, content = self._voice.recv()
+            if msg_type not in (MSG_AUDIO, MSG_END):
+                continue
+            if task_id != self._tasks[head]:
+                held.setdefault(task_id, []).append((msg_type, content))
+                continue
+            frames = [(msg_type, content)]
+            while frames:
+                msg_type, content = frames.pop(0)
+                if msg_type == MSG_AUDIO:
+                    self._events.put(("audio", {
+                        "sentence": head, "seq": seq, "pcm": base64.b64encode(content).decode(),
+                    }))
+                    seq += 1
+                    continue
+                self._events.put(("sentence_end", {"index": head}))
+                head += 1
+                seq = 0
+                if head < len(self._tasks):
+                    frames = held.pop(self._tasks[head], []) + frames
+
+
+class ReplyStreamer:
+    """按配置创建对话模型和语音会话工厂, start() 开始一次流式回复"""
+
+    def __init__(self):
+        self.model = None
+        self.voice_factory = None
+        self.sample_rate = SAMPLE_RATE
+
+    def init_app(self, app):
+        self.model = create_chat_model(app.config)
+        backend = app.config.get("CHAT_TTS_BACKEND", "none")
+        self.voice_factory = partial(create_voice_session, app.config) if backend in ("voice", "fake") else None
+        if self.model is None:
+            logger.warning("CHAT_LLM_BACKEND is not configured, streamed chat replies are disabled")
+        else:
+            logger.info(f"Chat replies use {type(self.model).__name__}, voice backend {backend}")
+
+    def start(self, messages: List[Dict], voice: bool = True) -> ReplyStream:
+        return ReplyStream(self.model, messages, self.voice_factory if voice else None)
+
+
+streamer = ReplyStreamer()
@@ -0,0 +1,149 @@
+"""语音服务客户端
+
+与 dipal 客户端使用同一种 ##START/##END 帧: 1 字节消息类型 + 8 字节
+task_id + 4 字节序号 + 内容。每句话是一个任务: 发送 type-4 文本帧和 type-3
+结束帧, 服务端推送 type-2 PCM 音频帧, 以 type-3 结束。一个连接上可以同时有
+多个任务, recv() 返回的帧可能交错, 由调用方按 task_id 排序。
+
+FakeVoiceSession 是本地替身, 按设定的合成延迟和实时速度产出音频帧。
+"""
+import queue
+import socket
+import threading
+from typing import Tuple
+
+START_MARK = b"##START"
+END_MARK = b"##END"
+HEADER_LEN = 13
+SAMPLE_RATE = 16000
+
+MSG_AUTH, MSG_AUDIO, MSG_END, MSG_TEXT, MSG_STATUS = 1, 2, 3, 4, 5
+
+Frame = Tuple[int, str, bytes]
+
+
+class VoiceError(Exception):
+    pass
+
+
+def encode_frame(msg_type: int, task_id: str, seq_num: str, content=b"") -> bytes:
+    if isinstance(content, str):
+        content = content.encode()
+    return b"".join([START_MARK, bytes([msg_type]), task_id.encode().ljust(8), seq_num.zfill(4).encode(),
+                     content, END_MARK])
+
+
+class VoiceSession:
+    """一个已认证的语音服务 TCP 连接; send() 和 recv() 可以在不同线程中调用"""
+
+    def __init__(self, host: str, port: int, token: str, voice_id: str, timeout: float = 10.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self._buf = bytearray()
+        self._send_lock = threading.Lock()
+        self.sock.sendall(encode_frame(
+            MSG_AUTH, "00000000", "0000", f"{token}##voiceid:{voice_id}##lang:chinese##format:pcm"))
+        msg_type, _, content = self.recv()
+        if msg_type != MSG_STATUS or b"AUTH_OK" not in content:
+            self.close()
+            raise VoiceError(f"Voice server authentication failed: {content[:100]!r}")
+
+    def send(self, task_id: str, text: str):
+        with self._send_lock:
+            try:
+                self.sock.sendall(encode_frame(MSG_TEXT, task_id, "0000", text)
+                                  + encode_frame(MSG_END, task_id, "0001"))
+            except OSError as e:
+                raise VoiceError(str(e)) from e
+
+    def recv(self) -> Frame:
+        """阻塞直到收到一个完整的帧, 返回 (消息类型, task_id, 内容)"""
+        buf = self._buf
+        while True:
+            start = buf.find(START_MARK)
+            if start >= 0:
+                body = start + len(START_MARK)
+                end = buf.find(END_MARK, body + HEADER_LEN)
+                if end >= 0:
+                    frame = (buf[body], buf[body + 1:body + 9].decode(errors="replace").strip(),
+                             bytes(buf[body + HEADER_LEN:end]))
+                    del buf[:end + len(END_MARK)]
+                    return frame
+            try:
+                data = self.sock.recv(64 * 1024)
+            except OSError as e:
+                raise VoiceError(str(e)) from e
+            if not data:
+                raise VoiceError("Voice server closed the connection")
+            buf += data
+
+    def close(self):
+        try:
+            with self._send_lock:
+                self.sock.sendall(encode_frame(MSG_STATUS, "00000000", "0000", "##DISCONNECT"))
+        except OSError:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class FakeVoiceSession:
+    """本地语音替身: 每个任务 first_audio_ms 后开始, 按 chars_per_second 估算时长,
+    以 frame_ms 为一帧按 realtime 倍速推送 PCM, 多个任务依次合成"""
+
+    def __init__(self, first_audio_ms: float = 150.0, chars_per_second: float = 4.0,
+                 frame_ms: int = 200, realtime: float = 1.0):
+        self.first_audio_ms = first_audio_ms
+        self.chars_per_second = chars_per_second
+        self.frame_ms = frame_ms
+        self.realtime = realtime
+        self._frames: "queue.Queue[Frame]" = queue.Queue()
+        self._tasks: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+        self._closed = threading.Event()
+        samples = SAMPLE_RATE * frame_ms // 1000
+        self._pcm = b"".join(int(3000 * ((i % 80) - 40) / 40).to_bytes(2, "little", signed=True)
+                             for i in range(samples))
+        threading.Thread(target=self._synthesize, name="fake-voice", daemon=True).start()
+
+    def send(self, task_id: str, text: str):
+        if self._closed.is_set():
+            raise VoiceError("Session closed")
+        self._tasks.put((task_id, text))
+
+    def recv(self) -> Frame:
+        while True:
+            try:
+                return self._frames.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed.is_set():
+                    raise VoiceError("Session closed")
+
+    def close(self):
+        self._closed.set()
+
+    def _synthesize(self):
+        while not self._closed.is_set():
+            try:
+                task_id, text = self._tasks.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._closed.wait(self.first_audio_ms / 1000)
+            frames = max(1, round(len(text) / self.chars_per_second * 1000 / self.frame_ms))
+            for index in range(frames):
+                if self._closed.is_set():
+                    return
+                self._frames.put((MSG_AUDIO, task_id, self._pcm))
+                if self.realtime and index < frames - 1:
+                    self._closed.wait(self.frame_ms / 1000 / self.realtime)
+            self._frames.put((MSG_END, task_id, b""))
+
+
+def create_voice_session(config):
+    """按 CHAT_TTS_BACKEND 建立语音会话: voice 连接语音服务, fake 使用本地替身"""
+    if config.get("CHAT_TTS_BACKEND", "none") == "voice":
+        return VoiceSession(config["VOICE_SERVER_HOST"], config.get("VOICE_SERVER_PORT", 8009),
+                            config.get("VOICE_SERVER_TOKEN", ""), config.get("VOICE_ID", ""),
+                            timeout=config.get("VOICE_SERVER_TIMEOUT", 10))
+    return FakeVoiceSession()
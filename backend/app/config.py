@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from typing import Optional
 import os, pathlib
 
 load_dotenv(override=True)
@@ -8,10 +9,74 @@ class Settings(BaseModel):
     SECRET_KEY: str = os.getenv("SECRET_KEY") # type: ignore
     SQLALCHEMY_DATABASE_URI: str = os.getenv("DATABASE_URL") # type: ignore
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
+    # 连接池: 每个进程最多 DB_POOL_SIZE + DB_MAX_OVERFLOW 个连接, 取连接最多等 DB_POOL_TIMEOUT 秒
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 30))  # 秒
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))  # 秒, 连接使用超过该时长后重建
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_CONNECT_TIMEOUT: int = int(os.getenv("DB_CONNECT_TIMEOUT", 10))  # 秒
+    DB_STATEMENT_TIMEOUT: int = int(os.getenv("DB_STATEMENT_TIMEOUT", 0))  # 毫秒, PostgreSQL 的 statement_timeout, 0 不限制
+    # 只读副本, 角色查询和 /me 等 GET 接口从这里读
+    DATABASE_REPLICA_URL: Optional[str] = os.getenv("DATABASE_REPLICA_URL")
+    DB_REPLICA_STICKY_SECONDS: float = float(os.getenv("DB_REPLICA_STICKY_SECONDS", 2))  # 用户写入后这段时间内, 该用户的读请求仍走主库
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY") # type: ignore
+    # flask-restx 默认把未注册的异常转成 500, 开启后 JWT 错误交给 flask_jwt_extended 返回 401/422
+    PROPAGATE_EXCEPTIONS: bool = True
     JWT_ACCESS_TOKEN_EXPIRES: int = int(os.getenv("ACCESS_EXPIRES", 900))
     JWT_REFRESH_TOKEN_EXPIRES: int = int(os.getenv("REFRESH_EXPIRES", 604800))
+    # werkzeug 的哈希方法, 如 scrypt 或 pbkdf2:sha256:600000; 修改后用户下次登录时自动重新哈希
+    PASSWORD_HASH_METHOD: str = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))  # 哈希进程数, 0 为在请求线程中计算
+    PASSWORD_HASH_QUEUE: int = int(os.getenv("PASSWORD_HASH_QUEUE", 16))  # 排队加执行中的上限, 超出返回 429
+    PASSWORD_HASH_TIMEOUT: float = float(os.getenv("PASSWORD_HASH_TIMEOUT", 5))  # 秒
+    PROFILE_CACHE_TTL: int = int(os.getenv("PROFILE_CACHE_TTL", 30))  # 秒, /me 的用户资料缓存
+    PROFILE_CACHE_MAX_ENTRIES: int = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", 4096))
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL") # type: ignore
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND") # type: ignore
+    # 测试时可设 CELERY_BROKER_URL=memory:// 并开启 CELERY_ALWAYS_EAGER, 任务在进程内同步执行
+    CELERY_ALWAYS_EAGER: bool = os.getenv("CELERY_ALWAYS_EAGER", "false").lower() == "true"
+    REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
+    CACHE_TTL: int = int(os.getenv("CACHE_TTL", 300))
+    CACHE_LOCAL_TTL: int = int(os.getenv("CACHE_LOCAL_TTL", 5))  # 秒, 没有 Redis 时进程内缓存的有效期, 即其他 worker 修改后最多读到旧数据的时长
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+    EMOTION_BATCH_SIZE: int = int(os.getenv("EMOTION_BATCH_SIZE", 64))
+    EMOTION_BATCH_WAIT: int = int(os.getenv("EMOTION_BATCH_WAIT", 200))  # 毫秒
+    PHYSIO_BATCH_SIZE: int = int(os.getenv("PHYSIO_BATCH_SIZE", 500))
+    PHYSIO_FLUSH_INTERVAL: int = int(os.getenv("PHYSIO_FLUSH_INTERVAL", 1000))  # 毫秒
+    PHYSIO_QUEUE_SIZE: int = int(os.getenv("PHYSIO_QUEUE_SIZE", 50000))
+    LATEST_STATE_WINDOW_HOURS: int = int(os.getenv("LATEST_STATE_WINDOW_HOURS", 24))
+    LATEST_STATE_DB_CACHE_SECONDS: float = float(os.getenv("LATEST_STATE_DB_CACHE_SECONDS", 2))  # 没有 Redis 时从数据库读到的最新情绪在进程内缓存的时长
+    MONITOR_STREAM_INTERVAL: int = int(os.getenv("MONITOR_STREAM_INTERVAL", 1000))  # 毫秒, 同类事件的最短推送间隔
+    MONITOR_STREAM_HEARTBEAT: int = int(os.getenv("MONITOR_STREAM_HEARTBEAT", 15))  # 秒
+    CHAT_CONTEXT_MAX_TOKENS: int = int(os.getenv("CHAT_CONTEXT_MAX_TOKENS", 3000))  # 提示词加回复的总 token 预算
+    CHAT_CONTEXT_REPLY_TOKENS: int = int(os.getenv("CHAT_CONTEXT_REPLY_TOKENS", 512))  # 为回复预留的 token
+    CHAT_CONTEXT_MAX_TURNS: int = int(os.getenv("CHAT_CONTEXT_MAX_TURNS", 40))  # 每个会话窗口最多保留的消息数
+    CHAT_CONTEXT_MAX_SESSIONS: int = int(os.getenv("CHAT_CONTEXT_MAX_SESSIONS", 4096))
+    CHAT_CONTEXT_MAX_PERSONAS: int = int(os.getenv("CHAT_CONTEXT_MAX_PERSONAS", 512))
+    CHAT_MEMORY_RECALL: int = int(os.getenv("CHAT_MEMORY_RECALL", 3))  # 每轮检索并放入提示词的回忆条数, 0 关闭
+    CHAT_LLM_BACKEND: str = os.getenv("CHAT_LLM_BACKEND", "none")  # http 为 OpenAI 兼容接口, fake 为本地替身(仅开发和基准), none 时流式回复返回 503
+    CHAT_LLM_URL: str = os.getenv("CHAT_LLM_URL", "")  # 如 https://host/v1/chat/completions
+    CHAT_LLM_MODEL: str = os.getenv("CHAT_LLM_MODEL", "")
+    CHAT_LLM_API_KEY: str = os.getenv("CHAT_LLM_API_KEY", "")
+    CHAT_LLM_TIMEOUT: int = int(os.getenv("CHAT_LLM_TIMEOUT", 30))  # 秒
+    CHAT_TTS_BACKEND: str = os.getenv("CHAT_TTS_BACKEND", "none")  # voice(语音服务), fake(本地替身, 仅开发和基准) 或 none(不合成)
+    VOICE_SERVER_HOST: str = os.getenv("VOICE_SERVER_HOST", "ai.depthsdata.com")
+    VOICE_SERVER_PORT: int = int(os.getenv("VOICE_SERVER_PORT", 8009))
+    VOICE_SERVER_TOKEN: str = os.getenv("VOICE_SERVER_TOKEN", "")
+    VOICE_SERVER_TIMEOUT: int = int(os.getenv("VOICE_SERVER_TIMEOUT", 10))  # 秒
+    VOICE_ID: str = os.getenv("VOICE_ID", "Chinese (Mandarin)_Wise_Women")
+    MEMORY_IVF_THRESHOLD: int = int(os.getenv("MEMORY_IVF_THRESHOLD", 20000))  # 用户回忆数达到该值时用 IVF 近似检索, 0 为始终精确
+    MEMORY_IVF_NPROBE: int = int(os.getenv("MEMORY_IVF_NPROBE", 8))
+    MEMORY_INDEX_MAX_USERS: int = int(os.getenv("MEMORY_INDEX_MAX_USERS", 1024))  # 每个进程缓存索引的用户数
+    # Prometheus 指标, 开启后在 /metrics 输出; 设置 METRICS_TOKEN 后抓取需带 Authorization: Bearer <token>
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    METRICS_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", 10))  # 同一语句在一个请求中执行的次数
+    METRICS_CELERY_QUEUES: str = os.getenv("METRICS_CELERY_QUEUES", "celery")  # 逗号分隔, 抓取时查询积压长度
+    METRICS_FLUSH_INTERVAL: float = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))  # 秒, 配置了 Redis 时各 worker 把 HTTP/SQL 指标刷写到 Redis 的间隔
+    REPORT_EXPORT_DIR: str = os.getenv("REPORT_EXPORT_DIR", str(pathlib.Path(__file__).resolve().parents[1] / "exports"))
+    REPORT_EXPORT_TTL: int = int(os.getenv("REPORT_EXPORT_TTL", 24))  # 小时, 过期后文件被清理
+    REPORT_EXPORT_CHUNK_ROWS: int = int(os.getenv("REPORT_EXPORT_CHUNK_ROWS", 5000))  # 每次从游标取回的行数
 
 settings = Settings()
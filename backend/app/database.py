@@ -0,0 +1,297 @@
+"""数据库引擎配置: 连接池参数、只读副本路由和连接池计数
+
+engine_options() 把 Settings 中的 DB_* 配置转成 SQLALCHEMY_ENGINE_OPTIONS;
+配置了 DATABASE_REPLICA_URL 时注册名为 replica 的 bind, 加了 @read_replica
+的 GET 接口中的 SELECT 由 RoutingSession 发往副本。当前用户最近
+DB_REPLICA_STICKY_SECONDS 秒内提交过写入时仍读主库, 避免刚写入的数据因
+复制延迟读不到; 按 JWT 身份记录, 配置了 Redis 时其他 worker 的写入也算。
+没有用户身份的写入(Celery 任务、批量写入线程)不影响任何人的读路由。
+
+MeteredQueuePool 记录取连接的等待时间和正在等待的线程数, 连接池事件记录
+checkout/checkin/新建/失效次数, pool_metrics.stats() 汇总各个 bind。
+"""
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Dict, Optional
+
+from flask import g, has_app_context, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from loguru import logger
+from sqlalchemy import Select, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from .cache import TTLCache
+
+REPLICA_BIND = "replica"
+
+
+def engine_options(config, uri: Optional[str]) -> Dict:
+    """连接池参数; SQLite 使用 Flask-SQLAlchemy 的默认池, 只有 PostgreSQL 设置语句超时"""
+    if not uri or uri.startswith("sqlite"):
+        return {}
+    options = {
+        "poolclass": MeteredQueuePool,
+        "pool_size": config.get("DB_POOL_SIZE", 5),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": config.get("DB_POOL_PRE_PING", True),
+    }
+    if uri.startswith("postgresql"):
+        connect_args = {"connect_timeout": config.get("DB_CONNECT_TIMEOUT", 10)}
+        if config.get("DB_STATEMENT_TIMEOUT"):
+            connect_args["options"] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"
+        options["connect_args"] = connect_args
+    return options
+
+
+def configure(app):
+    """在 db.init_app() 之前调用, 生成主库和副本的引擎参数"""
+    config = app.config
+    options = dict(engine_options(config, config.get("SQLALCHEMY_DATABASE_URI")))
+    # 显式配置的 SQLALCHEMY_ENGINE_OPTIONS 优先
+    options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    replica = config.get("DATABASE_REPLICA_URL")
+    if replica:
+        binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+        binds[REPLICA_BIND] = {"url": replica, **engine_options(config, replica)}
+        config["SQLALCHEMY_BINDS"] = binds
+        recent_writes.init_app(app)
+
+
+def read_replica(fn):
+    """接口中的 SELECT 改从只读副本读取; 没有配置副本时不起作用"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        g.db_read_replica = True
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and clause._for_update_arg is None and _replica_requested()):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class RecentWrites:
+    """最近提交过写入的用户: 进程内一级, 可选 Redis 二级
+
+    每个用户只记录 DB_REPLICA_STICKY_SECONDS 秒, 到期后读请求回到副本。
+    Redis 中用 PX 让 key 同时过期, 其他 worker 的写入也能被查到。
+    """
+
+    def __init__(self):
+        self.redis = None
+        self.prefix = "ris:wrote:"
+        self.sticky = 2.0
+        self._local = TTLCache(maxsize=65536, ttl=2)
+
+    def init_app(self, app):
+        self.sticky = app.config.get("DB_REPLICA_STICKY_SECONDS", 2.0)
+        self._local = TTLCache(maxsize=65536, ttl=self.sticky)
+        redis_url = app.config.get("REDIS_URL")
+        if redis_url:
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+                self.redis.ping()
+            except Exception as e:
+                logger.warning(f"Read-your-writes tracking falls back to in-process store: {e}")
+                self.redis = None
+
+    def mark(self, user_id: str):
+        self._local.set(user_id, True)
+        if self.redis is not None:
+            try:
+                self.redis.set(self.prefix + user_id, 1, px=max(int(self.sticky * 1000), 1))
+            except Exception as e:
+                logger.warning(f"Redis write mark failed, other workers may read stale data: {e}")
+
+    def wrote(self, user_id: str) -> bool:
+        if self._local.get(user_id):
+            return True
+        if self.redis is not None:
+            try:
+                return bool(self.redis.exists(self.prefix + user_id))
+            except Exception as e:
+                logger.warning(f"Redis write mark lookup failed: {e}")
+        return False
+
+
+recent_writes = RecentWrites()
+
+
+def _current_user() -> Optional[str]:
+    """当前请求的 JWT 身份; 请求之外或未校验 JWT 时为 None"""
+    if not has_request_context():
+        return None
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def _replica_requested() -> bool:
+    if not (has_app_context() and g.get("db_read_replica", False)):
+        return False
+    # 每个请求只查一次, 请求内自己的写入在 _record_write 中更新
+    allowed = g.get("db_replica_allowed")
+    if allowed is None:
+        user_id = _current_user()
+        allowed = g.db_replica_allowed = user_id is None or not recent_writes.wrote(user_id)
+    return allowed
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flush(session, flush_context):
+    session.info["db_wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_statement(orm_execute_state):
+    # db.session.execute(insert(...)) 这类不经过 flush 的写入
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["db_wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_write(session):
+    if session.info.pop("db_wrote", False):
+        user_id = _current_user()
+        if user_id is not None:
+            recent_writes.mark(user_id)
+            g.db_replica_allowed = False
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _clear_write(session):
+    session.info.pop("db_wrote", None)
+
+
+class MeteredQueuePool(QueuePool):
+    """记录每次取连接的等待时间(含新建连接)、当前等待的线程数和超时次数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolCounters()
+
+    def _do_get(self):
+        metrics = self.metrics
+        with metrics.lock:
+            metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with metrics.lock:
+                metrics.waiting -= 1
+                metrics.timeouts += 1
+            raise
+        except BaseException:
+            with metrics.lock:
+                metrics.waiting -= 1
+            raise
+        waited = time.perf_counter() - started
+        with metrics.lock:
+            metrics.waiting -= 1
+            metrics.acquired += 1
+            metrics.wait_total += waited
+            metrics.wait_max = max(metrics.wait_max, waited)
+            metrics.wait_buckets[bisect_left(WAIT_BUCKETS, waited)] += 1
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+# 等待时间直方图的上界(秒), 最后一个桶是 +Inf
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidated = 0
+
+
+class PoolMetrics:
+    """按 bind 汇总连接池状态, 供监控接口读取"""
+
+    def __init__(self):
+        self._engines = {}
+
+    def init_app(self, app, db):
+        with app.app_context():
+            for key, engine in db.engines.items():
+                self.instrument(key or "default", engine)
+
+    def instrument(self, name: str, engine):
+        pool = engine.pool
+        counters = getattr(pool, "metrics", None)
+        if counters is None:
+            counters = PoolCounters()
+        self._engines[name] = (engine, counters)
+
+        def bump(field):
+            def listener(*args):
+                with counters.lock:
+                    setattr(counters, field, getattr(counters, field) + 1)
+            return listener
+
+        event.listen(engine, "checkout", bump("checkouts"))
+        event.listen(engine, "checkin", bump("checkins"))
+        event.listen(engine, "connect", bump("connects"))
+        event.listen(engine, "invalidate", bump("invalidated"))
+
+    def stats(self) -> Dict[str, Dict]:
+        result = {}
+        for name, (engine, counters) in self._engines.items():
+            pool = engine.pool
+            with counters.lock:
+                entry = {
+                    "checkouts": counters.checkouts,
+                    "checkins": counters.checkins,
+                    "connects": counters.connects,
+                    "invalidated": counters.invalidated,
+                    "timeouts": counters.timeouts,
+                    "waiting": counters.waiting,
+                    "waitTotalMs": round(counters.wait_total * 1000, 3),
+                    "waitMaxMs": round(counters.wait_max * 1000, 3),
+                    "waitAvgMs": round(counters.wait_total * 1000 / counters.acquired, 3) if counters.acquired else 0.0,
+                    "waitBuckets": dict(zip([str(b) for b in WAIT_BUCKETS] + ["+Inf"], counters.wait_buckets)),
+                }
+            # QueuePool 才有这些计数; SQLite 的 StaticPool/SingletonThreadPool 没有
+            if isinstance(pool, QueuePool):
+                entry.update({
+                    "size": pool.size(),
+                    "checkedIn": pool.checkedin(),
+                    "checkedOut": pool.checkedout(),
+                    "overflow": max(pool.overflow(), 0),
+                    "maxOverflow": pool._max_overflow,
+                })
+            result[name] = entry
+        return result
+
+
+pool_metrics = PoolMetrics()
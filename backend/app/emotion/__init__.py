@@ -0,0 +1 @@
+"""情绪分析: 文本与语音打分, 由 app.tasks.emotion 中的 Celery 任务批量调用"""
@@ -0,0 +1,61 @@
+from collections import deque
+from typing import Dict, Iterator, List, Tuple
+
+
+class Automaton:
+    """Aho-Corasick 多模式匹配自动机, 纯 Python 实现
+
+    构建后每个状态的转移表是 dict, 失配链在构建时已经展开进转移表,
+    所以扫描一段文本只需对每个字符做一次 dict 查找, 与词典大小无关。
+    """
+
+    def __init__(self, patterns: Dict[str, object]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[List[Tuple[int, object]]] = [[]]
+        for word, value in patterns.items():
+            self._add(word, value)
+        self._build()
+
+    def _add(self, word: str, value):
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._outputs.append([])
+            state = nxt
+        self._outputs[state].append((len(word), value))
+
+    def _build(self):
+        goto, outputs = self._goto, self._outputs
+        fail = [0] * len(goto)
+        order = []
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                # 第一层状态的失配状态是根
+                fail[nxt] = goto[f].get(ch, 0) if state else 0
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+        # 按 BFS 顺序把失配转移展开进 goto, 失配状态更浅, 总是先被展开; 扫描时不再回溯
+        for state in order:
+            for ch, nxt in goto[fail[state]].items():
+                goto[state].setdefault(ch, nxt)
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """依次产出 (起始位置, 结束位置, value), 包含相互重叠的匹配"""
+        goto, outputs = self._goto, self._outputs
+        root = goto[0]
+        state = 0
+        for end, ch in enumerate(text, 1):
+            state = goto[state].get(ch) or root.get(ch, 0)
+            if outputs[state]:
+                for length, value in outputs[state]:
+                    yield end - length, end, value
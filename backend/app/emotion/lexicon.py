@@ -0,0 +1,53 @@
+"""离线情绪词典
+
+EMOTION_TERMS 中每项为 (词, 极性, 唤醒度): 极性 -1..1, 唤醒度 0..1。
+NEGATORS 翻转紧随其后的情绪词, DEGREE_WORDS 按倍数放大或减弱。
+英文词按小写整词匹配, 不做词形还原, 常见的屈折形式单独列出。
+"""
+
+EMOTION_TERMS = (
+    # 积极
+    ("开心", 0.8, 0.6), ("高兴", 0.8, 0.6), ("快乐", 0.8, 0.6), ("愉快", 0.7, 0.5),
+    ("幸福", 0.9, 0.4), ("满意", 0.6, 0.3), ("满足", 0.6, 0.2), ("喜欢", 0.7, 0.5),
+    ("爱", 0.8, 0.6), ("温暖", 0.7, 0.3), ("感谢", 0.6, 0.3), ("谢谢", 0.5, 0.3),
+    ("感激", 0.7, 0.4), ("放心", 0.5, 0.1), ("安心", 0.6, 0.1), ("舒服", 0.6, 0.2),
+    ("轻松", 0.5, 0.2), ("平静", 0.3, 0.0), ("兴奋", 0.7, 0.9), ("激动", 0.6, 0.9),
+    ("期待", 0.6, 0.6), ("怀念", 0.3, 0.3), ("想念", 0.2, 0.4), ("美好", 0.7, 0.4),
+    ("不错", 0.5, 0.3), ("好", 0.4, 0.3), ("棒", 0.7, 0.6), ("哈哈", 0.6, 0.7),
+    ("有意思", 0.5, 0.5), ("骄傲", 0.6, 0.6), ("自豪", 0.7, 0.6), ("希望", 0.5, 0.4),
+    # 消极
+    ("难过", -0.7, 0.4), ("伤心", -0.8, 0.5), ("悲伤", -0.8, 0.4), ("痛苦", -0.9, 0.7),
+    ("孤独", -0.7, 0.2), ("寂寞", -0.6, 0.2), ("害怕", -0.7, 0.8), ("恐惧", -0.8, 0.9),
+    ("担心", -0.6, 0.6), ("焦虑", -0.7, 0.8), ("紧张", -0.5, 0.8), ("生气", -0.7, 0.9),
+    ("愤怒", -0.9, 1.0), ("烦", -0.5, 0.7), ("烦躁", -0.6, 0.8), ("失望", -0.6, 0.4),
+    ("绝望", -1.0, 0.5), ("委屈", -0.6, 0.5), ("后悔", -0.6, 0.5), ("累", -0.4, 0.2),
+    ("疲惫", -0.5, 0.1), ("无聊", -0.4, 0.1), ("痛", -0.6, 0.6), ("疼", -0.6, 0.6),
+    ("难受", -0.7, 0.5), ("不舒服", -0.6, 0.4), ("不好", -0.5, 0.4), ("糟糕", -0.7, 0.6),
+    ("讨厌", -0.7, 0.7), ("哭", -0.7, 0.6), ("想死", -1.0, 0.6), ("没意思", -0.5, 0.2),
+    # English
+    ("happy", 0.8, 0.6), ("glad", 0.6, 0.4), ("love", 0.8, 0.6), ("great", 0.7, 0.6),
+    ("good", 0.4, 0.3), ("nice", 0.5, 0.3), ("thanks", 0.5, 0.3), ("thank you", 0.6, 0.3),
+    ("calm", 0.3, 0.0), ("excited", 0.7, 0.9), ("hope", 0.5, 0.4), ("miss", 0.2, 0.4),
+    ("sad", -0.7, 0.4), ("lonely", -0.7, 0.2), ("afraid", -0.7, 0.8), ("scared", -0.7, 0.8),
+    ("worried", -0.6, 0.6), ("anxious", -0.7, 0.8), ("angry", -0.8, 0.9), ("upset", -0.6, 0.6),
+    ("tired", -0.4, 0.2), ("hurt", -0.6, 0.6), ("pain", -0.7, 0.6), ("bad", -0.5, 0.4),
+    ("terrible", -0.8, 0.6), ("hate", -0.8, 0.8), ("bored", -0.4, 0.1), ("cry", -0.7, 0.6),
+    ("loved", 0.8, 0.5), ("loves", 0.8, 0.6), ("hoping", 0.5, 0.4), ("missed", 0.2, 0.4),
+    ("crying", -0.7, 0.6), ("cried", -0.7, 0.6), ("painful", -0.7, 0.6), ("hopeless", -0.9, 0.3),
+)
+
+NEGATORS = ("不", "没", "没有", "别", "不太", "并不", "不是", "not", "no", "never", "don't")
+
+DEGREE_WORDS = (
+    ("很", 1.3), ("非常", 1.6), ("特别", 1.6), ("太", 1.5), ("真", 1.3), ("好", 1.2),
+    ("十分", 1.5), ("极", 1.8), ("超级", 1.7), ("有点", 0.7), ("有些", 0.7), ("稍微", 0.6),
+    ("very", 1.5), ("so", 1.4), ("really", 1.4), ("a bit", 0.7), ("slightly", 0.6),
+)
+
+# 支配度默认由极性推出(0.5 + 0.3 * 极性), 以下词单独指定, 0..1
+DOMINANCE_OVERRIDES = {
+    "生气": 0.7, "愤怒": 0.8, "讨厌": 0.65, "烦躁": 0.6, "骄傲": 0.8, "自豪": 0.8,
+    "害怕": 0.1, "恐惧": 0.05, "焦虑": 0.2, "担心": 0.25, "绝望": 0.05, "孤独": 0.2,
+    "委屈": 0.2, "哭": 0.2, "angry": 0.7, "hate": 0.65, "afraid": 0.1, "scared": 0.1,
+    "anxious": 0.2, "lonely": 0.2, "hopeless": 0.05, "crying": 0.2, "cried": 0.2,
+}
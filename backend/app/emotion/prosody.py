@@ -0,0 +1,193 @@
+"""流式韵律特征提取
+
+ProsodyTracker 逐块接收 16 位 PCM, 只保留不足一帧的尾部样本, 对新凑齐的
+帧用向量化的加窗运算一次算出能量、过零率和自相关基频, 并累计整段语音的
+统计量和最近几秒的滑动窗口, 内存占用与语音长度无关。
+
+本模块只依赖 NumPy, 不导入 app 包的其他部分: 客户端 dipal/prosody.py 按文件
+路径直接加载它做播放时的实时唤醒度估计, 两边共用这一份实现。
+"""
+from typing import Dict
+
+import numpy as np
+
+# 每帧 32ms, 帧移 16ms(16kHz 下)
+FRAME_MS = 32
+HOP_MS = 16
+# 基频搜索范围, 覆盖老年人男女声
+PITCH_MIN_HZ = 70
+PITCH_MAX_HZ = 400
+# 自相关峰值与零延迟之比超过该值视为浊音
+VOICING_THRESHOLD = 0.45
+# dBFS: 低于静音阈值的帧不计入浊音; 音节核要高于音节阈值
+SILENCE_DBFS = -45.0
+SYLLABLE_DBFS = -35.0
+# 两个音节核之间的最小间隔
+MIN_SYLLABLE_GAP_MS = 100
+
+
+class ProsodyTracker:
+    """增量韵律特征提取器
+
+    update(chunk) 处理新到的一块 PCM; summary() 返回整段语音的统计特征,
+    live() 返回最近 window_seconds 秒的特征, arousal() 由这些特征估计唤醒度。
+    """
+
+    def __init__(self, sample_rate: int = 16000, window_seconds: float = 3.0):
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * FRAME_MS // 1000
+        self.hop = sample_rate * HOP_MS // 1000
+        self.min_lag = sample_rate // PITCH_MAX_HZ
+        self.max_lag = sample_rate // PITCH_MIN_HZ
+        self.window = np.hanning(self.frame_len).astype(np.float32)
+        self.min_syllable_gap = MIN_SYLLABLE_GAP_MS // HOP_MS
+        # 滑动窗口: 最近若干帧的 (能量dB, 过零率, 基频, 是否浊音) 环形数组
+        self.window_frames = max(int(window_seconds * 1000 / HOP_MS), 1)
+        self._recent = np.zeros((self.window_frames, 4), dtype=np.float64)
+        self._recent_syllables = np.zeros(self.window_frames, dtype=np.bool_)
+        self.reset()
+
+    def reset(self):
+        """开始新的一段语音"""
+        self._tail = np.zeros(0, dtype=np.float32)
+        self.frames = 0
+        self.voiced_frames = 0
+        self.syllables = 0
+        self._energy_sum = 0.0
+        self._zcr_sum = 0.0
+        self._pitch_sum = 0.0
+        self._pitch_sumsq = 0.0
+        # 音节核检测需要跨块看前两帧的能量
+        self._prev_energy = np.full(2, -np.inf)
+        self._prev_voiced = False
+        self._last_syllable = -self.min_syllable_gap
+        self._recent[:] = 0.0
+        self._recent_syllables[:] = False
+
+    def update(self, chunk: np.ndarray) -> int:
+        """处理一块 int16 PCM, 返回本次新增的帧数"""
+        samples = np.concatenate([self._tail, np.asarray(chunk, dtype=np.float32) / 32768.0])
+        if len(samples) < self.frame_len:
+            self._tail = samples
+            return 0
+        count = 1 + (len(samples) - self.frame_len) // self.hop
+        frames = np.lib.stride_tricks.sliding_window_view(samples, self.frame_len)[::self.hop][:count]
+        self._tail = samples[count * self.hop:]
+
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        energy = 20.0 * np.log10(rms + 1e-9)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_len - 1)
+        pitch, voiced = self._pitch(frames, energy)
+
+        first = self.frames
+        self.frames += count
+        self._energy_sum += float(energy[voiced].sum())
+        self._zcr_sum += float(zcr.sum())
+        voiced_pitch = pitch[voiced]
+        self.voiced_frames += len(voiced_pitch)
+        self._pitch_sum += float(voiced_pitch.sum())
+        self._pitch_sumsq += float((voiced_pitch * voiced_pitch).sum())
+        syllables = self._syllables(energy, voiced, first)
+
+        # 写入滑动窗口
+        rows = np.arange(first, self.frames) % self.window_frames
+        if count > self.window_frames:
+            rows, energy, zcr, pitch, voiced, syllables = (
+                a[-self.window_frames:] for a in (rows, energy, zcr, pitch, voiced, syllables))
+        self._recent[rows] = np.column_stack([energy, zcr, pitch, voiced])
+        self._recent_syllables[rows] = syllables
+        return count
+
+    def _pitch(self, frames: np.ndarray, energy: np.ndarray):
+        """对一批帧用 FFT 自相关估计基频, 返回 (基频Hz, 是否浊音)"""
+        spectrum = np.fft.rfft(frames * self.window, n=2 * self.frame_len, axis=1)
+        acf = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, axis=1)[:, :self.max_lag + 1]
+        lags = acf[:, self.min_lag:]
+        best = np.argmax(lags, axis=1)
+        strength = lags[np.arange(len(lags)), best] / (acf[:, 0] + 1e-12)
+        voiced = (strength > VOICING_THRESHOLD) & (energy > SILENCE_DBFS)
+        pitch = np.where(voiced, self.sample_rate / (best + self.min_lag), 0.0)
+        return pitch, voiced
+
+    def _syllables(self, energy: np.ndarray, voiced: np.ndarray, first: int) -> np.ndarray:
+        """能量包络上的局部极大值(浊音且足够响)作为音节核, 用来估计语速"""
+        padded = np.concatenate([self._prev_energy, energy])
+        # padded[i+1] 是当前帧, 与前一帧和后一帧比较; 最后一帧要等下一块才能判断
+        peaks = np.zeros(len(energy), dtype=np.bool_)
+        if len(padded) >= 3:
+            middle = padded[1:-1]
+            is_peak = (middle > padded[:-2]) & (middle >= padded[2:]) & (middle > SYLLABLE_DBFS)
+            # is_peak[k] 对应 padded[k+1], 即当前块中的第 k-1 帧(k=0 为上一块最后一帧)
+            candidates = np.flatnonzero(is_peak) - 1
+            for idx in candidates:
+                frame_voiced = voiced[idx] if idx >= 0 else self._prev_voiced
+                if not frame_voiced or first + idx - self._last_syllable < self.min_syllable_gap:
+                    continue
+                self._last_syllable = first + idx
+                self.syllables += 1
+                if idx >= 0:
+                    peaks[idx] = True
+        self._prev_energy = padded[-2:]
+        self._prev_voiced = bool(voiced[-1])
+        return peaks
+
+    def _features(self, frames: int, voiced_frames: int, energy: float, zcr: float,
+                  pitch: float, pitch_std: float, syllables: int) -> Dict:
+        duration = frames * HOP_MS / 1000
+        return {
+            "duration": round(duration, 3),
+            "energy": round(energy, 2),  # dBFS, 只统计浊音帧
+            "zcr": round(zcr, 4),
+            "pitch": round(pitch, 1),  # Hz, 只统计浊音帧
+            "pitchStd": round(pitch_std, 1),
+            "voicedRatio": round(voiced_frames / frames, 4) if frames else 0.0,
+            "speakingRate": round(syllables / duration, 2) if duration else 0.0,  # 音节/秒, 含停顿
+        }
+
+    def summary(self) -> Dict:
+        """整段语音的统计特征"""
+        n, v = self.frames, self.voiced_frames
+        pitch = self._pitch_sum / v if v else 0.0
+        pitch_var = self._pitch_sumsq / v - pitch * pitch if v else 0.0
+        return self._features(
+            n, v, self._energy_sum / v if v else SILENCE_DBFS, self._zcr_sum / n if n else 0.0,
+            pitch, float(np.sqrt(max(pitch_var, 0.0))), self.syllables,
+        )
+
+    def live(self) -> Dict:
+        """最近 window_seconds 秒的特征"""
+        n = min(self.frames, self.window_frames)
+        if n == 0:
+            return self._features(0, 0, SILENCE_DBFS, 0.0, 0.0, 0.0, 0)
+        rows = np.arange(self.frames - n, self.frames) % self.window_frames
+        recent = self._recent[rows]
+        voiced = recent[:, 3] > 0
+        pitch = recent[voiced, 2]
+        syllables = self._recent_syllables[rows]
+        return self._features(
+            n, int(voiced.sum()), float(recent[voiced, 0].mean()) if voiced.any() else SILENCE_DBFS,
+            float(recent[:, 1].mean()),
+            float(pitch.mean()) if len(pitch) else 0.0, float(pitch.std()) if len(pitch) else 0.0,
+            int(syllables.sum()),
+        )
+
+    def arousal(self, live: bool = False) -> float:
+        """由音量、基频变化和语速估计 0-1 的唤醒度"""
+        features = self.live() if live else self.summary()
+        return arousal_from_features(features)
+
+
+def arousal_from_features(features: Dict) -> float:
+    """音量(-45..-10 dBFS)、基频标准差(0..60Hz)、语速(2..7 音节/秒)归一化后加权"""
+    def scale(value, low, high):
+        return min(max((value - low) / (high - low), 0.0), 1.0)
+
+    if not features["voicedRatio"]:
+        return 0.0
+    return round(
+        0.5 * scale(features["energy"], SILENCE_DBFS, -10.0)
+        + 0.25 * scale(features["pitchStd"], 0.0, 60.0)
+        + 0.25 * scale(features["speakingRate"], 2.0, 7.0),
+        4,
+    )
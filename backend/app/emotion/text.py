@@ -0,0 +1,131 @@
+import math
+from typing import Dict, List
+
+from .automaton import Automaton
+from .lexicon import DEGREE_WORDS, DOMINANCE_OVERRIDES, EMOTION_TERMS, NEGATORS
+
+MODEL_VERSION = "lexicon-ac-1.1"
+
+# 否定词/程度词与情绪词之间最多隔几个字符(英文的空格)仍视为修饰
+MODIFIER_GAP = 1
+# 否定后极性反转并减弱: "不开心" 没有 "难过" 那么消极
+NEGATION_FACTOR = -0.5
+
+
+def _compile(terms=EMOTION_TERMS, matcher=Automaton):
+    """把词典编译成匹配器(默认自动机), 每个词对应它的角色: term/neg/deg"""
+    roles: Dict[str, Dict] = {}
+    for word, polarity, arousal in terms:
+        dominance = DOMINANCE_OVERRIDES.get(word, 0.5 + 0.3 * polarity)
+        roles.setdefault(word, {})["term"] = (polarity, arousal, dominance)
+    for word in NEGATORS:
+        roles.setdefault(word, {})["neg"] = True
+    for word, multiplier in DEGREE_WORDS:
+        roles.setdefault(word, {})["deg"] = multiplier
+    return matcher(roles)
+
+
+_AUTOMATON = _compile()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+def _on_word_boundary(text: str, start: int, end: int) -> bool:
+    """英文词只按整词匹配: "hopeless" 里没有 "hope", "also" 里没有 "so"; 中文不受影响"""
+    if start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1]):
+        return False
+    if end < len(text) and _is_word_char(text[end - 1]) and _is_word_char(text[end]):
+        return False
+    return True
+
+
+def _select(matches):
+    """取最左最长且互不重叠的匹配, 例如 "不好" 优先于 "不" 和 "好" """
+    matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+    selected = []
+    last_end = 0
+    for start, end, roles in matches:
+        if start >= last_end:
+            selected.append((start, end, roles))
+            last_end = end
+    return selected
+
+
+def score_text(text: str) -> Dict:
+    """对单条文本打分, 返回与 EmotionResult 对应的字典"""
+    lowered = text.lower()
+    selected = _select([m for m in _AUTOMATON.iter(lowered) if _on_word_boundary(lowered, m[0], m[1])])
+    pos = neg = arousal_sum = dominance_sum = weight_sum = 0.0
+    keywords = []
+    negate, multiplier, modifier_end = False, 1.0, -1
+    for i, (start, end, roles) in enumerate(selected):
+        if modifier_end >= 0 and start - modifier_end > MODIFIER_GAP:
+            negate, multiplier = False, 1.0
+        term = roles.get("term")
+        # "好" 既是情绪词也是程度词: 紧跟着情绪词时按程度词处理("好开心")
+        if term and "deg" in roles and i + 1 < len(selected):
+            nxt_start, _, nxt_roles = selected[i + 1]
+            if "term" in nxt_roles and nxt_start - end <= MODIFIER_GAP:
+                term = None
+        if term is None:
+            if roles.get("neg"):
+                negate = not negate
+            if "deg" in roles:
+                multiplier *= roles["deg"]
+            modifier_end = end
+            continue
+        polarity, arousal, dominance = term
+        weight = polarity * multiplier * (NEGATION_FACTOR if negate else 1.0)
+        if weight > 0:
+            pos += weight
+        else:
+            neg -= weight
+        arousal_sum += arousal * multiplier
+        dominance_sum += dominance if not negate else 1.0 - dominance
+        weight_sum += 1
+        keyword = lowered[start:end]
+        if keyword not in keywords:
+            keywords.append(keyword)
+        negate, multiplier, modifier_end = False, 1.0, -1
+
+    total = pos + neg
+    net = pos - neg
+    # 情绪词越多越不中性; 没有情绪词时完全中性
+    neutral_score = math.exp(-2.0 * total)
+    pos_score = pos / total * (1 - neutral_score) if total else 0.0
+    neg_score = neg / total * (1 - neutral_score) if total else 0.0
+    scores = {"positive": pos_score, "negative": neg_score, "neutral": neutral_score}
+    emotion_type = max(scores, key=scores.get)
+    intensity = min(abs(net), 1.0) if emotion_type != "neutral" else 0.0
+    if weight_sum:
+        # 命中越多越可信, 积极消极混杂时降低
+        confidence = min(0.4 + 0.15 * weight_sum, 0.95) * (0.5 + 0.5 * abs(net) / total if total else 0.5)
+        arousal = arousal_sum / weight_sum
+        dominance = dominance_sum / weight_sum
+    else:
+        confidence, arousal, dominance = 0.3, 0.3, 0.5
+    return {
+        "type": emotion_type,
+        "intensity": round(intensity, 4),
+        "confidence": round(confidence, 4),
+        "analysis": {
+            "positiveScore": round(pos_score, 4),
+            "negativeScore": round(neg_score, 4),
+            "neutralScore": round(neutral_score, 4),
+            "keywords": keywords,
+            "sentiment": emotion_type,
+            # PAD 按文档取 1-10
+            "padScores": {
+                "pleasure": round(5.5 + 4.5 * math.tanh(net), 2),
+                "arousal": round(1 + 9 * min(arousal, 1.0), 2),
+                "dominance": round(1 + 9 * min(max(dominance, 0.0), 1.0), 2),
+            },
+        },
+    }
+
+
+def score_batch(texts: List[str]) -> List[Dict]:
+    """批量打分, 与 texts 一一对应; 自动机只在导入时构建一次, 每条文本线性扫描一遍"""
+    return [score_text(text) for text in texts]
@@ -0,0 +1,56 @@
+import wave
+from typing import BinaryIO, Dict
+
+import numpy as np
+
+from .prosody import SILENCE_DBFS, ProsodyTracker, arousal_from_features
+
+MODEL_VERSION = "prosody-1.0"
+
+# 每次从 WAV 读取的帧数(16kHz 下 200ms), 整段音频不会同时留在内存中
+READ_FRAMES = 3200
+
+
+def _volume(energy_dbfs: float) -> float:
+    """浊音段平均能量 -45..-10 dBFS 线性映射到 0-1"""
+    return min(max((energy_dbfs - SILENCE_DBFS) / (-10.0 - SILENCE_DBFS), 0.0), 1.0)
+
+
+def result_from_features(features: Dict) -> Dict:
+    """由韵律特征生成与 EmotionResult 对应的字典; 语音只估计唤醒度, 极性保持中性"""
+    arousal = arousal_from_features(features)
+    volume = _volume(features["energy"])
+    rate = features["speakingRate"]
+    return {
+        "type": "neutral",
+        "intensity": arousal,
+        "confidence": 0.5 if features["voicedRatio"] > 0.2 else 0.2,
+        "analysis": {
+            "voiceFeatures": {
+                "pitch": features["pitch"],
+                "tone": "high" if arousal > 0.6 else "low" if arousal < 0.25 else "normal",
+                "speed": rate,
+                "volume": round(volume, 4),
+            },
+            "prosody": features,
+            "transcription": None,
+            "sentiment": "neutral",
+            "padScores": {"arousal": round(1 + 9 * arousal, 2)},
+        },
+    }
+
+
+def analyze_wav(stream: BinaryIO) -> Dict:
+    """逐块读取 16 位 PCM WAV 并增量提取韵律特征"""
+    with wave.open(stream, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError("Only 16-bit PCM WAV is supported")
+        channels = wav.getnchannels()
+        tracker = ProsodyTracker(wav.getframerate())
+        while True:
+            data = wav.readframes(READ_FRAMES)
+            if not data:
+                break
+            # 多声道只取第一个声道
+            tracker.update(np.frombuffer(data, dtype="<i2")[::channels])
+    return result_from_features(tracker.summary())
@@ -6,7 +6,12 @@ from flask_jwt_extended import JWTManager
 from flask_restx import Api
 from celery import Celery
 
-db      = SQLAlchemy()
+from .cache import ResponseCache
+from .database import RoutingSession
+from .revocation import TokenDenylist
+
+# RoutingSession 把标记为只读的请求中的 SELECT 发往只读副本
+db      = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 ma      = Marshmallow()
 jwt     = JWTManager()
@@ -18,4 +23,10 @@ restx_api = Api(
     doc="/docs"      # Swagger UI
 )
 
-celery  = Celery(__name__)
\ No newline at end of file
+celery  = Celery(__name__)
+
+# 角色等读多写少数据的响应缓存（进程内 LRU，可选 Redis）
+cache   = ResponseCache()
+
+# 已吊销 token 的 jti（进程内，可选 Redis），登出时写入
+denylist = TokenDenylist()
@@ -0,0 +1 @@
+"""回忆检索: 本地向量索引(暴力 top-k 与可选 IVF)和全文检索, 供回忆对话每轮调用"""
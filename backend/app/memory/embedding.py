@@ -0,0 +1,56 @@
+"""离线文本向量
+
+不依赖外部模型: 中文按单字和相邻二字切分, 英文按小写单词切分, 用特征哈希
+映射到 DIM 维并做 L2 归一化, 点积即余弦相似度。同一套切分结果也写入
+memories.search_text, 供 PostgreSQL 全文检索使用(simple 配置不会切分中文)。
+"""
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+MODEL_VERSION = "hash-ngram-256"
+DIM = 256
+
+_CJK = re.compile(r"[㐀-鿿]+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokens(text: str) -> List[str]:
+    """中文二字词 + 英文单词; 只有一个汉字的片段保留该字"""
+    text = (text or "").lower()
+    result = []
+    for run in _CJK.findall(text):
+        if len(run) == 1:
+            result.append(run)
+        result.extend(run[i:i + 2] for i in range(len(run) - 1))
+    result.extend(_WORD.findall(text))
+    return result
+
+
+def search_text(text: str) -> str:
+    """写入 search_text 列的空格分隔词串"""
+    return " ".join(tokens(text))
+
+
+def _features(text: str) -> List[str]:
+    # 单字也参与向量, 只共享个别汉字的文本仍有一定相似度
+    return tokens(text) + list("".join(_CJK.findall((text or "").lower())))
+
+
+def embed(texts: Iterable[str]) -> np.ndarray:
+    """返回 (n, DIM) float32 矩阵, 每行 L2 归一化; 空文本为零向量"""
+    texts = list(texts)
+    matrix = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        counts = {}
+        for feature in _features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+        for feature, count in counts.items():
+            h = zlib.crc32(feature.encode("utf-8"))
+            # 最高位决定符号, 抵消哈希冲突带来的偏差; 词频取对数, 重复词不会压倒其他词
+            matrix[row, h % DIM] += (1.0 if h & 0x80000000 else -1.0) * (1.0 + np.log(count))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
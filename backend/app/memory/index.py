@@ -0,0 +1,221 @@
+"""内存中的向量索引
+
+向量需事先 L2 归一化, 相似度为点积。两种索引接口相同:
+add(ids, vectors) / remove(id) / search(queries, k) -> 每个查询一个 [(id, score), ...] 列表。
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+Hits = List[Tuple[str, float]]
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """scores: (m, q), 返回每列得分最高的 k 个行号, 形状 (k', q), 按得分降序"""
+    k = min(k, scores.shape[0])
+    if k < scores.shape[0]:
+        part = np.argpartition(-scores, k - 1, axis=0)[:k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[0])[:, None], scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, part, axis=0), axis=0)
+    return np.take_along_axis(part, order, axis=0)
+
+
+class FlatIndex:
+    """精确检索: 向量按行存在预分配的矩阵中, 查询时分块做矩阵乘法再取 top-k
+
+    多个查询一起算时是一次 (块行数 x 维数) @ (维数 x 查询数) 的乘法;
+    分块让临时得分矩阵的大小固定, 与向量总数无关。
+    """
+
+    def __init__(self, dim: int, block_rows: int = 65536):
+        self.dim = dim
+        self.block_rows = block_rows
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[:len(self._ids)]
+
+    @property
+    def ids(self) -> List[str]:
+        return self._ids
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        for item_id, vector in zip(ids, vectors):
+            row = self._rows.get(item_id)
+            if row is None:
+                row = len(self._ids)
+                if row == len(self._matrix):
+                    self._grow()
+                self._ids.append(item_id)
+                self._rows[item_id] = row
+            self._matrix[row] = vector
+
+    def remove(self, item_id: str) -> bool:
+        """把最后一行挪到被删除的位置, O(1)"""
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return False
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._ids.pop()
+        return True
+
+    def search(self, queries: np.ndarray, k: int) -> List[Hits]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        n = len(self._ids)
+        if n == 0 or k <= 0:
+            return [[] for _ in range(len(queries))]
+        best_rows, best_scores = None, None
+        for start in range(0, n, self.block_rows):
+            scores = self._matrix[start:min(start + self.block_rows, n)] @ queries.T
+            rows = _top_k(scores, k)
+            block_scores = np.take_along_axis(scores, rows, axis=0)
+            rows = rows + start
+            if best_rows is None:
+                best_rows, best_scores = rows, block_scores
+            else:
+                # 与之前各块的 top-k 合并
+                rows = np.concatenate([best_rows, rows])
+                block_scores = np.concatenate([best_scores, block_scores])
+                keep = _top_k(block_scores, k)
+                best_rows = np.take_along_axis(rows, keep, axis=0)
+                best_scores = np.take_along_axis(block_scores, keep, axis=0)
+        return [
+            [(self._ids[row], float(score)) for row, score in zip(best_rows[:, q], best_scores[:, q])]
+            for q in range(len(queries))
+        ]
+
+    def _grow(self):
+        capacity = max(64, len(self._matrix) * 2)
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        matrix[:len(self._matrix)] = self._matrix
+        self._matrix = matrix
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """球面 k-means: 按点积分配, 质心取均值后归一化"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        # 空桶重新取一个随机向量作为质心
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """倒排文件(IVF)近似检索: 向量按最近的质心分桶, 查询只扫描最近的 nprobe 个桶
+
+    增量构建: 攒够 train_size 条之前向量存在一个 FlatIndex 中并精确检索;
+    攒够后用 k-means 训练 sqrt(n) 个质心并分桶, 之后新增的向量直接放进最近
+    的桶。总数超过上次训练时的 retrain_factor 倍时重新训练, 保持桶的大小均衡。
+    """
+
+    def __init__(self, dim: int, nprobe: int = 8, train_size: int = 4096,
+                 retrain_factor: float = 4.0, max_train_sample: int = 65536):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.retrain_factor = retrain_factor
+        self.max_train_sample = max_train_sample
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_on = 0
+        self._pending = FlatIndex(dim)
+        self._lists: List[FlatIndex] = []
+        self._where: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._pending) + len(self._where)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not self.trained:
+            self._pending.add(ids, vectors)
+            if len(self._pending) >= self.train_size:
+                self.train()
+            return
+        for item_id in ids:
+            self._remove_from_list(item_id)
+        self._assign(list(ids), vectors)
+        if len(self) >= self.trained_on * self.retrain_factor:
+            self.train()
+
+    def remove(self, item_id: str) -> bool:
+        return self._pending.remove(item_id) or self._remove_from_list(item_id)
+
+    def train(self):
+        """用当前全部向量(超出 max_train_sample 时抽样)训练质心并重新分桶"""
+        ids, vectors = self._all()
+        if len(ids) == 0:
+            return
+        nlist = max(1, int(math.sqrt(len(ids))))
+        sample = vectors
+        if len(vectors) > self.max_train_sample:
+            rng = np.random.default_rng(len(vectors))
+            sample = vectors[rng.choice(len(vectors), self.max_train_sample, replace=False)]
+        self.centroids = _kmeans(sample, min(nlist, len(sample)))
+        self.trained_on = len(ids)
+        self._pending = FlatIndex(self.dim)
+        self._lists = [FlatIndex(self.dim) for _ in range(len(self.centroids))]
+        self._where = {}
+        self._assign(ids, vectors)
+
+    def search(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Hits]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if not self.trained:
+            return self._pending.search(queries, k)
+        nprobe = min(nprobe or self.nprobe, len(self._lists))
+        probes = _top_k(self.centroids @ queries.T, nprobe)
+        results = []
+        for q, query in enumerate(queries):
+            hits: Hits = []
+            for bucket in probes[:, q]:
+                hits.extend(self._lists[bucket].search(query, k)[0])
+            hits.sort(key=lambda hit: hit[1], reverse=True)
+            results.append(hits[:k])
+        return results
+
+    def _assign(self, ids: List[str], vectors: np.ndarray):
+        """把向量放进最近质心的桶; 分块计算, 避免 (n x nlist) 的得分矩阵过大"""
+        for start in range(0, len(ids), 65536):
+            block = vectors[start:start + 65536]
+            assign = np.argmax(block @ self.centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            buckets, first = np.unique(assign[order], return_index=True)
+            for bucket, rows in zip(buckets, np.split(order, first[1:])):
+                bucket_ids = [ids[start + r] for r in rows]
+                self._lists[bucket].add(bucket_ids, block[rows])
+                self._where.update(dict.fromkeys(bucket_ids, int(bucket)))
+
+    def _remove_from_list(self, item_id: str) -> bool:
+        bucket = self._where.pop(item_id, None)
+        return bucket is not None and self._lists[bucket].remove(item_id)
+
+    def _all(self) -> Tuple[List[str], np.ndarray]:
+        parts = [self._pending] + self._lists
+        ids = [item_id for part in parts for item_id in part.ids]
+        vectors = np.concatenate([part.vectors for part in parts]) if ids else np.empty((0, self.dim), np.float32)
+        return ids, vectors
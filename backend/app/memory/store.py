@@ -0,0 +1,153 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import func, or_, select
+
+from app.extensions import db
+from app.memory import embedding
+from app.memory.index import FlatIndex, IVFIndex
+from app.models.memory import SEARCH_VECTOR, TS_CONFIG, Memory
+
+# (条数, 最大 updated_at), 用来判断缓存的索引是否过期
+Version = Tuple[int, Optional[datetime]]
+
+
+def encode(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def decode(raw: bytes) -> np.ndarray:
+    return np.frombuffer(raw, dtype=np.float32)
+
+
+class MemoryIndex:
+    """每个用户一份内存中的回忆向量索引, 回忆对话每轮检索时不再逐行读取向量
+
+    每次检索先用一条走 (user_id, updated_at) 索引的聚合查询确认缓存没有过期
+    (其他 worker 的写入也能发现), 过期时才重新加载该用户的向量。
+    用户的回忆数达到 MEMORY_IVF_THRESHOLD 时改用 IVF 近似索引, 0 表示始终精确检索。
+    本进程的写入通过 apply() 增量更新索引, 不需要重新加载。
+    """
+
+    def __init__(self):
+        self.ivf_threshold = 20000
+        self.nprobe = 8
+        self.max_users = 1024
+        self.loads = 0
+        self.hits = 0
+        self._users: Dict[str, Tuple[Version, object]] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ivf_threshold = app.config.get("MEMORY_IVF_THRESHOLD", 20000)
+        self.nprobe = app.config.get("MEMORY_IVF_NPROBE", 8)
+        self.max_users = app.config.get("MEMORY_INDEX_MAX_USERS", 1024)
+
+    def search(self, user_id: str, text: str, k: int) -> List[Tuple[str, float]]:
+        """返回与 text 最相似的 k 条回忆 [(memory_id, score), ...]"""
+        index = self._index_for(user_id)
+        query = embedding.embed([text])
+        # 索引可能正被 apply() 原地修改, 检索时持锁; 单个用户的检索是毫秒级
+        with self._lock:
+            if isinstance(index, IVFIndex):
+                return index.search(query, k, self.nprobe)[0]
+            return index.search(query, k)[0]
+
+    def apply(self, user_id: str, upserts: Sequence[Tuple[str, bytes, datetime]] = (), removed: Sequence[str] = ()):
+        """本进程写入提交后调用, upserts 为 (memory_id, 向量字节, updated_at)
+
+        已缓存的索引原地更新; 如果期间其他进程也写入了(版本对不上), 直接丢弃缓存。
+        """
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is None:
+                return
+            (_, newest), index = cached
+            for memory_id in removed:
+                index.remove(memory_id)
+            if upserts:
+                index.add([u[0] for u in upserts], np.stack([decode(u[1]) for u in upserts]))
+                newest = max([u[2] for u in upserts] + ([newest] if newest else []))
+            expected = (len(index), newest)
+        actual = _version(user_id)
+        with self._lock:
+            if actual == expected and self._users.get(user_id, (None, None))[1] is index:
+                self._users[user_id] = (actual, index)
+            else:
+                self._users.pop(user_id, None)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self):
+        return {"users": len(self._users), "loads": self.loads, "hits": self.hits}
+
+    def _index_for(self, user_id: str):
+        version = _version(user_id)
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+        started = time.perf_counter()
+        rows = db.session.execute(
+            select(Memory.id, Memory.embedding).where(Memory.user_id == user_id, Memory.embedding.is_not(None))
+        ).all()
+        index = IVFIndex(embedding.DIM) if self.ivf_threshold and len(rows) >= self.ivf_threshold else FlatIndex(embedding.DIM)
+        if rows:
+            index.add([row.id for row in rows], np.stack([decode(row.embedding) for row in rows]))
+        with self._lock:
+            if len(self._users) >= self.max_users and user_id not in self._users:
+                # 简单地丢掉最早加载的用户
+                self._users.pop(next(iter(self._users)))
+            self._users[user_id] = (version, index)
+            self.loads += 1
+        logger.debug(f"Memory index for user {user_id} loaded: {len(rows)} vectors in {time.perf_counter() - started:.3f}s")
+        return index
+
+
+def _version(user_id: str) -> Version:
+    count, newest = db.session.execute(
+        select(func.count(), func.max(Memory.updated_at)).where(Memory.user_id == user_id)
+    ).one()
+    return count, newest
+
+
+def keyword_search(user_id: str, text: str, k: int) -> List[Tuple[str, float]]:
+    """关键词检索: PostgreSQL 上用 search_text 的 tsvector GIN 索引并按 ts_rank 排序,
+    其他数据库退化为对每个词做 LIKE 匹配
+
+    中文按二字词切分, 查询里的相邻字组合("家院")常常不在原文中, 所以词之间是
+    OR 关系, 命中词越多 ts_rank 越高。
+    """
+    words = list(dict.fromkeys(embedding.tokens(text)))
+    if not words:
+        return []
+    if db.engine.dialect.name == "postgresql":
+        # 词只包含汉字、字母和数字, 加引号后直接拼成 tsquery
+        query = func.to_tsquery(TS_CONFIG, " | ".join(f"'{word}'" for word in words))
+        rank = func.ts_rank(SEARCH_VECTOR, query)
+        stmt = (select(Memory.id, rank).where(Memory.user_id == user_id, SEARCH_VECTOR.op("@@")(query))
+                .order_by(rank.desc()).limit(k))
+        return [(row[0], float(row[1])) for row in db.session.execute(stmt)]
+    stmt = select(Memory.id).where(Memory.user_id == user_id, or_(*[
+        Memory.search_text.like(f"%{word}%") for word in words
+    ])).order_by(Memory.occurred_at.desc()).limit(k)
+    return [(memory_id, 1.0) for memory_id in db.session.execute(stmt).scalars()]
+
+
+def search_memories(user_id: str, text: str, k: int = 5, mode: str = "semantic") -> List[Tuple[Memory, float]]:
+    """检索用户的回忆, 返回按得分降序的 [(Memory, score), ...]"""
+    hits = keyword_search(user_id, text, k) if mode == "keyword" else memory_index.search(user_id, text, k)
+    if not hits:
+        return []
+    rows = {m.id: m for m in Memory.query.filter(Memory.id.in_([memory_id for memory_id, _ in hits]))}
+    return [(rows[memory_id], score) for memory_id, score in hits if memory_id in rows]
+
+
+memory_index = MemoryIndex()
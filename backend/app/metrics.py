@@ -0,0 +1,500 @@
+"""Prometheus 文本格式的运行指标, METRICS_ENABLED 开启后由 /metrics 提供
+
+关闭时(默认) init_app 不注册任何钩子, 没有额外开销。开启后记录:
+
+- 每个路由(URL 规则, 如 /api/v1/characters/<string:character_id>)按方法
+  和状态码的响应耗时直方图, 以及正在处理的请求数。耗时截止到 after_request,
+  SSE 等流式响应只计到响应头发出为止。
+- 每个请求执行的 SQL 条数和耗时(SQLAlchemy 游标事件)。同一条语句在一个
+  请求里执行达到 METRICS_N_PLUS_ONE_THRESHOLD 次视为疑似 N+1, 计数并对每个
+  (路由, 语句) 记一次警告日志。
+- Celery 任务按任务名和结束状态的耗时直方图, 以及抓取时各队列的积压长度。
+  配置了 REDIS_URL 时任务耗时累加在 Redis 哈希中, worker 进程记录的数据
+  也能从 Web 进程的 /metrics 看到; 否则只有本进程(如 eager 模式)的任务。
+- app.database 的连接池计数和取连接等待时间分布。
+
+HTTP 和 SQL 指标先记在进程内。gunicorn 下 /metrics 每次由任意一个 worker
+响应, 各 worker 的计数互不相关, 直接输出会被 Prometheus 当成不断重置:
+
+- 配置了 REDIS_URL 时, 每个 worker 每 METRICS_FLUSH_INTERVAL 秒把新增的计数
+  累加到 Redis 哈希, /metrics 输出所有 worker 的合计(加上本进程尚未刷写的
+  部分), 和 Celery 任务耗时一样是全局的, 直接按 rate() 计算即可。
+- 没有 Redis 时 HTTP/SQL 序列带 pid 标签, 每个 worker 是独立的序列, 不会
+  互相覆盖。随机落到某个 worker 的抓取会让其他 worker 的序列暂时缺失, 需要
+  完整数据时应给每个 worker 单独抓取, 或配置 REDIS_URL。
+
+正在处理的请求数和连接池指标始终是响应抓取的那个进程的即时值。
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import Response, abort, request
+from loguru import logger
+from sqlalchemy import event
+
+from app.database import WAIT_BUCKETS, pool_metrics
+
+# 秒
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+# 每个请求的 SQL 条数
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = "<unmatched>"
+# 已经警告过的 (路由, 语句) 最多记这么多, 之后不再记日志, 只计数
+MAX_N_PLUS_ONE_WARNINGS = 1024
+
+# Histogram 的一条序列: 各桶的计数(非累积, 最后一个是 +Inf) 和观测值之和
+Series = Tuple[List[int], float]
+
+
+class Histogram:
+    """线程安全的直方图, 按标签值分序列"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values: Tuple[str, ...], amount: float):
+        index = bisect_left(self.buckets, amount)
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += amount
+
+    def series(self) -> Dict[Tuple[str, ...], Series]:
+        with self._lock:
+            return {values: (list(counts), total) for values, (counts, total) in self._series.items()}
+
+    def render(self, pid: Optional[str] = None) -> List[str]:
+        labels, series = _with_pid(self.labels, self.series(), pid)
+        return render_histogram(self.name, self.help, labels, self.buckets, series)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, values: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self, pid: Optional[str] = None) -> List[str]:
+        labels, samples = _with_pid(self.labels, self.samples(), pid)
+        return render_samples(self.name, self.help, "counter", labels, samples)
+
+
+class SharedMetric:
+    """把进程内 Histogram/Counter 的增量定期累加到 Redis 哈希, 输出时读取全部进程的合计
+
+    哈希字段为标签值加槽位(直方图的桶序号或 sum, 计数器为 value), 用制表符分隔。
+    只刷写上次刷写之后的增量, 进程内的序列本身一直累加。
+    """
+
+    def __init__(self, metric, redis, prefix: str = "ris:metrics:"):
+        self.metric = metric
+        self.redis = redis
+        self.key = prefix + metric.name
+        self._flushed: Dict[Tuple[str, ...], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _slots(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        if isinstance(self.metric, Histogram):
+            return {values: {**{str(i): c for i, c in enumerate(counts)}, "sum": total}
+                    for values, (counts, total) in self.metric.series().items()}
+        return {values: {"value": value} for values, value in self.metric.samples().items()}
+
+    def flush(self):
+        with self._lock:
+            current = self._slots()
+            pipe = self.redis.pipeline(transaction=False)
+            pending = 0
+            for values, slots in current.items():
+                flushed = self._flushed.get(values, {})
+                for slot, amount in slots.items():
+                    delta = amount - flushed.get(slot, 0)
+                    if delta:
+                        field = "\t".join(values + (slot,))
+                        if isinstance(delta, int):
+                            pipe.hincrby(self.key, field, delta)
+                        else:
+                            pipe.hincrbyfloat(self.key, field, delta)
+                        pending += 1
+            if pending:
+                pipe.execute()
+            self._flushed = current
+
+    def totals(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """Redis 中的合计加上本进程尚未刷写的增量"""
+        totals: Dict[Tuple[str, ...], Dict[str, float]] = {}
+        for field, value in self.redis.hgetall(self.key).items():
+            parts = (field.decode() if isinstance(field, bytes) else field).split("\t")
+            value = value.decode() if isinstance(value, bytes) else value
+            totals.setdefault(tuple(parts[:-1]), {})[parts[-1]] = float(value) if "." in value else int(value)
+        with self._lock:
+            current, flushed = self._slots(), self._flushed
+            for values, slots in current.items():
+                entry = totals.setdefault(values, {})
+                for slot, amount in slots.items():
+                    entry[slot] = entry.get(slot, 0) + amount - flushed.get(values, {}).get(slot, 0)
+        return totals
+
+    def render(self) -> List[str]:
+        metric, totals = self.metric, self.totals()
+        if isinstance(metric, Histogram):
+            series = {values: ([int(slots.get(str(i), 0)) for i in range(len(metric.buckets) + 1)],
+                               float(slots.get("sum", 0.0)))
+                      for values, slots in totals.items()}
+            return render_histogram(metric.name, metric.help, metric.labels, metric.buckets, series)
+        samples = {values: slots.get("value", 0) for values, slots in totals.items()}
+        return render_samples(metric.name, metric.help, "counter", metric.labels, samples)
+
+
+def _with_pid(labels: Tuple[str, ...], samples: Dict[Tuple, object], pid: Optional[str]):
+    """没有跨进程汇总时给每条序列加上 pid 标签"""
+    if pid is None:
+        return labels, samples
+    return labels + ("pid",), {values + (pid,): value for values, value in samples.items()}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_samples(name: str, help: str, kind: str, labels: Tuple[str, ...],
+                   samples: Dict[Tuple, float]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for values, value in sorted(samples.items()):
+        lines.append(f"{name}{_labels(labels, values)} {_number(value)}")
+    return lines
+
+
+def render_histogram(name: str, help: str, labels: Tuple[str, ...], buckets: Tuple[float, ...],
+                     series: Dict[Tuple, Series]) -> List[str]:
+    """桶计数在这里转成 Prometheus 要求的累积形式"""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+    bounds = [_number(float(b)) for b in buckets] + ["+Inf"]
+    names = labels + ("le",)
+    for values, (counts, total) in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(names, values + (bound,))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels, values)} {_number(float(total))}")
+        lines.append(f"{name}_count{_labels(labels, values)} {cumulative}")
+    return lines
+
+
+class RequestState:
+    """一个请求的计时和 SQL 统计, 通过 ContextVar 与当前线程关联"""
+    __slots__ = ("started", "queries", "sql_seconds", "sql_started", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.sql_started = 0.0
+        self.statements: Dict[str, int] = {}
+
+
+_current: ContextVar[Optional[RequestState]] = ContextVar("ris_request_metrics", default=None)
+
+
+class TaskTimings:
+    """Celery 任务耗时; 配置了 Redis 时累加在 Redis 哈希里, 各进程共享"""
+
+    def __init__(self):
+        self.redis = None
+        self.key = "ris:metrics:celery_tasks"
+        self.local = Histogram(
+            "ris_celery_task_duration_seconds", "Celery 任务执行耗时", ("task", "state"), TASK_BUCKETS)
+
+    def observe(self, task: str, state: str, seconds: float):
+        if self.redis is not None:
+            prefix = f"{task}\t{state}\t"
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hincrby(self.key, prefix + str(bisect_left(TASK_BUCKETS, seconds)), 1)
+                pipe.hincrbyfloat(self.key, prefix + "sum", seconds)
+                pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Redis task metrics update failed, recording locally: {e}")
+        self.local.observe((task, state), seconds)
+
+    def series(self) -> Dict[Tuple[str, ...], Series]:
+        series = self.local.series()
+        if self.redis is None:
+            return series
+        try:
+            fields = self.redis.hgetall(self.key)
+        except Exception as e:
+            logger.warning(f"Redis task metrics read failed: {e}")
+            return series
+        shared: Dict[Tuple[str, ...], List] = {}
+        for field, value in fields.items():
+            task, state, slot = (field.decode() if isinstance(field, bytes) else field).split("\t")
+            entry = shared.setdefault((task, state), [[0] * (len(TASK_BUCKETS) + 1), 0.0])
+            if slot == "sum":
+                entry[1] = float(value)
+            else:
+                entry[0][int(slot)] = int(value)
+        # Redis 暂时不可用时记在本进程的部分也要算上
+        for values, (counts, total) in series.items():
+            entry = shared.setdefault(values, [[0] * (len(TASK_BUCKETS) + 1), 0.0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += total
+        return {values: (counts, total) for values, (counts, total) in shared.items()}
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.token = ""
+        self.n_plus_one_threshold = 10
+        self.celery = None
+        self.queues: List[str] = []
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._warned = set()
+        self._task_started: Dict[str, float] = {}
+        self.requests = Histogram(
+            "ris_http_request_duration_seconds", "HTTP 请求耗时(到响应头发出)",
+            ("method", "route", "status"), LATENCY_BUCKETS)
+        self.queries = Histogram(
+            "ris_http_request_sql_queries", "每个 HTTP 请求执行的 SQL 条数", ("route",), QUERY_COUNT_BUCKETS)
+        self.sql_time = Histogram(
+            "ris_http_request_sql_duration_seconds", "每个 HTTP 请求的 SQL 总耗时", ("route",), SQL_LATENCY_BUCKETS)
+        self.n_plus_one = Counter(
+            "ris_sql_n_plus_one_total", "同一语句在一个请求中重复执行达到阈值的次数", ("route",))
+        self.tasks = TaskTimings()
+        # 配置了 Redis 时 HTTP/SQL 指标跨进程汇总, 由后台线程定期刷写
+        self.shared: List[SharedMetric] = []
+        self.flush_interval = 5.0
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid = None
+
+    def init_app(self, app, db, celery):
+        self.enabled = app.config.get("METRICS_ENABLED", False)
+        if not self.enabled:
+            return
+        self.token = app.config.get("METRICS_TOKEN", "")
+        self.n_plus_one_threshold = app.config.get("METRICS_N_PLUS_ONE_THRESHOLD", 10)
+        self.queues = [q.strip() for q in app.config.get("METRICS_CELERY_QUEUES", "celery").split(",") if q.strip()]
+        self.celery = None if app.config.get("CELERY_ALWAYS_EAGER") else celery
+        redis_url = app.config.get("REDIS_URL")
+        if redis_url:
+            try:
+                import redis
+                self.tasks.redis = redis.Redis.from_url(redis_url)
+                self.tasks.redis.ping()
+            except Exception as e:
+                logger.warning(f"Task metrics fall back to in-process store: {e}")
+                self.tasks.redis = None
+        self.flush_interval = app.config.get("METRICS_FLUSH_INTERVAL", 5.0)
+        if self.tasks.redis is not None:
+            self.shared = [SharedMetric(metric, self.tasks.redis)
+                           for metric in (self.requests, self.queries, self.sql_time, self.n_plus_one)]
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/metrics", "metrics", self.view)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+        from celery.signals import task_postrun, task_prerun
+        task_prerun.connect(self._task_prerun, weak=False, dispatch_uid="ris_metrics_prerun")
+        task_postrun.connect(self._task_postrun, weak=False, dispatch_uid="ris_metrics_postrun")
+
+    # ---- HTTP 请求 ----
+
+    def _before_request(self):
+        self._ensure_flusher()
+        _current.set(RequestState())
+        with self._in_flight_lock:
+            self.in_flight += 1
+
+    def _after_request(self, response):
+        self._finish(response.status_code)
+        return response
+
+    def _teardown_request(self, exc=None):
+        # 未处理的异常不经过 after_request
+        self._finish(500)
+
+    def _finish(self, status: int):
+        state = _current.get()
+        if state is None:
+            return
+        _current.set(None)
+        elapsed = time.perf_counter() - state.started
+        with self._in_flight_lock:
+            self.in_flight -= 1
+        rule = request.url_rule
+        route = rule.rule if rule is not None else UNMATCHED_ROUTE
+        self.requests.observe((request.method, route, str(status)), elapsed)
+        self.queries.observe((route,), state.queries)
+        self.sql_time.observe((route,), state.sql_seconds)
+        if state.statements:
+            statement, count = max(state.statements.items(), key=lambda item: item[1])
+            if count >= self.n_plus_one_threshold:
+                self._report_n_plus_one(route, statement, count)
+
+    def _report_n_plus_one(self, route: str, statement: str, count: int):
+        self.n_plus_one.inc((route,))
+        key = (route, statement)
+        if key in self._warned or len(self._warned) >= MAX_N_PLUS_ONE_WARNINGS:
+            return
+        self._warned.add(key)
+        logger.warning(f"Possible N+1 query on {request.method} {route}: executed {count} times: {statement[:300]}")
+
+    def _ensure_flusher(self):
+        # 线程在第一个请求时才启动, 并且 fork 出的每个 worker 各自一个
+        if not self.shared or self._flusher_pid == os.getpid():
+            return
+        with self._in_flight_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            for shared in self.shared:
+                try:
+                    shared.flush()
+                except Exception as e:
+                    logger.warning(f"Redis metrics flush failed, will retry: {e}")
+
+    # ---- Celery ----
+
+    def _task_prerun(self, task_id=None, task=None, **kwargs):
+        self._task_started[task_id] = time.perf_counter()
+
+    def _task_postrun(self, task_id=None, task=None, state=None, **kwargs):
+        started = self._task_started.pop(task_id, None)
+        if started is None or task is None:
+            return
+        self.tasks.observe(task.name, state or "UNKNOWN", time.perf_counter() - started)
+
+    def queue_lengths(self) -> Dict[Tuple[str], int]:
+        """抓取时向 broker 查询各队列的消息数; broker 不可用时不输出"""
+        if self.celery is None or not self.queues:
+            return {}
+        lengths = {}
+        try:
+            with self.celery.connection_for_read() as connection:
+                connection.ensure_connection(max_retries=1, interval_start=0, timeout=2)
+                channel = connection.default_channel
+                for queue in self.queues:
+                    try:
+                        lengths[(queue,)] = channel.queue_declare(queue=queue, passive=True).message_count
+                    except Exception as e:
+                        # 还没有任务投递过的队列在 broker 中不存在
+                        logger.debug(f"Celery queue {queue} length unavailable: {e}")
+        except Exception as e:
+            logger.warning(f"Celery broker unavailable for queue metrics: {e}")
+        return lengths
+
+    # ---- 输出 ----
+
+    def render(self) -> str:
+        lines = render_samples("ris_http_requests_in_flight", "正在处理的 HTTP 请求数", "gauge",
+                               (), {(): self.in_flight})
+        lines += self._render_http()
+        lines += render_histogram("ris_celery_task_duration_seconds", "Celery 任务执行耗时",
+                                  ("task", "state"), TASK_BUCKETS, self.tasks.series())
+        lines += render_samples("ris_celery_queue_length", "Celery 队列中等待的消息数", "gauge",
+                                ("queue",), self.queue_lengths())
+        lines += self._render_pools()
+        return "\n".join(lines) + "\n"
+
+    def _render_http(self) -> List[str]:
+        local = (self.requests, self.queries, self.sql_time, self.n_plus_one)
+        if self.shared:
+            try:
+                return [line for shared in self.shared for line in shared.render()]
+            except Exception as e:
+                logger.warning(f"Redis metrics read failed, serving this worker's metrics: {e}")
+        pid = str(os.getpid())
+        return [line for metric in local for line in metric.render(pid)]
+
+    def _render_pools(self) -> List[str]:
+        pools = pool_metrics.stats()
+        bind = ("bind",)
+        lines = []
+        for name, field, kind, help in (
+            ("ris_db_pool_checkouts_total", "checkouts", "counter", "从连接池取出连接的次数"),
+            ("ris_db_pool_connects_total", "connects", "counter", "新建的数据库连接数"),
+            ("ris_db_pool_invalidated_total", "invalidated", "counter", "失效的连接数"),
+            ("ris_db_pool_timeouts_total", "timeouts", "counter", "取连接超过 DB_POOL_TIMEOUT 的次数"),
+            ("ris_db_pool_waiting", "waiting", "gauge", "正在等待连接的线程数"),
+            ("ris_db_pool_size", "size", "gauge", "连接池大小"),
+            ("ris_db_pool_checked_out", "checkedOut", "gauge", "已借出的连接数"),
+            ("ris_db_pool_overflow", "overflow", "gauge", "超出 pool_size 的连接数"),
+        ):
+            samples = {(key,): stats[field] for key, stats in pools.items() if field in stats}
+            lines += render_samples(name, help, kind, bind, samples)
+        waits = {
+            (key,): (list(stats["waitBuckets"].values()), stats["waitTotalMs"] / 1000)
+            for key, stats in pools.items()
+        }
+        lines += render_histogram("ris_db_pool_wait_seconds", "取连接的等待时间", bind, WAIT_BUCKETS, waits)
+        return lines
+
+    def view(self):
+        if self.token and request.headers.get("Authorization") != f"Bearer {self.token}":
+            abort(401)
+        return Response(self.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    state = _current.get()
+    if state is not None:
+        state.sql_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    state = _current.get()
+    if state is None:
+        return
+    state.sql_seconds += time.perf_counter() - state.sql_started
+    state.queries += 1
+    # 参数是绑定变量, 循环中逐条查询时语句文本相同
+    state.statements[statement] = state.statements.get(statement, 0) + 1
+
+
+metrics = Metrics()
@@ -20,5 +20,14 @@ class Character(db.Model):
     default_scene = db.Column(db.Text)  # 如果场景脚本内容可能很长
     default_script = db.Column(db.Text)  # 使用 Text 类型
     is_public = db.Column(db.Boolean, default=True)
+    created_by = db.Column(db.String(36), db.ForeignKey("users.id"), index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # 列表接口按 (created_at, id) 做游标分页, 过滤条件放在索引最左侧
+    __table_args__ = (
+        db.Index("ix_characters_created_at_id", "created_at", "id"),
+        db.Index("ix_characters_is_public_created_at_id", "is_public", "created_at", "id"),
+        db.Index("ix_characters_mbti_type_created_at_id", "mbti_type", "created_at", "id"),
+        db.Index("ix_characters_zodiac_sign_created_at_id", "zodiac_sign", "created_at", "id"),
+    )
\ No newline at end of file
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from app.extensions import db
+
+class ChatMessage(db.Model):
+    """聊天消息, PostgreSQL 上按 created_at 按月范围分区
+
+    分区表的主键必须包含分区键, 所以主键是 (id, created_at)。
+    """
+    __tablename__ = "chat_messages"
+    __table_args__ = (
+        db.Index("ix_chat_messages_user_character_created", "user_id", "character_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    created_at = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow)
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
+    character_id = db.Column(db.String(36), db.ForeignKey("characters.id"), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    sender = db.Column(db.String(20), nullable=False)  # user, assistant
+    message_type = db.Column(db.String(20), nullable=False, default="text")  # text, voice, image
+    message_metadata = db.Column("metadata", db.JSON)  # metadata 是 SQLAlchemy 保留属性名
+    parent_message_id = db.Column(db.String(36))  # 分区表无法被外键引用, 这里只存 id
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+    @classmethod
+    def insert_turn(cls, user_id: str, character_id: str, message: dict, reply: dict = None):
+        """一条 INSERT 同时写入用户消息和助手回复, 返回插入的行
+
+        message/reply 是列值字典(content, sender, message_type, message_metadata)。
+        """
+        now = datetime.utcnow()
+        first_id = str(uuid4())
+        turns = [(message, first_id, now, None)]
+        if reply is not None:
+            # 回复时间比提问晚 1 微秒, 保证按 created_at 排序时顺序稳定
+            turns.append((reply, str(uuid4()), now + timedelta(microseconds=1), first_id))
+        # 多行 VALUES 要求每行的键完全一致
+        rows = [{
+            "id": row_id,
+            "created_at": created_at,
+            "user_id": user_id,
+            "character_id": character_id,
+            "content": values["content"],
+            "sender": values["sender"],
+            "message_type": values.get("message_type") or "text",
+            "message_metadata": values.get("message_metadata"),
+            "parent_message_id": parent_id,
+            "is_deleted": False,
+        } for values, row_id, created_at, parent_id in turns]
+        # 多行 VALUES + RETURNING, 一次往返
+        stmt = insert(cls).values(rows).returning(cls)
+        return db.session.scalars(stmt).all()
@@ -0,0 +1,26 @@
+from datetime import datetime
+from uuid import uuid4
+
+from app.extensions import db
+
+class EmotionResult(db.Model):
+    """情绪分析结果, 由 Celery 任务批量写入"""
+    __tablename__ = "emotion_results"
+    __table_args__ = (
+        db.Index("ix_emotion_results_user_created", "user_id", "created_at"),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    task_id = db.Column(db.String(36), unique=True, nullable=False)  # 提交分析时返回给客户端的任务 id
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
+    character_id = db.Column(db.String(36))
+    session_id = db.Column(db.String(64))
+    input_type = db.Column(db.String(10), nullable=False)  # text, voice
+    input_data = db.Column(db.Text)
+    emotion_type = db.Column(db.String(20), nullable=False)  # positive, negative, neutral
+    intensity = db.Column(db.Float, nullable=False)
+    confidence = db.Column(db.Float, nullable=False)
+    analysis = db.Column(db.JSON)
+    processing_time = db.Column(db.Integer)  # 毫秒
+    model_version = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
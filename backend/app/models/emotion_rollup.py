@@ -0,0 +1,38 @@
+from app.extensions import db
+
+# 汇总的分数: 正/负/中性得分(0-1) 和 PAD 三维(1-10)
+# 语音结果只有唤醒度, 所以每个分数单独计数
+METRICS = ("positive", "negative", "neutral", "pleasure", "arousal", "dominance")
+EMOTION_TYPES = ("positive", "negative", "neutral")
+GRANULARITIES = ("hour", "day")
+
+
+def _metric_columns(cls):
+    for metric in METRICS:
+        setattr(cls, f"{metric}_n", db.Column(db.Integer, nullable=False, default=0))
+        setattr(cls, f"{metric}_sum", db.Column(db.Float, nullable=False, default=0.0))
+        setattr(cls, f"{metric}_sumsq", db.Column(db.Float, nullable=False, default=0.0))
+    return cls
+
+
+class EmotionRollup(db.Model):
+    """情绪分析结果按小时/天预聚合的桶, 报表接口只读这张表
+
+    每个分数保存 计数/和/平方和, 任意多个桶相加后即可得到均值和标准差。
+    主键 (user_id, granularity, bucket_start) 即按用户查时间范围的索引,
+    bucket_start 为 UTC 整点(hour)或零点(day)。
+    """
+    __tablename__ = "emotion_rollups"
+
+    user_id = db.Column(db.String(36), primary_key=True)
+    granularity = db.Column(db.String(5), primary_key=True)  # hour, day
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    # 按 emotion_type 的条数
+    positive_count = db.Column(db.Integer, nullable=False, default=0)
+    negative_count = db.Column(db.Integer, nullable=False, default=0)
+    neutral_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+_metric_columns(EmotionRollup)
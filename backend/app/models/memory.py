@@ -0,0 +1,40 @@
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import func, text
+
+from app.extensions import db
+
+class Memory(db.Model):
+    """患者的回忆条目
+
+    search_text 是切分好的词串(中文二字词), embedding 是 float32 向量的字节,
+    两者在写入时由 app.memory.embedding 生成。
+    """
+    __tablename__ = "memories"
+    __table_args__ = (
+        db.Index("ix_memories_user_occurred", "user_id", "occurred_at"),
+        # 向量索引用 (数量, 最大 updated_at) 判断缓存是否过期
+        db.Index("ix_memories_user_updated", "user_id", "updated_at"),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
+    character_id = db.Column(db.String(36), db.ForeignKey("characters.id"))
+    content = db.Column(db.Text, nullable=False)
+    occurred_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 回忆发生的时间
+    importance = db.Column(db.SmallInteger, nullable=False, default=5)  # 1-10
+    memory_type = db.Column(db.String(20), nullable=False, default="daily")  # happy, sad, important, daily, nostalgic, fearful
+    tags = db.Column(db.JSON)
+    search_text = db.Column(db.Text, nullable=False, default="")
+    embedding = db.Column(db.LargeBinary)
+    embedding_model = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# PostgreSQL 全文检索: 查询里的表达式必须与索引表达式一致才能用上 GIN 索引
+# 中文已在 search_text 中切成二字词, 用不做词形处理的 simple 配置即可
+TS_CONFIG = text("'simple'")
+SEARCH_VECTOR = func.to_tsvector(TS_CONFIG, Memory.search_text)
+db.Index("ix_memories_search", SEARCH_VECTOR, postgresql_using="gin").ddl_if(dialect="postgresql")
@@ -0,0 +1,39 @@
+from datetime import date, datetime
+from typing import List
+
+from sqlalchemy import text
+
+from app.extensions import db
+
+
+def month_start(value: date, offset: int = 0) -> date:
+    """value 所在月份往后 offset 个月的第一天"""
+    index = value.year * 12 + value.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def ensure_monthly_partitions(table: str, start: date = None, months: int = 3) -> List[str]:
+    """为按 created_at 范围分区的表创建从 start 所在月起的 months 个月分区
+
+    只在 PostgreSQL 上生效, SQLite 等没有分区的数据库直接返回空列表。
+    超出已建分区范围的数据落在 <table>_default 分区; 注意默认分区中已有
+    某月数据时无法再创建该月分区, 所以应提前(例如每月定时)创建未来的分区。
+    """
+    if db.engine.dialect.name != "postgresql":
+        return []
+    first = month_start(start or datetime.utcnow().date())
+    created = []
+    with db.engine.begin() as conn:
+        for i in range(months):
+            lower, upper = month_start(first, i), month_start(first, i + 1)
+            name = partition_name(table, lower)
+            conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            created.append(name)
+    return created
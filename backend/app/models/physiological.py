@@ -0,0 +1,23 @@
+from app.extensions import db
+
+class PhysiologicalSample(db.Model):
+    """可穿戴设备上报的生理数据, 只追加; PostgreSQL 上按 recorded_at 按月范围分区
+
+    没有代理主键: (user_id, recorded_at, device_id) 既是主键也是按用户查时间范围的索引,
+    设备重传的同一条数据在写入时被忽略。
+    """
+    __tablename__ = "physiological_data"
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (recorded_at)"},
+    )
+
+    user_id = db.Column(db.String(36), primary_key=True)  # 不加外键, 高频写入时省去逐行外键检查
+    recorded_at = db.Column(db.DateTime, primary_key=True)  # 设备采样时间(UTC), 即接口中的 timestamp
+    device_id = db.Column(db.String(100), primary_key=True, default="")
+    heart_rate = db.Column(db.SmallInteger)
+    stress_level = db.Column(db.REAL)  # 1-10
+    engagement = db.Column(db.REAL)  # 1-10
+    arousal = db.Column(db.REAL)  # 1-10
+    systolic = db.Column(db.SmallInteger)
+    diastolic = db.Column(db.SmallInteger)
+    temperature = db.Column(db.REAL)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from uuid import uuid4
+
+from app.extensions import db
+
+class ReportExport(db.Model):
+    """报告导出任务, id 同时是 Celery 任务 id; 生成的文件保存在 REPORT_EXPORT_DIR"""
+    __tablename__ = "report_exports"
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False, index=True)
+    requested_by = db.Column(db.String(36), nullable=False)
+    format = db.Column(db.String(10), nullable=False)  # csv, json, columnar
+    sections = db.Column(db.JSON, nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)  # 包含当天
+    status = db.Column(db.String(10), nullable=False, default="pending")  # pending, running, completed, failed, expired
+    file_name = db.Column(db.String(255))
+    size = db.Column(db.BigInteger)
+    row_count = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, nullable=False)
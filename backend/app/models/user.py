@@ -11,4 +11,7 @@ class User(db.Model):
     last_login = db.Column(db.DateTime)
     email = db.Column(db.String(120), unique=True, nullable=False)
     user_type = db.Column(db.String(20), nullable=False)  # patient, caregiver, admin
-    profile = db.Column(db.JSON, nullable=True)  # Store user profile as JSON
\ No newline at end of file
+    profile = db.Column(db.JSON, nullable=True)  # Store user profile as JSON
+
+# 邮箱不区分大小写唯一; lower(email) 查询可以直接使用该索引
+db.Index("ix_users_email_lower", db.func.lower(User.email), unique=True)
@@ -0,0 +1 @@
+"""实时监测: 生理数据批量写入、最新状态索引与推送"""
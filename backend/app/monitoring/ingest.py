@@ -0,0 +1,136 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.batching import MicroBatcher
+from app.extensions import db
+from app.models.physiological import PhysiologicalSample
+from app.monitoring.latest import latest_state
+
+# 接口字段 -> (列名, 类型, 取值范围)
+SAMPLE_FIELDS = {
+    "heartRate": ("heart_rate", int, (20, 250)),
+    "stressLevel": ("stress_level", float, (1, 10)),
+    "engagement": ("engagement", float, (1, 10)),
+    "arousal": ("arousal", float, (1, 10)),
+    "temperature": ("temperature", float, (30, 45)),
+}
+# 血压(mmHg) 写入 SmallInteger 列; 超出范围的值会让整批 INSERT 失败, 必须逐条拦下
+BLOOD_PRESSURE_RANGE = (30, 300)
+
+
+def parse_sample(data, user_id: str) -> Dict:
+    """把一条上报数据校验并转换为列值, 不合法时抛出 ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("sample must be a JSON object")
+    row = {"user_id": user_id, "device_id": str(data.get("deviceId") or "")[:100]}
+    for name, (column, kind, (low, high)) in SAMPLE_FIELDS.items():
+        value = data.get(name)
+        if value is None:
+            row[column] = None
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name} must be a number")
+        if not low <= value <= high:
+            raise ValueError(f"{name} must be between {low} and {high}")
+        row[column] = kind(value)
+    pressure = data.get("bloodPressure") or {}
+    if not isinstance(pressure, dict):
+        raise ValueError("bloodPressure must be an object")
+    row["systolic"] = pressure.get("systolic")
+    row["diastolic"] = pressure.get("diastolic")
+    low, high = BLOOD_PRESSURE_RANGE
+    for key in ("systolic", "diastolic"):
+        value = row[key]
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"bloodPressure.{key} must be an integer")
+        if not low <= value <= high:
+            raise ValueError(f"bloodPressure.{key} must be between {low} and {high}")
+    row["recorded_at"] = _parse_timestamp(data.get("timestamp"))
+    return row
+
+
+def _parse_timestamp(value) -> datetime:
+    """ISO 8601 时间统一转成 UTC 的 naive datetime, 缺省为当前时间"""
+    if value is None:
+        return datetime.utcnow()
+    if not isinstance(value, str):
+        raise ValueError("timestamp must be an ISO 8601 string")
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class PhysiologicalIngestor:
+    """生理数据写入缓冲: 请求只把数据放进有界队列, 后台按条数或时间整批写库
+
+    每批一条 executemany INSERT(SQLAlchemy 会合并成多行 VALUES), 主键冲突
+    (设备重传)直接忽略; 队列满时丢弃新数据并计入 dropped。
+    """
+
+    def __init__(self):
+        self.app = None
+        self.batcher = None
+        self.written = 0  # 已提交写库的条数, 含被忽略的重复数据
+        self.failed = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.batcher = MicroBatcher(
+            self._flush,
+            max_size=app.config.get("PHYSIO_BATCH_SIZE", 500),
+            max_wait=app.config.get("PHYSIO_FLUSH_INTERVAL", 1000) / 1000,
+            max_pending=app.config.get("PHYSIO_QUEUE_SIZE", 50000),
+            name="physio-ingestor",
+        )
+
+    def submit(self, rows: List[Dict]) -> int:
+        """放入队列并更新最新状态索引, 返回被接受的条数"""
+        accepted = self.batcher.submit_many(rows)
+        latest_state.update_physiological(rows[:accepted])
+        return accepted
+
+    def flush(self):
+        self.batcher.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "accepted": self.batcher.accepted,
+            "dropped": self.batcher.dropped,
+            "pending": self.batcher.pending(),
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batcher.flushed_batches,
+        }
+
+    def _insert_statement(self):
+        dialect = db.engine.dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(PhysiologicalSample).on_conflict_do_nothing()
+        if dialect == "sqlite":
+            return sqlite.insert(PhysiologicalSample).on_conflict_do_nothing()
+        return insert(PhysiologicalSample)
+
+    def _flush(self, rows: List[Dict]):
+        # 在后台线程中执行, 需要自己的应用上下文
+        with self.app.app_context():
+            try:
+                db.session.execute(self._insert_statement(), rows)
+                db.session.commit()
+                self.written += len(rows)
+            except Exception as e:
+                db.session.rollback()
+                self.failed += len(rows)
+                logger.error(f"Physiological batch of {len(rows)} samples failed: {e}")
+
+
+ingestor = PhysiologicalIngestor()
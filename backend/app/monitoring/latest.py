@@ -0,0 +1,234 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+from sqlalchemy import and_, func, select
+
+from app.cache import TTLCache
+from app.extensions import db
+from app.models.emotion_result import EmotionResult
+from app.models.physiological import PhysiologicalSample
+from app.monitoring.pubsub import broker
+
+KINDS = ("emotion", "physiological")
+
+
+def _iso(value: datetime) -> str:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def emotion_state(row: Dict) -> Dict:
+    """EmotionResult 列值 -> 当前情绪状态(接口字段)"""
+    return {
+        "type": row["emotion_type"],
+        "intensity": row["intensity"],
+        "confidence": row["confidence"],
+        "lastUpdated": _iso(row["created_at"]),
+    }
+
+
+def physiological_state(row: Dict) -> Dict:
+    """PhysiologicalSample 列值 -> 最新生理数据(接口字段)"""
+    return {
+        "heartRate": row["heart_rate"],
+        "stressLevel": row["stress_level"],
+        "engagement": row["engagement"],
+        "arousal": row["arousal"],
+        "deviceId": row["device_id"],
+        "timestamp": _iso(row["recorded_at"]),
+    }
+
+
+class LatestStateIndex:
+    """按 userId 保存最新情绪和最新生理数据, 读取 O(1) 且不访问数据库
+
+    写入时(生理数据入队、情绪结果落库)更新; 每个进程第一次读取时从数据库
+    重建最近 LATEST_STATE_WINDOW_HOURS 小时内的数据。配置了 REDIS_URL 时
+    状态保存在 Redis 哈希中, 多个 worker 和 Celery 进程看到的是同一份,
+    只有第一个进程会重建; 写入时在 Lua 脚本里比较时间, 乱序或补传的旧数据
+    不会覆盖更新的状态。
+
+    没有 Redis 时每个进程只看得到自己写入的数据。情绪结果由 Celery worker
+    写入, 所以非 eager 模式下 Web 进程从数据库读取最新一条情绪, 结果在进程内
+    缓存 LATEST_STATE_DB_CACHE_SECONDS 秒, 同一用户的轮询在这段时间内不再访问
+    数据库, 情绪状态最多滞后这么久; 监测 SSE 也收不到情绪事件。Redis 读取失败时
+    同样改从数据库读取, 而不是返回只含本进程写入的状态。多 worker 或独立
+    Celery worker 的部署应配置 REDIS_URL。
+    """
+
+    def __init__(self):
+        self.redis = None
+        self.prefix = "ris:latest:"
+        self.window_hours = 24
+        self._local: Dict[str, Dict[str, Dict]] = {kind: {} for kind in KINDS}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._set_newer = None
+        # 写入发生在其他进程、本进程看不到的状态, 读取时查数据库并短暂缓存
+        self._db_kinds = set()
+        self._db_cache = TTLCache(maxsize=16384, ttl=2)
+
+    def init_app(self, app):
+        self.window_hours = app.config.get("LATEST_STATE_WINDOW_HOURS", 24)
+        self._db_cache = TTLCache(maxsize=16384, ttl=app.config.get("LATEST_STATE_DB_CACHE_SECONDS", 2))
+        redis_url = app.config.get("REDIS_URL")
+        if redis_url:
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(redis_url)
+                self.redis.ping()
+                self._set_newer = self.redis.register_script(SET_NEWER_SCRIPT)
+            except Exception as e:
+                logger.warning(f"Latest state index falls back to in-process store: {e}")
+                self.redis = None
+        if self.redis is None and not app.config.get("CELERY_ALWAYS_EAGER"):
+            self._db_kinds = {"emotion"}
+            logger.warning(f"REDIS_URL is not set: current emotion is read from the database "
+                           f"(cached for {self._db_cache.ttl}s) and emotion events are not streamed to monitors")
+
+    def get(self, kind: str, user_id: str) -> Optional[Dict]:
+        if kind in self._db_kinds:
+            return self._read_db_cached(kind, user_id)
+        self._ensure_loaded()
+        if self.redis is not None:
+            try:
+                value = self.redis.hget(self.prefix + kind, user_id)
+                return json.loads(value) if value else None
+            except Exception as e:
+                # 本进程的状态只含自己的写入, 多进程下可能早已过时
+                logger.warning(f"Redis read failed, reading latest {kind} from the database: {e}")
+                return self._read_db_cached(kind, user_id)
+        return self._local[kind].get(user_id)
+
+    def update(self, kind: str, states: Dict[str, Dict], time_key: str, publish: bool = True):
+        """states: userId -> 状态; 只保留时间更新的那条, 并向监听者发布"""
+        if not states:
+            return
+        with self._lock:
+            local = self._local[kind]
+            newer = {}
+            for user_id, state in states.items():
+                current = local.get(user_id)
+                if current is None or current[time_key] <= state[time_key]:
+                    local[user_id] = newer[user_id] = state
+        if kind in self._db_kinds:
+            for user_id, state in newer.items():
+                self._db_cache.set(f"{kind}:{user_id}", (state,))
+        if publish:
+            for user_id, state in newer.items():
+                broker.publish(kind, user_id, state)
+        if self.redis is not None:
+            args = [time_key]
+            for user_id, state in states.items():
+                args += [user_id, json.dumps(state)]
+            try:
+                # 本进程的 newer 不代表 Redis 中的状态, 由脚本逐个比较时间
+                self._set_newer(keys=[self.prefix + kind], args=args)
+            except Exception as e:
+                logger.warning(f"Redis mirror update failed: {e}")
+
+    def update_emotions(self, rows: Iterable[Dict], publish: bool = True):
+        self.update("emotion", _latest_by_user(rows, "created_at", emotion_state), "lastUpdated", publish)
+
+    def update_physiological(self, rows: Iterable[Dict], publish: bool = True):
+        self.update("physiological", _latest_by_user(rows, "recorded_at", physiological_state), "timestamp", publish)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+        if self.redis is not None:
+            try:
+                # 只有第一个进程负责从数据库重建 Redis 中的状态
+                if not self.redis.set(self.prefix + "loaded", "1", nx=True):
+                    return
+            except Exception as e:
+                logger.warning(f"Redis unavailable during rebuild: {e}")
+        self.rebuild()
+
+    def _read_db_cached(self, kind: str, user_id: str) -> Optional[Dict]:
+        key = f"{kind}:{user_id}"
+        # 缓存值包一层元组, 区分 "没有记录" 和未命中
+        hit = self._db_cache.get(key)
+        if hit is not None:
+            return hit[0]
+        state = self._read_db(kind, user_id)
+        self._db_cache.set(key, (state,))
+        return state
+
+    def _read_db(self, kind: str, user_id: str) -> Optional[Dict]:
+        model, time_column, to_state = SOURCES[kind]
+        since = datetime.utcnow() - timedelta(hours=self.window_hours)
+        stmt = (
+            select(model.__table__)
+            .where(model.user_id == user_id, time_column >= since)
+            .order_by(time_column.desc())
+            .limit(1)
+        )
+        row = db.session.execute(stmt).mappings().first()
+        return to_state(dict(row)) if row is not None else None
+
+    def rebuild(self):
+        """从数据库加载时间窗口内每个用户的最新一条记录"""
+        self._loaded = True
+        since = datetime.utcnow() - timedelta(hours=self.window_hours)
+        try:
+            emotions = _latest_rows(EmotionResult, EmotionResult.created_at, since)
+            samples = _latest_rows(PhysiologicalSample, PhysiologicalSample.recorded_at, since)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Latest state index rebuild failed: {e}")
+            return
+        # 重建的是历史状态, 不推送给监听者
+        self.update_emotions(emotions, publish=False)
+        self.update_physiological(samples, publish=False)
+        logger.info(f"Latest state index rebuilt: {len(emotions)} emotions, {len(samples)} physiological")
+
+
+SOURCES = {
+    "emotion": (EmotionResult, EmotionResult.created_at, emotion_state),
+    "physiological": (PhysiologicalSample, PhysiologicalSample.recorded_at, physiological_state),
+}
+
+# KEYS[1]: 哈希; ARGV[1]: 时间字段, 之后依次是 userId 和状态 JSON; 时间不早于现有状态时才写入
+SET_NEWER_SCRIPT = """
+local field = ARGV[1]
+for i = 2, #ARGV, 2 do
+    local current = redis.call('HGET', KEYS[1], ARGV[i])
+    if not current or cjson.decode(current)[field] <= cjson.decode(ARGV[i + 1])[field] then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+return 0
+"""
+
+
+def _latest_by_user(rows: Iterable[Dict], time_column: str, to_state) -> Dict[str, Dict]:
+    latest: Dict[str, Dict] = {}
+    for row in rows:
+        current = latest.get(row["user_id"])
+        if current is None or current[time_column] <= row[time_column]:
+            latest[row["user_id"]] = row
+    return {user_id: to_state(row) for user_id, row in latest.items()}
+
+
+def _latest_rows(model, time_column, since: datetime):
+    """每个用户在 since 之后的最新一行; 时间条件同时让分区表只扫描最近的分区"""
+    newest = (
+        select(model.user_id, func.max(time_column).label("newest"))
+        .where(time_column >= since)
+        .group_by(model.user_id)
+        .subquery()
+    )
+    stmt = select(model.__table__).join(
+        newest, and_(model.user_id == newest.c.user_id, time_column == newest.c.newest)
+    )
+    return [dict(row) for row in db.session.execute(stmt).mappings()]
+
+
+latest_state = LatestStateIndex()
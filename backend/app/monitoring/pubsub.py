@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from loguru import logger
+
+
+class Subscription:
+    """一个监听者: 每种事件只保留最新的一条, 由 SSE 循环按节流间隔取走"""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.pending: Dict[str, Dict] = {}
+        self.coalesced = 0
+        self._cond = threading.Condition()
+
+    def push(self, kind: str, state: Dict):
+        with self._cond:
+            if kind in self.pending:
+                self.coalesced += 1
+            self.pending[kind] = state
+            self._cond.notify()
+
+    def wait(self, timeout: float) -> Dict[str, Dict]:
+        """等待新事件, 超时返回空字典; 返回并清空当前积压的事件"""
+        with self._cond:
+            if not self.pending:
+                self._cond.wait(timeout)
+            events, self.pending = self.pending, {}
+            return events
+
+
+class MonitorBroker:
+    """按 userId 扇出监测事件的进程内发布订阅
+
+    同一用户的 N 个监听者共享一次发布; 配置了 REDIS_URL 时发布走 Redis,
+    每个进程只用一个 psubscribe 连接接收所有用户的事件再本地扇出,
+    Celery worker 等其他进程发布的事件也能送达。
+    """
+
+    def __init__(self):
+        self.redis = None
+        self.prefix = "ris:monitor:"
+        self.published = 0
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+
+    def init_app(self, app):
+        redis_url = app.config.get("REDIS_URL")
+        if redis_url:
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(redis_url)
+                self.redis.ping()
+            except Exception as e:
+                logger.warning(f"Monitor broker falls back to in-process pub/sub: {e}")
+                self.redis = None
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            watchers = self._subscribers.get(subscription.user_id)
+            if watchers is not None:
+                watchers.discard(subscription)
+                if not watchers:
+                    del self._subscribers[subscription.user_id]
+
+    def watchers(self) -> int:
+        return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, kind: str, user_id: str, state: Dict):
+        self.published += 1
+        if self.redis is not None:
+            try:
+                self.redis.publish(self.prefix + user_id, json.dumps({"kind": kind, "state": state}))
+                return
+            except Exception as e:
+                logger.warning(f"Redis publish failed, delivering locally: {e}")
+        self._dispatch(kind, user_id, state)
+
+    def _dispatch(self, kind: str, user_id: str, state: Dict):
+        # 没有人监听的用户直接返回, 发布方几乎没有开销
+        watchers = self._subscribers.get(user_id)
+        if not watchers:
+            return
+        for subscription in list(watchers):
+            subscription.push(kind, state)
+
+    def _ensure_listener(self):
+        if self.redis is None or (self._listener is not None and self._listener.is_alive()):
+            return
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="monitor-broker", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        """整个进程一个 Redis 订阅, 断线后退避重连"""
+        backoff = 1.0
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + "*")
+                backoff = 1.0
+                for message in pubsub.listen():
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    payload = json.loads(message["data"])
+                    self._dispatch(payload["kind"], channel[len(self.prefix):], payload["state"])
+            except Exception as e:
+                logger.warning(f"Monitor broker Redis subscription lost: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+
+broker = MonitorBroker()
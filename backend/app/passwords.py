@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from loguru import logger
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """排队和执行中的哈希数已达上限, 或等待超时; 接口返回 429"""
+
+
+def _hash(password: str, method: str) -> str:
+    return generate_password_hash(password, method)
+
+
+def _verify(pwhash: str, password: str, method: str, prefix: str) -> Tuple[bool, Optional[str]]:
+    """校验密码; 通过且哈希参数与当前配置不同时顺便生成新哈希, 省一次进程间往返"""
+    if not check_password_hash(pwhash, password):
+        return False, None
+    if pwhash.split("$", 1)[0] != prefix:
+        return True, generate_password_hash(password, method)
+    return True, None
+
+
+class PasswordHasher:
+    """把 scrypt/pbkdf2 这类 CPU 密集的密码哈希放到进程池中执行
+
+    请求线程只等待结果, 不占用 GIL; 排队和执行中的任务超过 PASSWORD_HASH_QUEUE
+    时立即抛出 HasherBusy, 由接口返回 429, 高峰期不会把所有 worker 堵在登录上。
+    PASSWORD_HASH_WORKERS 为 0 时在请求线程中直接计算(开发和测试)。
+    进程池在第一次使用时创建, gunicorn fork 出的每个 worker 各有一个。子进程
+    由 forkserver 启动: 从一个单线程的服务进程 fork, 不会复制 Web worker 里
+    其他线程(批量写入、入库、日志)持有的锁。
+    """
+
+    def __init__(self):
+        self.method = "scrypt"
+        self.workers = 0
+        self.max_pending = 32
+        self.timeout = 10.0
+        self.prefix = None
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", 0)
+        self.max_pending = app.config.get("PASSWORD_HASH_QUEUE", 32)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", 10.0)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # 当前参数下哈希串 "$" 之前的部分, 例如 scrypt:32768:8:1, 用来判断是否需要重新哈希
+        self.prefix = _hash("", self.method).split("$", 1)[0]
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> Tuple[bool, Optional[str]]:
+        """返回 (是否匹配, 新哈希); 参数未变化时新哈希为 None"""
+        return self._run(_verify, pwhash, password, self.method, self.prefix)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        return pwhash.split("$", 1)[0] != self.prefix
+
+    def stats(self):
+        return {"workers": self.workers, "maxPending": self.max_pending, "rejected": self.rejected}
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy("Too many password hashing requests in flight")
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # 名额在任务真正结束时才归还, 等待超时的任务仍然占着名额
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            self.rejected += 1
+            raise HasherBusy("Password hashing timed out")
+        except BrokenProcessPool:
+            logger.warning("Password hashing pool broke, it will be recreated")
+            with self._lock:
+                self._pool = None
+            raise
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    # 不能在已有多个线程的进程里直接 fork。forkserver 的服务进程是全新的解释器,
+                    # 只导入一次 __main__ 和本模块(上面两个纯函数所在), 池中的子进程从它 fork
+                    context = multiprocessing.get_context("forkserver")
+                    context.set_forkserver_preload(["__main__", __name__])
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+
+hasher = PasswordHasher()
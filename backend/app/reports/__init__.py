@@ -0,0 +1 @@
+"""报表: 情绪结果的小时/天预聚合, 报表接口只读聚合表"""
@@ -0,0 +1,125 @@
+"""完整报告导出
+
+每个数据段用 yield_per 流式读取(PostgreSQL 上为服务端游标), 一次只在内存中
+保留一块行, 边读边写入磁盘文件, 峰值内存与患者的历史数据量无关。
+
+格式:
+- csv: zip 包, 每个数据段一个 CSV
+- json: 单个 JSON 文件 {"report": {...}, "sections": {段名: [行对象, ...]}}
+- columnar: zip 包, 每个数据段按块切成行组, 每个行组一个按列存放的 JSON 文件
+  (<段名>/<序号>.json, 内容为 {列名: [值, ...]}), 最后写入描述列和行组的 manifest.json
+"""
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.chat_message import ChatMessage
+from app.models.emotion_result import EmotionResult
+from app.models.physiological import PhysiologicalSample
+
+# 段名 -> (表, 时间列)
+SECTIONS = {
+    "chat": (ChatMessage, ChatMessage.created_at),
+    "emotion": (EmotionResult, EmotionResult.created_at),
+    "physiological": (PhysiologicalSample, PhysiologicalSample.recorded_at),
+}
+FORMATS = {"csv": "zip", "json": "json", "columnar": "zip"}
+
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def section_chunks(section: str, user_id: str, start: date, end: date,
+                   chunk_rows: int) -> Tuple[List[str], Iterator[Sequence]]:
+    """返回 (列名, 行块迭代器); 时间范围 [start, end] 按天包含"""
+    model, time_column = SECTIONS[section]
+    stmt = select(model.__table__).where(
+        model.user_id == user_id,
+        time_column >= datetime.combine(start, datetime.min.time()),
+        time_column < datetime.combine(end, datetime.min.time()) + timedelta(days=1),
+    ).order_by(time_column)
+    if model is ChatMessage:
+        stmt = stmt.where(ChatMessage.is_deleted.is_(False))
+    # 只查表的列而不是 ORM 实体, 行不会进入 session 的 identity map
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_rows))
+    return list(result.keys()), result.partitions()
+
+
+def write_report(path: str, fmt: str, meta: Dict, sections: List[str], chunk_rows: int) -> int:
+    """把各数据段写入 path, 返回总行数"""
+    writer = {"csv": _write_csv, "json": _write_json, "columnar": _write_columnar}[fmt]
+    return writer(path, meta, sections, chunk_rows)
+
+
+def _chunks(meta: Dict, section: str, chunk_rows: int):
+    return section_chunks(section, meta["userId"], date.fromisoformat(meta["startDate"]),
+                          date.fromisoformat(meta["endDate"]), chunk_rows)
+
+
+def _write_csv(path: str, meta: Dict, sections: List[str], chunk_rows: int) -> int:
+    total = 0
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("report.json", json.dumps(meta, ensure_ascii=False))
+        for section in sections:
+            columns, chunks = _chunks(meta, section, chunk_rows)
+            with archive.open(f"{section}.csv", "w", force_zip64=True) as raw:
+                out = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                writer = csv.writer(out)
+                writer.writerow(columns)
+                for chunk in chunks:
+                    writer.writerows(
+                        [json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else _value(v) for v in row]
+                        for row in chunk
+                    )
+                    total += len(chunk)
+                out.flush()
+                out.detach()
+    return total
+
+
+def _write_json(path: str, meta: Dict, sections: List[str], chunk_rows: int) -> int:
+    total = 0
+    with open(path, "w", encoding="utf-8") as out:
+        out.write('{"report": ' + json.dumps(meta, ensure_ascii=False) + ', "sections": {')
+        for index, section in enumerate(sections):
+            columns, chunks = _chunks(meta, section, chunk_rows)
+            out.write(("," if index else "") + json.dumps(section) + ": [")
+            first = True
+            for chunk in chunks:
+                for row in chunk:
+                    out.write(("" if first else ",") + json.dumps(
+                        {column: _value(v) for column, v in zip(columns, row)}, ensure_ascii=False))
+                    first = False
+                total += len(chunk)
+            out.write("]")
+        out.write("}}")
+    return total
+
+
+def _write_columnar(path: str, meta: Dict, sections: List[str], chunk_rows: int) -> int:
+    total = 0
+    manifest = {"report": meta, "sections": {}}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for section in sections:
+            columns, chunks = _chunks(meta, section, chunk_rows)
+            groups = []
+            for number, chunk in enumerate(chunks):
+                name = f"{section}/{number:05d}.json"
+                archive.writestr(name, json.dumps(
+                    {column: [_value(row[i]) for row in chunk] for i, column in enumerate(columns)},
+                    ensure_ascii=False,
+                ))
+                groups.append({"file": name, "rows": len(chunk)})
+                total += len(chunk)
+            manifest["sections"][section] = {"columns": columns, "rowGroups": groups}
+        archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False))
+    return total
@@ -0,0 +1,165 @@
+import math
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+
+from app.extensions import db
+from app.models.emotion_result import EmotionResult
+from app.models.emotion_rollup import EMOTION_TYPES, METRICS, EmotionRollup
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+# 流式读取原始结果时每次取回的行数
+STREAM_ROWS = 2000
+
+COUNT_FIELDS = ("total",) + tuple(f"{t}_count" for t in EMOTION_TYPES) + tuple(f"{m}_n" for m in METRICS)
+SUM_FIELDS = tuple(f"{m}_{kind}" for m in METRICS for kind in ("sum", "sumsq"))
+
+
+def hour_start(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def empty_bucket() -> Dict:
+    bucket = dict.fromkeys(COUNT_FIELDS, 0)
+    bucket.update(dict.fromkeys(SUM_FIELDS, 0.0))
+    return bucket
+
+
+def add_result(bucket: Dict, emotion_type: str, analysis: Optional[Dict]):
+    """把一条情绪结果累加进桶"""
+    bucket["total"] += 1
+    if emotion_type in EMOTION_TYPES:
+        bucket[f"{emotion_type}_count"] += 1
+    analysis = analysis or {}
+    values = dict(analysis.get("padScores") or {})
+    for emotion in EMOTION_TYPES:
+        values[emotion] = analysis.get(f"{emotion}Score")
+    for metric in METRICS:
+        value = values.get(metric)
+        if value is None:
+            continue
+        bucket[f"{metric}_n"] += 1
+        bucket[f"{metric}_sum"] += value
+        bucket[f"{metric}_sumsq"] += value * value
+
+
+def merge(bucket: Dict, other) -> Dict:
+    """other 可以是桶字典或 EmotionRollup 行"""
+    get = other.get if isinstance(other, dict) else lambda field: getattr(other, field)
+    for field in COUNT_FIELDS + SUM_FIELDS:
+        bucket[field] += get(field)
+    return bucket
+
+
+def combine(rollups: Iterable) -> Dict:
+    bucket = empty_bucket()
+    for rollup in rollups:
+        merge(bucket, rollup)
+    return bucket
+
+
+def mean(bucket: Dict, metric: str) -> Optional[float]:
+    n = bucket[f"{metric}_n"]
+    return bucket[f"{metric}_sum"] / n if n else None
+
+
+def std(bucket: Dict, metric: str) -> Optional[float]:
+    n = bucket[f"{metric}_n"]
+    if not n:
+        return None
+    avg = bucket[f"{metric}_sum"] / n
+    return math.sqrt(max(bucket[f"{metric}_sumsq"] / n - avg * avg, 0.0))
+
+
+def recompute(start: datetime, end: datetime, user_ids: Optional[List[str]] = None) -> int:
+    """从原始结果重算 [start, end) 内的小时桶, 以及这些小时所在整天的天桶
+
+    整桶删除后重新插入, 所以重复执行、结果迟到都不会重复计数。原始结果
+    按 yield_per 流式读取(PostgreSQL 上为服务端游标), 内存只与桶数有关。
+    user_ids 为 None 时重算所有用户。返回写入的小时桶数。
+    """
+    start, end = hour_start(start), hour_start(end - timedelta(microseconds=1)) + HOUR
+    stmt = select(
+        EmotionResult.user_id, EmotionResult.created_at, EmotionResult.emotion_type, EmotionResult.analysis,
+    ).where(EmotionResult.created_at >= start, EmotionResult.created_at < end)
+    if user_ids is not None:
+        stmt = stmt.where(EmotionResult.user_id.in_(user_ids))
+    hours: Dict[Tuple[str, datetime], Dict] = defaultdict(empty_bucket)
+    for user_id, created_at, emotion_type, analysis in db.session.execute(
+        stmt.execution_options(yield_per=STREAM_ROWS)
+    ):
+        add_result(hours[user_id, hour_start(created_at)], emotion_type, analysis)
+    _replace("hour", start, end, user_ids, hours)
+
+    # 天桶由当天的全部小时桶相加得到, 不再扫描原始结果
+    first_day, last_day = day_start(start), day_start(end - HOUR) + DAY
+    stmt = select(EmotionRollup).where(
+        EmotionRollup.granularity == "hour",
+        EmotionRollup.bucket_start >= first_day,
+        EmotionRollup.bucket_start < last_day,
+    )
+    if user_ids is not None:
+        stmt = stmt.where(EmotionRollup.user_id.in_(user_ids))
+    days: Dict[Tuple[str, datetime], Dict] = defaultdict(empty_bucket)
+    for rollup in db.session.execute(stmt).scalars():
+        merge(days[rollup.user_id, day_start(rollup.bucket_start)], rollup)
+    _replace("day", first_day, last_day, user_ids, days)
+    db.session.commit()
+    return len(hours)
+
+
+def _replace(granularity: str, start: datetime, end: datetime, user_ids: Optional[List[str]],
+             buckets: Dict[Tuple[str, datetime], Dict]):
+    stmt = delete(EmotionRollup).where(
+        EmotionRollup.granularity == granularity,
+        EmotionRollup.bucket_start >= start,
+        EmotionRollup.bucket_start < end,
+    )
+    if user_ids is not None:
+        stmt = stmt.where(EmotionRollup.user_id.in_(user_ids))
+    db.session.execute(stmt)
+    if buckets:
+        now = datetime.utcnow()
+        db.session.execute(insert(EmotionRollup), [
+            {"user_id": user_id, "granularity": granularity, "bucket_start": bucket_start, "updated_at": now, **bucket}
+            for (user_id, bucket_start), bucket in buckets.items()
+        ])
+
+
+def touched_hours(rows: Iterable[Dict]) -> List[List[str]]:
+    """新写入的结果涉及的 [userId, 整点 ISO 时间], 可以直接作为 Celery 任务参数"""
+    return sorted({(row["user_id"], hour_start(row["created_at"]).isoformat()) for row in rows})
+
+
+def refresh_hours(touched: Iterable[Tuple[str, str]]) -> int:
+    """重算若干 (userId, 整点) 的桶; 时间范围相同的用户合并为一次查询"""
+    ranges: Dict[str, Tuple[datetime, datetime]] = {}
+    for user_id, hour in touched:
+        hour = datetime.fromisoformat(hour)
+        first, last = ranges.get(user_id, (hour, hour))
+        ranges[user_id] = (min(first, hour), max(last, hour))
+    by_range: Dict[Tuple[datetime, datetime], List[str]] = defaultdict(list)
+    for user_id, span in ranges.items():
+        by_range[span].append(user_id)
+    return sum(recompute(first, last + HOUR, user_ids) for (first, last), user_ids in by_range.items())
+
+
+def daily_rollups(user_id: str, first: date, last: date) -> List[EmotionRollup]:
+    """用户在 [first, last] 这些天的天桶, 按日期排序; 没有数据的天没有行"""
+    start = datetime.combine(first, datetime.min.time())
+    end = datetime.combine(last, datetime.min.time()) + DAY
+    return db.session.execute(
+        select(EmotionRollup).where(
+            EmotionRollup.user_id == user_id,
+            EmotionRollup.granularity == "day",
+            EmotionRollup.bucket_start >= start,
+            EmotionRollup.bucket_start < end,
+        ).order_by(EmotionRollup.bucket_start)
+    ).scalars().all()
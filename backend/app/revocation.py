@@ -0,0 +1,85 @@
+import heapq
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+class TokenDenylist:
+    """已吊销 token 的 jti 集合: 进程内一级, 可选 Redis 二级
+
+    每个 jti 只保存到 token 本身的 exp 为止: 过期的 token 会被 JWT 校验
+    直接拒绝, 不再需要记录, 所以集合大小只与有效期内被吊销的 token 数有关。
+    进程内用最小堆按过期时间清理; Redis 中用 EXAT 让 key 在同一时刻过期,
+    其他 worker 吊销的 token 也能被查到。
+    """
+
+    def __init__(self):
+        self.redis = None
+        self.prefix = "ris:revoked:"
+        self._expires: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        redis_url = app.config.get("REDIS_URL")
+        if redis_url:
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+                self.redis.ping()
+            except Exception as e:
+                logger.warning(f"Token denylist falls back to in-process store: {e}")
+                self.redis = None
+
+    def revoke(self, jti: str, exp: float):
+        """吊销 jti 直到 exp(epoch 秒)"""
+        now = time.time()
+        if exp <= now:
+            return
+        with self._lock:
+            self._prune(now)
+            self._add(jti, exp)
+        if self.redis is not None:
+            try:
+                self.redis.set(self.prefix + jti, 1, exat=math.ceil(exp))
+            except Exception as e:
+                logger.warning(f"Redis revoke failed, revocation is local to this process: {e}")
+
+    def is_revoked(self, jti: str, exp: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            if jti in self._expires:
+                return True
+        if self.redis is not None:
+            try:
+                if self.redis.exists(self.prefix + jti):
+                    # 记在本地, 同一个 token 之后的请求不用再访问 Redis
+                    if exp is not None:
+                        with self._lock:
+                            self._add(jti, exp)
+                    return True
+            except Exception as e:
+                logger.warning(f"Redis denylist lookup failed: {e}")
+        return False
+
+    def check(self, jwt_header: Dict, jwt_payload: Dict) -> bool:
+        """flask_jwt_extended 的 token_in_blocklist_loader 回调"""
+        return self.is_revoked(jwt_payload["jti"], jwt_payload.get("exp"))
+
+    def _add(self, jti: str, exp: float):
+        if jti not in self._expires:
+            self._expires[jti] = exp
+            heapq.heappush(self._heap, (exp, jti))
+
+    def _prune(self, now: float):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, jti = heapq.heappop(heap)
+            self._expires.pop(jti, None)
+
+    def __len__(self):
+        return len(self._expires)
@@ -0,0 +1,145 @@
+import time
+from datetime import datetime
+from typing import Dict, List
+from uuid import uuid4
+
+from flask import current_app
+from loguru import logger
+from sqlalchemy import insert
+
+from app.batching import MicroBatcher
+from app.emotion import text as text_scorer
+from app.emotion import voice as voice_scorer
+from app.extensions import celery, db
+from app.models.emotion_result import EmotionResult
+from app.monitoring.latest import latest_state
+from app.tasks.reports import schedule_rollups
+
+
+def _result_row(item: Dict, result: Dict, input_type: str, model_version: str, elapsed_ms: int) -> Dict:
+    return {
+        "id": str(uuid4()),
+        "task_id": item["taskId"],
+        "user_id": item["userId"],
+        "character_id": item.get("characterId"),
+        "session_id": item.get("sessionId"),
+        "input_type": input_type,
+        "input_data": item.get("text"),
+        "emotion_type": result["type"],
+        "intensity": result["intensity"],
+        "confidence": result["confidence"],
+        "analysis": result["analysis"],
+        "processing_time": elapsed_ms,
+        "model_version": model_version,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def _mark_failed(task, task_id: str, error: Exception):
+    """在结果后端把任务标记为 FAILURE; 未配置结果后端时跳过, 不掩盖原来的异常"""
+    try:
+        task.backend.mark_as_failure(task_id, error)
+    except NotImplementedError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to mark emotion task {task_id} as failed: {e}")
+
+
+@celery.task(bind=True, name="emotion.analyze_text_batch")
+def analyze_text_batch(self, items: List[Dict]) -> int:
+    """对一批文本一次打分, 结果一条 executemany INSERT 写入
+
+    items 中每项包含 taskId, userId, text 以及可选的 characterId/sessionId。
+    失败时把每个 taskId 标记为 FAILURE, 轮询接口据此返回 failed。
+    """
+    try:
+        started = time.perf_counter()
+        results = text_scorer.score_batch([item["text"] for item in items])
+        # 整批只打分一次, 处理耗时按条均摊
+        elapsed_ms = int((time.perf_counter() - started) * 1000 / max(len(items), 1))
+        rows = [
+            _result_row(item, result, "text", text_scorer.MODEL_VERSION, elapsed_ms)
+            for item, result in zip(items, results)
+        ]
+        db.session.execute(insert(EmotionResult), rows)
+        db.session.commit()
+        latest_state.update_emotions(rows)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Emotion batch of {len(items)} texts failed: {e}")
+        for item in items:
+            _mark_failed(self, item["taskId"], e)
+        raise
+    schedule_rollups(rows)
+    logger.debug(f"Emotion batch stored {len(rows)} results")
+    return len(rows)
+
+
+@celery.task(name="emotion.store_voice_result")
+def store_voice_result(item: Dict, result: Dict, elapsed_ms: int) -> str:
+    """保存请求中已流式算好的语音分析结果, 任务 id 即 item["taskId"]"""
+    row = _result_row(item, result, "voice", voice_scorer.MODEL_VERSION, elapsed_ms)
+    try:
+        db.session.execute(insert(EmotionResult), [row])
+        db.session.commit()
+        latest_state.update_emotions([row])
+    except Exception:
+        db.session.rollback()
+        raise
+    schedule_rollups([row])
+    return row["id"]
+
+
+def _send_text_batch(items: List[Dict]):
+    analyze_text_batch.apply_async(args=[items])
+
+
+_text_batcher = None
+
+
+def text_batcher() -> MicroBatcher:
+    """进程内的文本微批处理器, 按 EMOTION_BATCH_SIZE 条或 EMOTION_BATCH_WAIT 毫秒攒批"""
+    global _text_batcher
+    if _text_batcher is None:
+        config = current_app.config
+        _text_batcher = MicroBatcher(
+            _send_text_batch,
+            max_size=config.get("EMOTION_BATCH_SIZE", 64),
+            max_wait=config.get("EMOTION_BATCH_WAIT", 200) / 1000,
+            name="emotion-text-batcher",
+        )
+    return _text_batcher
+
+
+def submit_text(user_id: str, text: str, context: Dict = None) -> str:
+    """把文本加入微批队列, 立即返回任务 id; 队列已满时返回 None"""
+    context = context or {}
+    item = {
+        "taskId": str(uuid4()),
+        "userId": user_id,
+        "text": text,
+        "characterId": context.get("characterId"),
+        "sessionId": context.get("sessionId"),
+    }
+    if not text_batcher().submit(item):
+        return None
+    return item["taskId"]
+
+
+def submit_voice(user_id: str, audio_file, character_id: str = None) -> str:
+    """边读上传流边提取韵律特征, 不落盘也不整段缓存; 结果交给 Celery 写库, 返回任务 id"""
+    task_id = str(uuid4())
+    started = time.perf_counter()
+    result = voice_scorer.analyze_wav(audio_file.stream)
+    elapsed_ms = int((time.perf_counter() - started) * 1000)
+    item = {"taskId": task_id, "userId": user_id, "characterId": character_id}
+    store_voice_result.apply_async(args=[item, result, elapsed_ms], task_id=task_id)
+    return task_id
+
+
+def task_state(task_id: str) -> str:
+    """从结果后端查询任务状态; 未配置结果后端时返回 PENDING"""
+    try:
+        return celery.AsyncResult(task_id).state
+    except NotImplementedError:
+        return "PENDING"
@@ -0,0 +1,95 @@
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from flask import current_app
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import celery, db
+from app.models.report_export import ReportExport
+from app.reports import export, rollups
+
+
+@celery.task(
+    name="reports.refresh_emotion_rollups",
+    autoretry_for=(IntegrityError,), retry_backoff=True, max_retries=5,
+)
+def refresh_emotion_rollups(touched: List[List[str]]) -> int:
+    """重算新结果涉及的小时桶和天桶; touched 为 [[userId, 整点 ISO 时间], ...]
+
+    两个任务同时重算同一个桶时后提交的一方会主键冲突, 重试即可。
+    """
+    try:
+        return rollups.refresh_hours(touched)
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def schedule_rollups(rows: Iterable[Dict]):
+    """情绪结果落库后调用; 投递失败只记日志, 不影响已写入的结果"""
+    try:
+        refresh_emotion_rollups.apply_async(args=[rollups.touched_hours(rows)])
+    except Exception as e:
+        logger.warning(f"Failed to schedule emotion rollup refresh: {e}")
+
+
+def export_path(job: ReportExport) -> str:
+    return os.path.join(current_app.config["REPORT_EXPORT_DIR"], job.file_name)
+
+
+@celery.task(name="reports.export_report")
+def export_report(export_id: str) -> int:
+    """生成报告文件; 先写临时文件, 完成后改名, 下载接口不会读到写了一半的文件"""
+    job = db.session.get(ReportExport, export_id)
+    if job is None:
+        logger.warning(f"Report export {export_id} not found")
+        return 0
+    job.status = "running"
+    job.file_name = f"{job.id}.{export.FORMATS[job.format]}"
+    db.session.commit()
+    meta = {
+        "reportId": job.id,
+        "userId": job.user_id,
+        "startDate": job.start_date.isoformat(),
+        "endDate": job.end_date.isoformat(),
+        "sections": job.sections,
+        "generatedAt": datetime.utcnow().isoformat(),
+    }
+    os.makedirs(current_app.config["REPORT_EXPORT_DIR"], exist_ok=True)
+    path = export_path(job)
+    partial = path + ".part"
+    try:
+        rows = export.write_report(partial, job.format, meta, job.sections,
+                                   current_app.config.get("REPORT_EXPORT_CHUNK_ROWS", 5000))
+        os.replace(partial, path)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Report export {export_id} failed: {e}")
+        if os.path.exists(partial):
+            os.remove(partial)
+        job.status, job.error = "failed", str(e)
+        db.session.commit()
+        raise
+    job.status, job.size, job.row_count, job.completed_at = "completed", os.path.getsize(path), rows, datetime.utcnow()
+    db.session.commit()
+    purge_expired_exports()
+    logger.info(f"Report export {export_id}: {rows} rows, {job.size} bytes")
+    return rows
+
+
+def purge_expired_exports() -> int:
+    """删除过期的导出文件, 任务记录保留并标记为 expired"""
+    expired = db.session.execute(
+        select(ReportExport).where(ReportExport.expires_at < datetime.utcnow(), ReportExport.status == "completed")
+    ).scalars().all()
+    for job in expired:
+        try:
+            os.remove(export_path(job))
+        except FileNotFoundError:
+            pass
+        job.status = "expired"
+    db.session.commit()
+    return len(expired)
@@ -0,0 +1,152 @@
+"""流式回复首字/首音延迟基准
+
+用本地的对话模型和语音替身(可设定首 token 延迟、生成速度、合成延迟),
+通过 POST /api/v1/chat/messages/stream 发起 requests 次回复, 在客户端
+统计收到第一个 token、第一句和第一段音频的时间; 并与不流式的做法对比:
+等整段回复生成完, 再把整段文本交给语音合成, 直到第一段音频。
+需要 DATABASE_URL 指向已迁移的数据库, 测试用户和角色结束后删除。
+
+    python benchmarks/bench_chat_stream.py --requests 20 --concurrency 4 --token-ms 40
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.chat.llm import FakeChatModel  # noqa: E402
+from app.chat.stream import streamer  # noqa: E402
+from app.chat.voice import MSG_AUDIO, FakeVoiceSession  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.character import Character  # noqa: E402
+from app.models.chat_message import ChatMessage  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+PREFIX = "bench-stream-"
+PROFILE = {"name": "bench", "age": 70, "gender": "female", "medicalHistory": "-", "emergencyContact": "-"}
+
+
+def stream_once(client, headers, character_id: str):
+    """发起一次流式回复, 返回各事件第一次到达的毫秒数"""
+    started = time.perf_counter()
+    response = client.post("/api/v1/chat/messages/stream", headers=headers, buffered=False,
+                           json={"characterId": character_id, "content": "我想起年轻时在纺织厂上班的日子"})
+    first = {}
+    buf = ""
+    for chunk in response.response:
+        buf += chunk.decode() if isinstance(chunk, bytes) else chunk
+        while "\n\n" in buf:
+            event, buf = buf.split("\n\n", 1)
+            if event.startswith("event: "):
+                kind = event.split("\n", 1)[0][7:]
+                first.setdefault(kind, (time.perf_counter() - started) * 1000)
+                if kind == "error":
+                    print(f"  error: {event}")
+    response.close()
+    return first
+
+
+def baseline_once(model: FakeChatModel, voice_factory):
+    """不流式: 整段生成完再整段合成, 返回 (整段文本耗时, 第一段音频耗时) 毫秒"""
+    started = time.perf_counter()
+    text = "".join(model.stream([{"role": "user", "content": "我想起年轻时在纺织厂上班的日子"}]))
+    text_ms = (time.perf_counter() - started) * 1000
+    session = voice_factory()
+    try:
+        session.send("baseline", text)
+        while session.recv()[0] != MSG_AUDIO:
+            pass
+    finally:
+        session.close()
+    return text_ms, (time.perf_counter() - started) * 1000
+
+
+def summary(name: str, values):
+    values = np.array([v for v in values if v is not None])
+    if not len(values):
+        print(f"{name:<22} -")
+        return
+    p50, p95 = np.percentile(values, [50, 95])
+    print(f"{name:<22} p50 {p50:>8.0f}ms  p95 {p95:>8.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=40.0, help="每个 token(2 个字)的生成间隔")
+    parser.add_argument("--first-audio-ms", type=float, default=150.0, help="语音替身每个任务的合成延迟")
+    parser.add_argument("--realtime", type=float, default=8.0, help="音频推送速度相对实时的倍数, 缩短测试时间")
+    args = parser.parse_args()
+
+    app = create_app()
+    model = FakeChatModel(args.first_token_ms, args.token_ms)
+    voice_factory = partial(FakeVoiceSession, args.first_audio_ms, realtime=args.realtime)
+    streamer.model = model
+    streamer.voice_factory = voice_factory
+
+    with app.app_context():
+        username = PREFIX + uuid.uuid4().hex[:8]
+        client = app.test_client()
+        tokens = client.post("/api/v1/auth/register", json={
+            "username": username, "password": "bench", "email": f"{username}@bench.local",
+            "userType": "patient", "profile": PROFILE,
+        }).json
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        character = Character(name=PREFIX + "角色", personality="温柔", speaking_style="句子短")
+        db.session.add(character)
+        db.session.commit()
+        character_id = character.id
+        user_id = User.query.filter_by(username=username).one().id
+
+    results = []
+    lock = threading.Lock()
+    counter = iter(range(args.requests))
+
+    def worker():
+        local = app.test_client()
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            first = stream_once(local, headers, character_id)
+            with lock:
+                results.append(first)
+
+    try:
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        print(f"streamed {len(results)} replies, concurrency {args.concurrency}, {elapsed:.1f}s")
+        summary("first token", [r.get("token") for r in results])
+        summary("first sentence", [r.get("sentence") for r in results])
+        summary("first audio", [r.get("audio") for r in results])
+        summary("reply complete", [r.get("done") for r in results])
+
+        baseline = [baseline_once(model, voice_factory) for _ in range(min(args.requests, 5))]
+        print("non-streaming baseline")
+        summary("full text", [b[0] for b in baseline])
+        summary("first audio", [b[1] for b in baseline])
+    finally:
+        with app.app_context():
+            db.session.execute(delete(ChatMessage).where(ChatMessage.user_id == user_id))
+            db.session.execute(delete(Character).where(Character.id == character_id))
+            db.session.execute(delete(User).where(User.id == user_id))
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""最新状态读取基准
+
+向 physiological_data 写入 users 个用户、每人 samples 条数据(user_id 以
+bench- 开头, 结束后删除), 然后对随机用户分别用
+`ORDER BY recorded_at DESC LIMIT 1` 查询和 LatestStateIndex 读取最新一条,
+比较每秒读取次数和延迟分位数。需要 DATABASE_URL 指向已迁移的数据库。
+
+    python benchmarks/bench_latest_state.py --users 2000 --samples 200 --reads 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.physiological import PhysiologicalSample  # noqa: E402
+from app.monitoring.latest import LatestStateIndex  # noqa: E402
+
+PREFIX = "bench-"
+
+
+def populate(users: int, samples: int):
+    now = datetime.utcnow()
+    rng = random.Random(0)
+    for u in range(users):
+        rows = [{
+            "user_id": f"{PREFIX}{u:06d}",
+            "recorded_at": now - timedelta(seconds=samples - i),
+            "device_id": "bench",
+            "heart_rate": rng.randint(55, 110),
+            "stress_level": rng.uniform(1, 10),
+            "engagement": rng.uniform(1, 10),
+            "arousal": rng.uniform(1, 10),
+        } for i in range(samples)]
+        db.session.execute(insert(PhysiologicalSample), rows)
+        if u % 100 == 99:
+            db.session.commit()
+    db.session.commit()
+
+
+def measure(name: str, fn, user_ids, reads: int):
+    rng = random.Random(1)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(reads):
+        user_id = rng.choice(user_ids)
+        t0 = time.perf_counter()
+        fn(user_id)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+    print(f"{name:<8} {reads / elapsed:>12,.0f} reads/s  p50 {p50 * 1e6:>9.1f}us  p99 {p99 * 1e6:>9.1f}us")
+
+
+def query_latest(user_id: str):
+    stmt = (select(PhysiologicalSample)
+            .where(PhysiologicalSample.user_id == user_id)
+            .order_by(PhysiologicalSample.recorded_at.desc())
+            .limit(1))
+    return db.session.scalars(stmt).first()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=20000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        try:
+            print(f"populating {args.users} users x {args.samples} samples ...")
+            populate(args.users, args.samples)
+            index = LatestStateIndex()
+            index.init_app(app)
+            started = time.perf_counter()
+            index.rebuild()
+            print(f"index rebuild: {time.perf_counter() - started:.2f}s")
+            user_ids = [f"{PREFIX}{u:06d}" for u in range(args.users)]
+            measure("query", query_latest, user_ids, args.reads)
+            measure("index", lambda user_id: index.get("physiological", user_id), user_ids, args.reads)
+        finally:
+            db.session.rollback()
+            db.session.execute(delete(PhysiologicalSample).where(PhysiologicalSample.user_id.like(f"{PREFIX}%")))
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
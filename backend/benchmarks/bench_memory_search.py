@@ -0,0 +1,100 @@
+"""回忆向量检索基准
+
+对每个规模生成 n 条聚簇分布的单位向量(模拟同一患者反复谈到的几类话题),
+分批增量写入 FlatIndex 和 IVFIndex, 然后用 queries 条查询比较:
+FlatIndex 的精确 top-k 作为标准答案, 统计 IVF 在不同 nprobe 下的
+recall@k 和单条查询延迟分位数。只测内存中的索引, 不需要数据库。
+
+1M x 256 维 float32 约 1GB, IVF 重新分桶时会短暂再占一份, 机器内存不足时
+去掉 1000000 这一档。
+
+    python benchmarks/bench_memory_search.py --sizes 10000,100000,1000000 --k 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from app.memory.embedding import DIM  # noqa: E402
+from app.memory.index import FlatIndex, IVFIndex  # noqa: E402
+
+BATCH = 50000
+
+
+def clustered(n: int, topics: int, spread: float, rng) -> np.ndarray:
+    """topics 个随机话题中心加高斯扰动, 按行 L2 归一化"""
+    centers = rng.standard_normal((topics, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, topics, n)]
+    vectors += spread * rng.standard_normal((n, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def build(index, ids, vectors) -> float:
+    started = time.perf_counter()
+    for start in range(0, len(ids), BATCH):
+        index.add(ids[start:start + BATCH], vectors[start:start + BATCH])
+    return time.perf_counter() - started
+
+
+def timed_search(search, queries, k):
+    """逐条查询(每轮对话只检索一次), 返回 (结果, 延迟数组)"""
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(search(query, k)[0])
+        latencies.append(time.perf_counter() - started)
+    return results, np.array(latencies)
+
+
+def recall(truth, results, k: int) -> float:
+    found = sum(len({i for i, _ in t} & {i for i, _ in r}) for t, r in zip(truth, results))
+    return found / (k * len(truth))
+
+
+def report(name: str, latencies: np.ndarray, extra: str = ""):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"  {name:<14} p50 {p50 * 1e3:>8.2f}ms  p99 {p99 * 1e3:>8.2f}ms  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", default="1,4,8,16,32")
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--spread", type=float, default=0.35, help="话题内扰动的标准差, 越大越接近均匀分布")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    for n in (int(size) for size in args.sizes.split(",")):
+        print(f"n = {n:,}")
+        vectors = clustered(n, args.topics, args.spread, rng)
+        ids = [str(i) for i in range(n)]
+        # 查询是已有回忆的近似改写: 随机取一条再加扰动
+        queries = vectors[rng.integers(0, n, args.queries)] + 0.3 * args.spread * rng.standard_normal(
+            (args.queries, DIM)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        flat = FlatIndex(DIM)
+        print(f"  flat build    {build(flat, ids, vectors):>8.2f}s")
+        truth, latencies = timed_search(flat.search, queries, args.k)
+        report("flat (exact)", latencies)
+        del flat
+
+        ivf = IVFIndex(DIM)
+        print(f"  ivf build     {build(ivf, ids, vectors):>8.2f}s  ({len(ivf.centroids)} lists)")
+        del vectors
+        for nprobe in (int(p) for p in args.nprobe.split(",")):
+            results, latencies = timed_search(lambda q, k: ivf.search(q, k, nprobe), queries, args.k)
+            report(f"ivf nprobe={nprobe}", latencies, f"recall@{args.k} {recall(truth, results, args.k):.3f}")
+        del ivf
+
+
+if __name__ == "__main__":
+    main()
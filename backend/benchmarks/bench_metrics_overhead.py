@@ -0,0 +1,109 @@
+"""/metrics 指标采集的开销基准
+
+分别创建关闭和开启 METRICS_ENABLED 的应用, 各注册一个执行 queries 条
+SELECT 1 的测试路由, 用 test_client 交替发出请求, 比较每个请求的平均和
+p50/p99 耗时; 差值即请求计时、SQL 事件钩子和直方图更新的开销。单核机器上
+端到端的差值噪声较大, 所以另外直接测 SQL 钩子和直方图更新的单次耗时。最后
+输出一次 /metrics 的渲染耗时。需要 DATABASE_URL 指向可连接的数据库。
+
+    python benchmarks/bench_metrics_overhead.py --requests 5000 --queries 0 5 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.metrics import (  # noqa: E402
+    LATENCY_BUCKETS, Histogram, RequestState, _after_cursor_execute, _before_cursor_execute, _current,
+)
+
+
+def build(enabled: bool):
+    settings.METRICS_ENABLED = enabled
+    app = create_app()
+
+    @app.route("/_bench/<int:queries>")
+    def bench(queries):
+        for _ in range(queries):
+            db.session.execute(text("SELECT 1")).scalar()
+        return "ok"
+
+    return app
+
+
+def run(client, queries: int, requests: int):
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get(f"/_bench/{queries}")
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summary(timings):
+    timings = sorted(timings)
+    return (statistics.fmean(timings) * 1e6, timings[len(timings) // 2] * 1e6,
+            timings[int(len(timings) * 0.99)] * 1e6)
+
+
+def micro(iterations: int):
+    """SQL 钩子(每条语句一对)和直方图 observe 的单次耗时, 纳秒"""
+    token = _current.set(RequestState())
+    started = time.perf_counter()
+    for _ in range(iterations):
+        _before_cursor_execute(None, None, "SELECT 1", None, None, False)
+        _after_cursor_execute(None, None, "SELECT 1", None, None, False)
+    hooks = (time.perf_counter() - started) / iterations * 1e9
+    _current.reset(token)
+    histogram = Histogram("bench", "bench", ("route",), LATENCY_BUCKETS)
+    started = time.perf_counter()
+    for i in range(iterations):
+        histogram.observe(("/bench",), (i % 1000) / 1000)
+    observe = (time.perf_counter() - started) / iterations * 1e9
+    return hooks, observe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--queries", type=int, nargs="+", default=[0, 5, 20])
+    parser.add_argument("--rounds", type=int, default=5, help="交替运行的轮数, 减少噪声")
+    args = parser.parse_args()
+
+    apps = {"off": build(False), "on": build(True)}
+    clients = {name: app.test_client() for name, app in apps.items()}
+    for client in clients.values():
+        run(client, 1, 200)  # 预热连接池和编译缓存
+
+    per_round = max(args.requests // args.rounds, 1)
+    print(f"{'queries':>7} {'metrics':>7} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    for queries in args.queries:
+        timings = {name: [] for name in clients}
+        for _ in range(args.rounds):
+            for name, client in clients.items():
+                timings[name] += run(client, queries, per_round)
+        results = {name: summary(values) for name, values in timings.items()}
+        for name, (mean, p50, p99) in results.items():
+            print(f"{queries:>7} {name:>7} {mean:>9.1f} {p50:>9.1f} {p99:>9.1f}")
+        overhead = results["on"][0] - results["off"][0]
+        print(f"{queries:>7} {'delta':>7} {overhead:>9.1f} ({overhead / results['off'][0] * 100:+.1f}%)")
+
+    hooks, observe = micro(200000)
+    print(f"SQL hooks per statement: {hooks:.0f} ns, histogram observe: {observe:.0f} ns")
+
+    client = clients["on"]
+    started = time.perf_counter()
+    body = client.get("/metrics").get_data()
+    print(f"/metrics render: {(time.perf_counter() - started) * 1000:.1f} ms, {len(body)} bytes")
+
+
+if __name__ == "__main__":
+    main()
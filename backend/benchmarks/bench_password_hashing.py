@@ -0,0 +1,115 @@
+"""登录吞吐基准
+
+创建一个测试用户(用户名以 bench- 开头, 结束后删除), 用 concurrency 个线程
+并发调用 /api/v1/auth/login, 分别在请求线程内哈希(workers=0)和进程池哈希
+(workers=N)下统计每秒登录数、延迟分位数和被 429 拒绝的请求数。
+同时有一个线程持续请求不需要哈希的接口, 记录它的延迟, 用来观察登录高峰
+对其他请求的影响。需要 DATABASE_URL 指向已迁移的数据库。
+
+    python benchmarks/bench_password_hashing.py --logins 200 --concurrency 16 --workers 0 2 4
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.passwords import hasher  # noqa: E402
+
+USERNAME = "bench-login"
+PASSWORD = "bench-password"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+def run(app, logins: int, concurrency: int):
+    counter = iter(range(logins))
+    lock = threading.Lock()
+    latencies, statuses = [], {}
+    done = threading.Event()
+    probe = []
+
+    def login_worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            t0 = time.perf_counter()
+            response = client.post("/api/v1/auth/login", json={"username": USERNAME, "password": PASSWORD})
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    def probe_worker():
+        client = app.test_client()
+        while not done.is_set():
+            t0 = time.perf_counter()
+            client.get("/swagger.json")
+            probe.append(time.perf_counter() - t0)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_worker) for _ in range(concurrency)]
+    prober = threading.Thread(target=probe_worker)
+    prober.start()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+    ok = statuses.get(200, 0)
+    return {
+        "loginsPerSec": ok / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "statuses": statuses,
+        "probeP99": percentile(probe, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2])
+    parser.add_argument("--queue", type=int, default=64, help="PASSWORD_HASH_QUEUE")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.session.query(User).filter_by(username=USERNAME).delete()
+        db.session.add(User(username=USERNAME, email=f"{USERNAME}@example.com", user_type="patient",
+                            password_hash=hasher.hash(PASSWORD), profile={}))
+        db.session.commit()
+    try:
+        print(f"method {hasher.method}, cpus {os.cpu_count()}, concurrency {args.concurrency}, queue {args.queue}")
+        for workers in args.workers:
+            app.config.update(PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_QUEUE=args.queue)
+            hasher.init_app(app)
+            if workers:
+                # 预热进程池, 不把子进程启动时间算进结果
+                hasher.hash("warmup")
+            result = run(app, args.logins, args.concurrency)
+            print(f"workers={workers:<2} {result['loginsPerSec']:>8.1f} logins/s  "
+                  f"p50 {result['p50'] * 1000:>7.1f}ms  p99 {result['p99'] * 1000:>7.1f}ms  "
+                  f"other requests p99 {result['probeP99'] * 1000:>7.1f}ms  status {result['statuses']}")
+    finally:
+        with app.app_context():
+            db.session.query(User).filter_by(username=USERNAME).delete()
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""并发重复注册检查与注册吞吐基准
+
+用 concurrency 个线程同时注册同一个用户名(以及只有邮箱大小写不同的另一
+组请求), 检查恰好一个成功, 其余都返回原有的 400 提示; 然后注册 users 个
+不同用户, 统计每秒注册数和每次注册执行的 SQL 条数。测试用户以 bench-reg-
+开头, 结束后删除。需要 DATABASE_URL 指向已迁移的数据库。
+
+    python benchmarks/bench_register.py --concurrency 16 --users 100
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.passwords import hasher  # noqa: E402
+
+PREFIX = "bench-reg-"
+PROFILE = {"name": "bench", "age": 70, "gender": "female", "medicalHistory": "-", "emergencyContact": "-"}
+
+
+def payload(username: str, email: str):
+    return {"username": username, "password": "bench", "email": email, "userType": "patient", "profile": PROFILE}
+
+
+def race(app, concurrency: int, make_payload):
+    """concurrency 个线程在同一时刻发出注册请求, 返回 (状态码, 提示) 计数"""
+    barrier = threading.Barrier(concurrency)
+    results = Counter()
+    lock = threading.Lock()
+
+    def worker(index):
+        client = app.test_client()
+        barrier.wait()
+        response = client.post("/api/v1/auth/register", json=make_payload(index))
+        with lock:
+            results[response.status_code, (response.json or {}).get("message")] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    app = create_app()
+    # 只测数据库路径: 哈希在请求线程中做, 不受进程池排队上限影响
+    app.config.update(PASSWORD_HASH_WORKERS=0, PASSWORD_HASH_QUEUE=args.concurrency * 2,
+                      PASSWORD_HASH_METHOD="pbkdf2:sha256:1000")
+    hasher.init_app(app)
+    ok = True
+    try:
+        results = race(app, args.concurrency, lambda i: payload(f"{PREFIX}same", f"{PREFIX}same{i}@example.com"))
+        print(f"same username:            {dict(results)}")
+        ok &= results[200, None] == 1 and results[400, "Username already exists"] == args.concurrency - 1
+
+        results = race(app, args.concurrency, lambda i: payload(f"{PREFIX}mail{i}", f"{PREFIX}Same@Example.com".swapcase() if i % 2 else f"{PREFIX}Same@Example.com"))
+        print(f"same email, mixed case:   {dict(results)}")
+        ok &= results[200, None] == 1 and results[400, "Email already exists"] == args.concurrency - 1
+
+        statements = [0]
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", lambda *a: statements.__setitem__(0, statements[0] + 1))
+        client = app.test_client()
+        started = time.perf_counter()
+        for i in range(args.users):
+            client.post("/api/v1/auth/register", json=payload(f"{PREFIX}u{i}", f"{PREFIX}u{i}@example.com"))
+        elapsed = time.perf_counter() - started
+        print(f"sequential: {args.users / elapsed:.1f} registrations/s, {statements[0] / args.users:.1f} SQL statements each")
+    finally:
+        with app.app_context():
+            db.session.query(User).filter(User.username.like(f"{PREFIX}%")).delete(synchronize_session=False)
+            db.session.commit()
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""文本情绪打分吞吐基准
+
+用 app.emotion.text.score_batch 分别搭配逐个词典词做子串查找的朴素匹配器
+和 Aho-Corasick 自动机, 先确认两者对每条消息的打分完全相同, 再比较每秒
+处理消息数。比较时还加上 BOUNDARY_CASES 中容易误匹配英文子串的句子, 并检查
+它们的打分类型。朴素匹配的耗时随词典大小线性增长, 自动机只与文本长度有关;
+--lexicon-sizes 用随机生成的低频词把词典扩充到给定大小, 观察两者随词典
+规模的变化。
+
+    python benchmarks/bench_text_emotion.py --messages 20000 --lexicon-sizes 0,1000,5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.emotion import text as text_scorer  # noqa: E402
+from app.emotion.lexicon import EMOTION_TERMS  # noqa: E402
+
+FRAGMENTS = [
+    "今天天气不错", "我有点担心孙子的身体", "昨天晚上没睡好", "和老朋友聊天很开心",
+    "腿还是有点疼", "你说的那首歌我很喜欢", "一个人在家有些孤独", "吃过午饭了",
+    "医生说情况稳定, 我就放心了", "想起年轻时候的事情", "I am so happy to see you",
+    "the weather is nice today", "谢谢你一直陪我说话", "最近总是觉得很累",
+]
+
+# 英文词只能整词匹配: (句子, 期望的情绪类型)
+BOUNDARY_CASES = [
+    ("I feel hopeless", "negative"), ("crystal clear", "neutral"), ("I love painting", "positive"),
+    ("Mission accomplished", "neutral"), ("I also went out", "neutral"), ("I am not happy", "negative"),
+]
+
+
+class SubstringMatcher:
+    """朴素匹配器: 对每个词用 str.find 找出全部出现位置, 接口与 Automaton.iter 相同
+
+    交给同一套 _select 和打分逻辑, 否定词、程度词的处理和输出与自动机完全一致,
+    两者的差别只在匹配这一步。
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns.items())
+
+    def iter(self, text):
+        for word, value in self.patterns:
+            start = text.find(word)
+            while start >= 0:
+                yield start, start + len(word), value
+                start = text.find(word, start + 1)
+
+
+def make_terms(extra: int, seed: int = 1):
+    """在内置词典后追加 extra 个随机生僻字组成的词, 模拟完整规模的词典"""
+    rng = random.Random(seed)
+    terms = list(EMOTION_TERMS)
+    for _ in range(extra):
+        word = "".join(chr(rng.randint(0x4E00 + 0x3000, 0x9FA5)) for _ in range(rng.randint(2, 4)))
+        terms.append((word, rng.choice((-0.5, 0.5)), 0.5))
+    return terms
+
+
+def make_messages(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return ["，".join(rng.choices(FRAGMENTS, k=rng.randint(1, 4))) for _ in range(count)]
+
+
+def measure(fn, texts, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(texts)
+        best = min(best, time.perf_counter() - started)
+    return len(texts) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--lexicon-sizes", default="0,1000,5000", help="追加的随机词数量, 逗号分隔")
+    args = parser.parse_args()
+
+    texts = make_messages(args.messages)
+    avg_len = sum(len(t) for t in texts) / len(texts)
+    print(f"{len(texts)} messages, avg {avg_len:.1f} chars")
+    print(f"{'terms':>7} {'naive msg/s':>14} {'automaton msg/s':>16} {'speedup':>8}")
+    for extra in (int(n) for n in args.lexicon_sizes.split(",")):
+        terms = make_terms(extra)
+        automaton = text_scorer._compile(terms)
+        naive_matcher = text_scorer._compile(terms, matcher=SubstringMatcher)
+        checked = texts + [case for case, _ in BOUNDARY_CASES]
+        text_scorer._AUTOMATON = naive_matcher
+        expected = text_scorer.score_batch(checked)
+        naive = measure(text_scorer.score_batch, texts, args.repeat)
+        text_scorer._AUTOMATON = automaton
+        if text_scorer.score_batch(checked) != expected:
+            sys.exit("automaton and naive matcher disagree")
+        for (case, emotion_type), result in zip(BOUNDARY_CASES, expected[len(texts):]):
+            if result["type"] != emotion_type:
+                sys.exit(f"{case!r} scored {result['type']}, expected {emotion_type}")
+        fast = measure(text_scorer.score_batch, texts, args.repeat)
+        print(f"{len(terms):>7} {naive:>14,.0f} {fast:>16,.0f} {fast / naive:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
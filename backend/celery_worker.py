@@ -0,0 +1,7 @@
+# Celery worker 入口: celery -A celery_worker.celery worker
+from app import create_app
+from app.extensions import celery
+import app.tasks.emotion  # noqa: F401 注册任务
+import app.tasks.reports  # noqa: F401
+
+flask_app = create_app()
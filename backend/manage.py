@@ -1,9 +1,43 @@
+from datetime import datetime, timedelta
+
+import click
 from flask.cli import FlaskGroup
 from app import create_app
 from app.extensions import db
+from app.models.partitioning import ensure_monthly_partitions
+from app.reports import rollups
 
 app = create_app()
 cli = FlaskGroup(create_app=create_app)
 
+# 按月分区的表, 需要定期提前创建未来月份的分区
+PARTITIONED_TABLES = ["chat_messages", "physiological_data"]
+
+
+@cli.command("create-partitions")
+@click.option("--months", default=3, show_default=True, help="从当前月起创建的月份数")
+def create_partitions(months):
+    """为按月分区的表创建未来月份的分区"""
+    for table in PARTITIONED_TABLES:
+        for name in ensure_monthly_partitions(table, months=months):
+            click.echo(f"{table}: {name}")
+
+
+
+@cli.command("backfill-rollups")
+@click.option("--start", "start", type=click.DateTime(["%Y-%m-%d"]), required=True, help="开始日期(UTC, 包含)")
+@click.option("--end", "end", type=click.DateTime(["%Y-%m-%d"]), default=None, help="结束日期(UTC, 不包含), 默认明天")
+@click.option("--user-id", "user_ids", multiple=True, help="只重算这些用户, 可重复; 默认全部")
+def backfill_rollups(start, end, user_ids):
+    """从 emotion_results 重算情绪报表的小时/天预聚合, 可重复执行"""
+    end = end or rollups.day_start(datetime.utcnow()) + timedelta(days=1)
+    day = rollups.day_start(start)
+    while day < end:
+        # 按天重算, 每次只在内存中保留一天的桶
+        buckets = rollups.recompute(day, min(day + timedelta(days=1), end), list(user_ids) or None)
+        click.echo(f"{day:%Y-%m-%d}: {buckets} hourly buckets")
+        day += timedelta(days=1)
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,29 @@
+"""Users email lower index
+
+Revision ID: 2b8f4d6e9a13
+Revises: 9c3d6e1f2a45
+Create Date: 2026-10-18 13:19:31.119415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8f4d6e9a13'
+down_revision = '9c3d6e1f2a45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 已有仅大小写不同的重复邮箱时建索引会失败, 需先人工合并这些账号
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_email_lower', [sa.literal_column('lower(email)')], unique=True)
+
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_email_lower')
+
@@ -0,0 +1,71 @@
+"""Characters table and list indexes
+
+Revision ID: 3f1c9a7d52e4
+Revises: 6a203922d21d
+Create Date: 2025-07-24 10:12:40.118263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d52e4'
+down_revision = '6a203922d21d'
+branch_labels = None
+depends_on = None
+
+
+LIST_INDEXES = {
+    'ix_characters_created_at_id': ['created_at', 'id'],
+    'ix_characters_is_public_created_at_id': ['is_public', 'created_at', 'id'],
+    'ix_characters_mbti_type_created_at_id': ['mbti_type', 'created_at', 'id'],
+    'ix_characters_zodiac_sign_created_at_id': ['zodiac_sign', 'created_at', 'id'],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # characters 之前是通过 db.create_all() 建的, 已存在时只补 created_by 列
+    if not inspector.has_table('characters'):
+        op.create_table('characters',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('avatar', sa.String(length=255), nullable=True),
+        sa.Column('mbti_type', sa.String(length=4), nullable=True),
+        sa.Column('zodiac_sign', sa.String(length=50), nullable=True),
+        sa.Column('personality', sa.Text(), nullable=True),
+        sa.Column('speaking_style', sa.Text(), nullable=True),
+        sa.Column('emotional_triggers', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('talkativeness', sa.Integer(), nullable=True),
+        sa.Column('emotions', sa.JSON(), nullable=True),
+        sa.Column('opening_line', sa.Text(), nullable=True),
+        sa.Column('skill_ids', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('default_scene', sa.Text(), nullable=True),
+        sa.Column('default_script', sa.Text(), nullable=True),
+        sa.Column('is_public', sa.Boolean(), nullable=True),
+        sa.Column('created_by', sa.String(length=36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    elif 'created_by' not in {c['name'] for c in inspector.get_columns('characters')}:
+        with op.batch_alter_table('characters', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('created_by', sa.String(length=36), nullable=True))
+            batch_op.create_foreign_key('fk_characters_created_by_users', 'users', ['created_by'], ['id'])
+
+    with op.batch_alter_table('characters', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_characters_created_by'), ['created_by'], unique=False)
+        for name, columns in LIST_INDEXES.items():
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    # 表可能早于本迁移存在, 回滚时只撤销本迁移增加的索引和列
+    with op.batch_alter_table('characters', schema=None) as batch_op:
+        for name in LIST_INDEXES:
+            batch_op.drop_index(name)
+        batch_op.drop_index(batch_op.f('ix_characters_created_by'))
+        batch_op.drop_column('created_by')
@@ -0,0 +1,57 @@
+"""Add memories
+
+Revision ID: 5d2a7c9e4b18
+Revises: 2b8f4d6e9a13
+Create Date: 2026-10-18 13:23:46.255888
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a7c9e4b18'
+down_revision = '2b8f4d6e9a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('memories',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('character_id', sa.String(length=36), nullable=True),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('occurred_at', sa.DateTime(), nullable=False),
+    sa.Column('importance', sa.SmallInteger(), nullable=False),
+    sa.Column('memory_type', sa.String(length=20), nullable=False),
+    sa.Column('tags', sa.JSON(), nullable=True),
+    sa.Column('search_text', sa.Text(), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=True),
+    sa.Column('embedding_model', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['character_id'], ['characters.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('memories', schema=None) as batch_op:
+        batch_op.create_index('ix_memories_user_occurred', ['user_id', 'occurred_at'], unique=False)
+        batch_op.create_index('ix_memories_user_updated', ['user_id', 'updated_at'], unique=False)
+
+    # 全文检索的 GIN 索引只在 PostgreSQL 上创建, 其他数据库退化为 LIKE 查询
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_memories_search ON memories "
+            "USING gin (to_tsvector('simple', search_text))"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_memories_search")
+    with op.batch_alter_table('memories', schema=None) as batch_op:
+        batch_op.drop_index('ix_memories_user_updated')
+        batch_op.drop_index('ix_memories_user_occurred')
+
+    op.drop_table('memories')
@@ -0,0 +1,48 @@
+"""Emotion results table
+
+Revision ID: 5d7a2c9e4b18
+Revises: 8b2e4f6a1c03
+Create Date: 2026-10-18 12:55:37.459867
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7a2c9e4b18'
+down_revision = '8b2e4f6a1c03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('emotion_results',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('task_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('character_id', sa.String(length=36), nullable=True),
+    sa.Column('session_id', sa.String(length=64), nullable=True),
+    sa.Column('input_type', sa.String(length=10), nullable=False),
+    sa.Column('input_data', sa.Text(), nullable=True),
+    sa.Column('emotion_type', sa.String(length=20), nullable=False),
+    sa.Column('intensity', sa.Float(), nullable=False),
+    sa.Column('confidence', sa.Float(), nullable=False),
+    sa.Column('analysis', sa.JSON(), nullable=True),
+    sa.Column('processing_time', sa.Integer(), nullable=True),
+    sa.Column('model_version', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('task_id')
+    )
+    with op.batch_alter_table('emotion_results', schema=None) as batch_op:
+        batch_op.create_index('ix_emotion_results_user_created', ['user_id', 'created_at'], unique=False)
+
+
+
+def downgrade():
+    with op.batch_alter_table('emotion_results', schema=None) as batch_op:
+        batch_op.drop_index('ix_emotion_results_user_created')
+
+    op.drop_table('emotion_results')
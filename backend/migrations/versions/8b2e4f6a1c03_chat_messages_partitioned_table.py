@@ -0,0 +1,63 @@
+"""Chat messages partitioned table
+
+Revision ID: 8b2e4f6a1c03
+Revises: 3f1c9a7d52e4
+Create Date: 2025-07-28 16:40:05.532719
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4f6a1c03'
+down_revision = '3f1c9a7d52e4'
+branch_labels = None
+depends_on = None
+
+
+def _month(value, offset):
+    index = value.year * 12 + value.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    op.create_table('chat_messages',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('character_id', sa.String(length=36), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('sender', sa.String(length=20), nullable=False),
+    sa.Column('message_type', sa.String(length=20), nullable=False),
+    sa.Column('metadata', sa.JSON(), nullable=True),
+    sa.Column('parent_message_id', sa.String(length=36), nullable=True),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['character_id'], ['characters.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_messages_user_character_created', ['user_id', 'character_id', 'created_at'], unique=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # 默认分区兜底, 再建当前月和之后两个月的分区; 之后由 `create-partitions` 命令定期补建
+        op.execute('CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT')
+        today = date.today()
+        for i in range(3):
+            lower, upper = _month(today, i), _month(today, i + 1)
+            op.execute(
+                f"CREATE TABLE IF NOT EXISTS chat_messages_p{lower:%Y%m} PARTITION OF chat_messages "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+
+
+def downgrade():
+    # 删除父表会一并删除所有分区
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_messages_user_character_created')
+
+    op.drop_table('chat_messages')
@@ -0,0 +1,48 @@
+"""Report exports table
+
+Revision ID: 9c3d6e1f2a45
+Revises: e5a19b3c7d62
+Create Date: 2026-10-18 13:13:15.371405
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3d6e1f2a45'
+down_revision = 'e5a19b3c7d62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_exports',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('requested_by', sa.String(length=36), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('sections', sa.JSON(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('file_name', sa.String(length=255), nullable=True),
+    sa.Column('size', sa.BigInteger(), nullable=True),
+    sa.Column('row_count', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('report_exports', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_report_exports_user_id'), ['user_id'], unique=False)
+
+
+
+def downgrade():
+    with op.batch_alter_table('report_exports', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_report_exports_user_id'))
+
+    op.drop_table('report_exports')
@@ -0,0 +1,56 @@
+"""Physiological data partitioned table
+
+Revision ID: c41e8f2b7a90
+Revises: 5d7a2c9e4b18
+Create Date: 2026-10-18 13:02:48.190310
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e8f2b7a90'
+down_revision = '5d7a2c9e4b18'
+branch_labels = None
+depends_on = None
+
+
+def _month(value, offset):
+    index = value.year * 12 + value.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    op.create_table('physiological_data',
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('recorded_at', sa.DateTime(), nullable=False),
+    sa.Column('device_id', sa.String(length=100), nullable=False),
+    sa.Column('heart_rate', sa.SmallInteger(), nullable=True),
+    sa.Column('stress_level', sa.REAL(), nullable=True),
+    sa.Column('engagement', sa.REAL(), nullable=True),
+    sa.Column('arousal', sa.REAL(), nullable=True),
+    sa.Column('systolic', sa.SmallInteger(), nullable=True),
+    sa.Column('diastolic', sa.SmallInteger(), nullable=True),
+    sa.Column('temperature', sa.REAL(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id', 'recorded_at', 'device_id'),
+    postgresql_partition_by='RANGE (recorded_at)'
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # 与 chat_messages 相同: 默认分区兜底, 之后的月份由 `create-partitions` 命令补建
+        op.execute('CREATE TABLE physiological_data_default PARTITION OF physiological_data DEFAULT')
+        today = date.today()
+        for i in range(3):
+            lower, upper = _month(today, i), _month(today, i + 1)
+            op.execute(
+                f"CREATE TABLE IF NOT EXISTS physiological_data_p{lower:%Y%m} PARTITION OF physiological_data "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+
+
+def downgrade():
+    # 删除父表会一并删除所有分区
+    op.drop_table('physiological_data')
@@ -0,0 +1,52 @@
+"""Emotion rollups table
+
+Revision ID: e5a19b3c7d62
+Revises: c41e8f2b7a90
+Create Date: 2026-10-18 13:11:22.309944
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a19b3c7d62'
+down_revision = 'c41e8f2b7a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('emotion_rollups',
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('granularity', sa.String(length=5), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('positive_count', sa.Integer(), nullable=False),
+    sa.Column('negative_count', sa.Integer(), nullable=False),
+    sa.Column('neutral_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('positive_n', sa.Integer(), nullable=False),
+    sa.Column('positive_sum', sa.Float(), nullable=False),
+    sa.Column('positive_sumsq', sa.Float(), nullable=False),
+    sa.Column('negative_n', sa.Integer(), nullable=False),
+    sa.Column('negative_sum', sa.Float(), nullable=False),
+    sa.Column('negative_sumsq', sa.Float(), nullable=False),
+    sa.Column('neutral_n', sa.Integer(), nullable=False),
+    sa.Column('neutral_sum', sa.Float(), nullable=False),
+    sa.Column('neutral_sumsq', sa.Float(), nullable=False),
+    sa.Column('pleasure_n', sa.Integer(), nullable=False),
+    sa.Column('pleasure_sum', sa.Float(), nullable=False),
+    sa.Column('pleasure_sumsq', sa.Float(), nullable=False),
+    sa.Column('arousal_n', sa.Integer(), nullable=False),
+    sa.Column('arousal_sum', sa.Float(), nullable=False),
+    sa.Column('arousal_sumsq', sa.Float(), nullable=False),
+    sa.Column('dominance_n', sa.Integer(), nullable=False),
+    sa.Column('dominance_sum', sa.Float(), nullable=False),
+    sa.Column('dominance_sumsq', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'granularity', 'bucket_start')
+    )
+
+
+def downgrade():
+    op.drop_table('emotion_rollups')
@@ -0,0 +1,241 @@
+"""基于 asyncio 的多路复用语音客户端
+
+一个连接上可以同时有多个进行中的 task_id, 收到的帧按 task_id 分发到各自的
+TaskStream(异步迭代器); VoicePool 把任务分摊到 N 个连接上。帧格式和认证
+握手与 TCPClient.connect() 完全一致。
+
+同一连接上的任务互不阻塞: 一个任务消费得慢不会暂停整个连接的读取, 它积压
+超过 max_buffered 帧时只有它自己以 BufferError 失败。不再需要的任务调用
+TaskStream.close() 放弃, 之后到达的帧直接丢弃。
+
+    async with VoicePool(token, size=4) as pool:
+        stream = await pool.submit("你好")
+        async for frame in stream:
+            ...
+"""
+import asyncio
+import uuid
+from typing import Dict, List, Optional
+
+from frame_codec import Frame, FrameDecoder, encode_auth_frame, encode_frame
+
+HOST = "ai.depthsdata.com"
+PORT = 8009
+VOICE_ID = "Chinese (Mandarin)_Wise_Women"
+
+class TaskStream:
+    """单个任务的帧流, 收到 type-3 结束帧后迭代结束
+
+    积压的帧超过 max_buffered 时丢弃已缓存的帧, 迭代以 BufferError 结束;
+    连接上的其他任务不受影响。
+    """
+    def __init__(self, conn: "VoiceConnection", task_id: str, max_buffered: int = 4096):
+        self.conn = conn
+        self.task_id = task_id
+        self.max_buffered = max_buffered
+        self.frames_received = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._done = False
+
+    def _put(self, item):
+        if self._queue.qsize() >= self.max_buffered and not isinstance(item, BaseException):
+            self._fail(BufferError(f"任务 {self.task_id} 积压超过 {self.max_buffered} 帧, 已丢弃"))
+            return
+        self._queue.put_nowait(item)
+
+    def _fail(self, error: BaseException):
+        self.conn._forget(self)
+        self._queue = asyncio.Queue()
+        self._queue.put_nowait(error)
+
+    def close(self):
+        """放弃该任务: 清空已缓存的帧, 之后到达的帧直接丢弃"""
+        self.conn._forget(self)
+        self._queue = asyncio.Queue()
+        self._done = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Frame:
+        if self._done:
+            raise StopAsyncIteration
+        item = await self._queue.get()
+        if isinstance(item, BaseException):
+            self._done = True
+            raise item
+        if item is None:
+            self._done = True
+            raise StopAsyncIteration
+        self.frames_received += 1
+        if item.msg_type == 3:  # END_FRAME
+            self._done = True
+        return item
+
+    async def collect(self) -> List[Frame]:
+        """读完整个任务的所有帧"""
+        return [frame async for frame in self]
+
+class VoiceConnection(asyncio.BufferedProtocol):
+    """单个 TCP 连接: 认证、发送任务、按 task_id 分发帧"""
+    def __init__(self, token: str, voice_id: str = VOICE_ID, lang: str = "chinese",
+                 fmt: str = "pcm", max_buffered: int = 4096):
+        self.token = token
+        self.voice_id = voice_id
+        self.lang = lang
+        self.fmt = fmt
+        self.max_buffered = max_buffered
+        self.decoder = FrameDecoder()
+        self.transport: Optional[asyncio.Transport] = None
+        self.tasks: Dict[str, TaskStream] = {}
+        self.status_messages: List[str] = []
+        self.unknown_frames = 0
+        self.discarded_frames = 0
+        self._abandoned = set()
+        self._write_paused = False
+        self._drain_waiters: List[asyncio.Future] = []
+        self._closed: Optional[asyncio.Future] = None
+
+    @classmethod
+    async def open(cls, token: str, host: str = HOST, port: int = PORT, **kwargs) -> "VoiceConnection":
+        """连接服务器并发送认证帧"""
+        loop = asyncio.get_running_loop()
+        _, conn = await loop.create_connection(lambda: cls(token, **kwargs), host, port)
+        return conn
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.tasks)
+
+    # ---- asyncio.BufferedProtocol ----
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._closed = asyncio.get_running_loop().create_future()
+        transport.write(encode_auth_frame(self.token, self.voice_id, self.lang, self.fmt))
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        # 直接让事件循环 recv_into 解码器的缓冲区
+        return self.decoder.writable(max(sizehint, 1))
+
+    def buffer_updated(self, nbytes: int):
+        self.decoder.commit(nbytes)
+        for frame in self.decoder.frames():
+            self._dispatch(frame)
+
+    def connection_lost(self, exc):
+        error = exc or ConnectionError("连接已关闭")
+        for stream in self.tasks.values():
+            stream._put(error)
+        self.tasks.clear()
+        self._abandoned.clear()
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                waiter.set_exception(error)
+        self._drain_waiters.clear()
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+    def pause_writing(self):
+        self._write_paused = True
+
+    def resume_writing(self):
+        self._write_paused = False
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._drain_waiters.clear()
+
+    # ---- 分发 ----
+
+    def _dispatch(self, frame: Frame):
+        if frame.msg_type == 5 and frame.task_id == "00000000":
+            # 连接级状态消息
+            self.status_messages.append(bytes(frame.content).decode("utf-8", errors="ignore"))
+            return
+        stream = self.tasks.get(frame.task_id)
+        if stream is None:
+            if frame.task_id in self._abandoned:
+                self.discarded_frames += 1
+                if frame.msg_type == 3:
+                    self._abandoned.discard(frame.task_id)
+            else:
+                self.unknown_frames += 1
+            return
+        # content 指向解码器缓冲区, 放入队列前必须拷贝
+        stream._put(Frame(frame.msg_type, frame.task_id, frame.seq_num, bytes(frame.content)))
+        if frame.msg_type == 3:
+            # _put 可能因积压过多已经放弃了这个任务
+            self.tasks.pop(frame.task_id, None)
+            self._abandoned.discard(frame.task_id)
+
+    def _forget(self, stream: TaskStream):
+        """任务被放弃或失败: 服务端还会继续推送, 记下 task_id 以便丢弃到结束帧为止"""
+        if self.tasks.get(stream.task_id) is stream:
+            del self.tasks[stream.task_id]
+            self._abandoned.add(stream.task_id)
+
+    async def _drain(self):
+        if not self._write_paused:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+        await waiter
+
+    # ---- 对外接口 ----
+
+    async def submit(self, text: str, task_id: Optional[str] = None) -> TaskStream:
+        """发送一条文本任务, 返回该任务的帧流"""
+        if self.transport is None or self.transport.is_closing():
+            raise ConnectionError("连接未建立或已关闭")
+        task_id = task_id or uuid.uuid4().hex[:8]
+        stream = TaskStream(self, task_id, self.max_buffered)
+        self.tasks[task_id] = stream
+        # 发送文本消息和结束帧
+        self.transport.write(encode_frame(4, task_id, "0000", text))
+        self.transport.write(encode_frame(3, task_id, "0001", ""))
+        await self._drain()
+        return stream
+
+    async def close(self, disconnect: bool = True):
+        """关闭连接, 默认先发送主动断开消息"""
+        if self.transport is None or self.transport.is_closing():
+            return
+        if disconnect:
+            self.transport.write(encode_frame(5, "00000000", "0000", "##DISCONNECT"))
+        self.transport.close()
+        await self._closed
+
+class VoicePool:
+    """N 个连接组成的连接池, 新任务分配给进行中任务最少的连接"""
+    def __init__(self, token: str, size: int = 4, host: str = HOST, port: int = PORT, **kwargs):
+        self.token = token
+        self.size = size
+        self.host = host
+        self.port = port
+        self.kwargs = kwargs
+        self.connections: List[VoiceConnection] = []
+
+    async def start(self):
+        self.connections = list(await asyncio.gather(*[
+            VoiceConnection.open(self.token, self.host, self.port, **self.kwargs)
+            for _ in range(self.size)
+        ]))
+
+    async def close(self):
+        await asyncio.gather(*[conn.close() for conn in self.connections], return_exceptions=True)
+        self.connections = []
+
+    async def __aenter__(self) -> "VoicePool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def submit(self, text: str) -> TaskStream:
+        live = [c for c in self.connections if c.transport is not None and not c.transport.is_closing()]
+        if not live:
+            raise ConnectionError("连接池中没有可用连接")
+        conn = min(live, key=lambda c: c.in_flight)
+        return await conn.submit(text)
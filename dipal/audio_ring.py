@@ -0,0 +1,113 @@
+import numpy as np
+
+class AudioRingBuffer:
+    """固定容量的 int16 单生产者/单消费者环形缓冲区
+
+    生产者(网络接收线程)只修改写游标, 消费者(音频回调线程)只修改读游标,
+    游标单调递增, 取模得到数组下标; 两边都不加锁, 回调路径上不分配内存。
+
+    jitter_target: 开始播放(以及欠载后重新开始)前至少要缓冲的样本数。
+    生产者在一段语音结束时调用 finish(), 剩余的数据不再等待 jitter_target,
+    直接播完; 播完这段数据不计为欠载。
+    """
+    def __init__(self, capacity: int, jitter_target: int = 0):
+        if jitter_target > capacity:
+            raise ValueError("jitter_target 不能大于 capacity")
+        self.capacity = capacity
+        self.jitter_target = jitter_target
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self._write = 0     # 只由生产者修改
+        self._read = 0      # 只由消费者修改
+        self._flush_to = 0  # 生产者请求清空时的写游标, 由消费者应用
+        self._finish_at = 0  # 最近一次 finish() 时的写游标, 只由生产者修改
+        self._primed = False
+        self.overflow_samples = 0  # 因缓冲区满被丢弃的样本数
+        self.underruns = 0         # 回调时数据不足的次数
+
+    def __len__(self) -> int:
+        """当前缓冲的样本数"""
+        return self._write - max(self._read, self._flush_to)
+
+    def write(self, samples: np.ndarray) -> int:
+        """生产者: 写入样本, 返回实际写入数量, 空间不足的部分丢弃"""
+        n = min(len(samples), self.capacity - len(self))
+        if n < len(samples):
+            self.overflow_samples += len(samples) - n
+        if n <= 0:
+            return 0
+        pos = self._write % self.capacity
+        first = min(n, self.capacity - pos)
+        self._data[pos:pos + first] = samples[:first]
+        if first < n:
+            self._data[:n - first] = samples[first:n]
+        self._write += n
+        return n
+
+    def finish(self):
+        """生产者: 当前这段语音已经写完, 剩余数据不足 jitter_target 也要播放"""
+        self._finish_at = self._write
+
+    def reset(self):
+        """生产者: 新任务开始时调用, 丢弃上一段没有 finish() 的数据
+
+        已经 finish() 的语音是完整的回复, 不丢弃, 播完后接着播新任务。
+        """
+        if self._finish_at != self._write:
+            self._flush_to = self._write
+
+    def read_into(self, out: np.ndarray) -> int:
+        """消费者: 填满 out, 不足部分补静音, 返回有效样本数"""
+        if self._flush_to > self._read:
+            self._read = self._flush_to
+            self._primed = False
+        frames = len(out)
+        available = self._write - self._read
+        if not self._primed:
+            # 已结束的语音还有没播的部分时不等待 jitter_target
+            if available < max(self.jitter_target, 1) and self._finish_at <= self._read:
+                out.fill(0)
+                return 0
+            self._primed = True
+        n = min(frames, available)
+        if n < frames:
+            # 播完剩余数据后重新等待 jitter_target; 正好播到语音结尾不算欠载
+            if self._read + n != self._finish_at:
+                self.underruns += 1
+            self._primed = False
+        pos = self._read % self.capacity
+        first = min(n, self.capacity - pos)
+        out[:first] = self._data[pos:pos + first]
+        if first < n:
+            out[first:n] = self._data[:n - first]
+        if n < frames:
+            out[n:] = 0
+        self._read += n
+        return n
+
+class SilenceGate:
+    """跳过每个任务开头的静音
+
+    每个新数据块只扫描一次: 用向量化比较找到第一个超过阈值的样本,
+    找到之前的整块静音直接丢弃, 找到之后不再扫描。
+    """
+    def __init__(self, threshold: int = 150):
+        self.threshold = threshold
+        self.active = True
+        self.skipped = 0
+
+    def reset(self):
+        self.active = True
+        self.skipped = 0
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        if not self.active or len(chunk) == 0:
+            return chunk
+        # 不用 np.abs, 避免 -32768 取绝对值溢出
+        loud = (chunk > self.threshold) | (chunk < -self.threshold)
+        first = int(loud.argmax())
+        if not loud[first]:
+            self.skipped += len(chunk)
+            return chunk[:0]
+        self.skipped += first
+        self.active = False
+        return chunk[first:]
@@ -0,0 +1,155 @@
+"""接收到的 TTS 音频的流式落盘
+
+WavStreamSink 在第一个音频帧到达时创建 WAV 文件, 之后每帧直接追加,
+结束时回填 RIFF 头中的长度字段, 内存占用与语音时长无关。
+ThreadedSink 把写盘放到后台线程, 通过有界队列与接收线程解耦。
+EncodedSegmentSink 按固定时长切分并写成 FLAC/Opus 压缩片段(需要 soundfile)。
+"""
+import os
+import queue
+import threading
+import wave
+from typing import List, Optional, Union
+
+import numpy as np
+
+Chunk = Union[bytes, bytearray, memoryview]
+
+class WavStreamSink:
+    """边接收边写入的 WAV 文件"""
+    def __init__(self, path: str, sample_rate: int = 16000, channels: int = 1, sampwidth: int = 2,
+                 patch_interval: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sampwidth = sampwidth
+        # 每写入这么多秒的音频回填一次文件头, 连接中断时已写入部分仍可播放
+        self._patch_bytes = int(patch_interval * sample_rate * channels * sampwidth)
+        self._wav: Optional[wave.Wave_write] = None
+        self._unpatched = 0
+        self.bytes_written = 0
+
+    def write(self, chunk: Chunk):
+        if self._wav is None:
+            self._wav = wave.open(self.path, 'wb')
+            self._wav.setnchannels(self.channels)
+            self._wav.setsampwidth(self.sampwidth)
+            self._wav.setframerate(self.sample_rate)
+        # writeframesraw 不回填文件头, 只追加数据
+        self._wav.writeframesraw(chunk)
+        self.bytes_written += len(chunk)
+        self._unpatched += len(chunk)
+        if self._patch_bytes and self._unpatched >= self._patch_bytes:
+            self._wav.writeframes(b'')  # 只回填文件头
+            self._unpatched = 0
+
+    def close(self) -> Optional[str]:
+        """关闭文件并回填 RIFF 头, 返回文件路径(没有写入数据时返回 None)"""
+        if self._wav is None:
+            return None
+        self._wav.close()
+        self._wav = None
+        return self.path
+
+class EncodedSegmentSink:
+    """按 segment_seconds 切分写入 FLAC 或 Opus 片段
+
+    每个片段写完即关闭, 连接中断时最多丢失当前片段未刷盘的部分。
+    """
+    FORMATS = {
+        "flac": ("FLAC", "PCM_16", "flac"),
+        "opus": ("OGG", "OPUS", "ogg"),
+    }
+
+    def __init__(self, base_path: str, codec: str = "flac", sample_rate: int = 16000,
+                 channels: int = 1, segment_seconds: float = 30.0):
+        try:
+            import soundfile
+        except ImportError as e:
+            raise ImportError("压缩片段输出需要安装 soundfile: pip install soundfile") from e
+        if codec not in self.FORMATS:
+            raise ValueError(f"不支持的编码: {codec}")
+        self._sf = soundfile
+        self.base_path = base_path
+        self.format, self.subtype, self.ext = self.FORMATS[codec]
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.segment_frames = int(segment_seconds * sample_rate)
+        self.segments: List[str] = []
+        self._file = None
+        self._frames_in_segment = 0
+        self._pending = b''  # 不足一个完整样本的尾部字节
+
+    def _open_segment(self):
+        path = f"{self.base_path}_{len(self.segments):03d}.{self.ext}"
+        self._file = self._sf.SoundFile(path, mode='w', samplerate=self.sample_rate,
+                                        channels=self.channels, format=self.format,
+                                        subtype=self.subtype)
+        self.segments.append(path)
+        self._frames_in_segment = 0
+
+    def write(self, chunk: Chunk):
+        frame_bytes = 2 * self.channels
+        if self._pending:
+            chunk = self._pending + bytes(chunk)
+        usable = len(chunk) - len(chunk) % frame_bytes
+        self._pending = bytes(chunk[usable:])
+        samples = np.frombuffer(chunk, dtype=np.int16, count=usable // 2).reshape(-1, self.channels)
+        while len(samples):
+            if self._file is None:
+                self._open_segment()
+            n = min(len(samples), self.segment_frames - self._frames_in_segment)
+            self._file.write(samples[:n])
+            self._frames_in_segment += n
+            samples = samples[n:]
+            if self._frames_in_segment >= self.segment_frames:
+                self._file.close()
+                self._file = None
+
+    def close(self) -> Optional[str]:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self.segments[0] if self.segments else None
+
+class ThreadedSink:
+    """在后台线程中写盘, 队列满时阻塞生产者, 内存占用受 maxsize 限制"""
+    def __init__(self, sink, maxsize: int = 64):
+        self.sink = sink
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=maxsize)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            try:
+                self.sink.write(chunk)
+            except Exception as e:
+                self._error = e
+
+    def write(self, chunk: Chunk):
+        if self._error is not None:
+            raise self._error
+        # 帧内容可能指向接收缓冲区, 入队前必须拷贝
+        self._queue.put(bytes(chunk))
+
+    def close(self) -> Optional[str]:
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.sink.close()
+
+def open_audio_sink(audio_dir: str, task_id: str, codec: str = "wav", sample_rate: int = 16000,
+                    background: bool = True):
+    """为一个任务创建音频输出, codec 为 wav/flac/opus"""
+    base_path = os.path.join(audio_dir, task_id)
+    if codec == "wav":
+        sink = WavStreamSink(f"{base_path}.wav", sample_rate=sample_rate)
+    else:
+        sink = EncodedSegmentSink(base_path, codec=codec, sample_rate=sample_rate)
+    return ThreadedSink(sink) if background else sink
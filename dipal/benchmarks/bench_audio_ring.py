@@ -0,0 +1,102 @@
+"""音频回调延迟微基准
+
+模拟 TTS 以 tts-rate 倍实时的速度推送 200ms 的 PCM 块, 同时音频回调按
+实时速度(整体按 speedup 压缩)取 blocksize 个样本, 统计每次回调的耗时
+分位数。对比原 AudioPlayer 的 np.concatenate + 加锁切片实现与 AudioRingBuffer。
+
+    python benchmarks/bench_audio_ring.py --seconds 120 --blocksize 512
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_ring import AudioRingBuffer  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK = 3200
+
+
+class LegacyBuffer:
+    """原 AudioPlayer 的缓冲实现"""
+    def __init__(self):
+        self.audio_buffer = np.array([], dtype=np.int16)
+        self.lock = threading.Lock()
+
+    def write(self, audio_array):
+        with self.lock:
+            self.audio_buffer = np.concatenate([self.audio_buffer, audio_array])
+
+    def callback(self, outdata, frames):
+        with self.lock:
+            if len(self.audio_buffer) >= frames:
+                outdata[:] = self.audio_buffer[:frames].reshape(-1, 1)
+                self.audio_buffer = self.audio_buffer[frames:]
+            else:
+                outdata[:] = np.zeros((frames, 1), dtype=np.int16)
+
+
+class RingAdapter:
+    def __init__(self, seconds: float):
+        self.ring = AudioRingBuffer(int(SAMPLE_RATE * seconds) + CHUNK, jitter_target=CHUNK)
+
+    def write(self, audio_array):
+        self.ring.write(audio_array)
+
+    def callback(self, outdata, frames):
+        self.ring.read_into(outdata[:, 0])
+
+
+def run(name, buf, seconds: float, blocksize: int, speedup: float, tts_rate: float):
+    chunks = int(seconds * SAMPLE_RATE / CHUNK)
+    rng = np.random.default_rng(0)
+    pcm = rng.integers(-3000, 3000, size=CHUNK, dtype=np.int16)
+    done = threading.Event()
+
+    def producer():
+        interval = CHUNK / SAMPLE_RATE / speedup / tts_rate
+        for _ in range(chunks):
+            buf.write(pcm)
+            time.sleep(interval)
+        done.set()
+
+    outdata = np.zeros((blocksize, 1), dtype=np.int16)
+    latencies = []
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    callbacks = int(seconds * SAMPLE_RATE / blocksize)
+    for _ in range(callbacks):
+        t0 = time.perf_counter_ns()
+        buf.callback(outdata, blocksize)
+        latencies.append(time.perf_counter_ns() - t0)
+        # 回调间隔按实时的 1/speedup 压缩
+        time.sleep(blocksize / SAMPLE_RATE / speedup)
+    done.wait()
+
+    lat = np.array(latencies) / 1000.0
+    p50, p90, p99, p999 = np.percentile(lat, [50, 90, 99, 99.9])
+    print(f"{name:<8} calls={len(lat):<6} p50={p50:7.2f}us p90={p90:7.2f}us "
+          f"p99={p99:7.2f}us p99.9={p999:8.2f}us max={lat.max():9.2f}us")
+    return buf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60, help="模拟的音频时长(秒)")
+    parser.add_argument("--blocksize", type=int, default=512, help="每次回调请求的样本数")
+    parser.add_argument("--speedup", type=float, default=10, help="整体模拟相对实时的加速倍数")
+    parser.add_argument("--tts-rate", type=float, default=4, help="TTS 推送速度相对实时的倍数")
+    args = parser.parse_args()
+
+    run("legacy", LegacyBuffer(), args.seconds, args.blocksize, args.speedup, args.tts_rate)
+    ring = run("ring", RingAdapter(args.seconds), args.seconds, args.blocksize, args.speedup, args.tts_rate).ring
+    print(f"ring: overflow={ring.overflow_samples} underruns={ring.underruns}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""帧解码吞吐量基准
+
+回放一段录制的字节流(type-2 音频帧与 type-4 文本帧混合), 对比
+原 TCPClient 接收循环(1024 字节 recv + 每帧重新切片)与 FrameDecoder。
+
+    python benchmarks/bench_frame_codec.py                     # 生成合成流
+    python benchmarks/bench_frame_codec.py --record stream.bin # 保存合成流
+    python benchmarks/bench_frame_codec.py --stream stream.bin # 回放录制流
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_codec import END_MARK, START_MARK, FrameDecoder, encode_frame  # noqa: E402
+
+
+class ReplaySocket:
+    """按固定大小回放字节流, 模拟 socket 的 recv/recv_into"""
+    def __init__(self, data: bytes, chunk: int):
+        self._view = memoryview(data)
+        self._pos = 0
+        self._chunk = chunk
+
+    def recv(self, bufsize: int) -> bytes:
+        n = min(bufsize, self._chunk)
+        data = self._view[self._pos:self._pos + n].tobytes()
+        self._pos += len(data)
+        return data
+
+    def recv_into(self, buffer) -> int:
+        n = min(len(buffer), self._chunk, len(self._view) - self._pos)
+        buffer[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+def make_stream(seconds: float, text_ratio: float, seed: int = 0) -> bytes:
+    """生成 16kHz 单声道 PCM 音频帧(每帧 200ms)夹杂文本帧的字节流"""
+    rng = random.Random(seed)
+    task_id = "bench001"
+    out = bytearray()
+    seq = 0
+    for _ in range(int(seconds * 5)):
+        if rng.random() < text_ratio:
+            text = "今天天气真好，让我想起了小时候和爷爷一起放风筝的美好时光。" * rng.randint(1, 4)
+            out += encode_frame(4, task_id, str(seq % 10000), text)
+            seq += 1
+        pcm = rng.randbytes(3200 * 2)
+        while END_MARK in pcm or START_MARK in pcm:
+            pcm = rng.randbytes(3200 * 2)
+        out += encode_frame(2, task_id, str(seq % 10000), pcm)
+        seq += 1
+    out += encode_frame(3, task_id, str(seq % 10000), "")
+    return bytes(out)
+
+
+def legacy_decode(sock: ReplaySocket, total: int) -> int:
+    """原 TCPClient._receiver_thread 的解析逻辑"""
+    recv_buffer = bytearray()
+    received = frames = 0
+    while received < total:
+        data = sock.recv(1024)
+        received += len(data)
+        recv_buffer.extend(data)
+        while len(recv_buffer) >= len(START_MARK) + len(END_MARK) + 13:
+            try:
+                start_index = recv_buffer.index(START_MARK)
+            except ValueError:
+                break
+            if start_index > 0:
+                recv_buffer = recv_buffer[start_index:]
+            try:
+                end_index = recv_buffer.index(END_MARK, len(START_MARK))
+            except ValueError:
+                break
+            frame_data = recv_buffer[len(START_MARK):end_index]
+            if len(frame_data) >= 13:
+                frame_data[1:9].decode()
+                frame_data[9:13].decode()
+                frames += 1
+            recv_buffer = recv_buffer[end_index + len(END_MARK):]
+    return frames
+
+
+def codec_decode(sock: ReplaySocket, total: int) -> int:
+    decoder = FrameDecoder()
+    received = frames = 0
+    while received < total:
+        received += decoder.recv_into(sock)
+        for _ in decoder.frames():
+            frames += 1
+    return frames
+
+
+def run(name, fn, data: bytes, chunk: int, repeat: int):
+    best = float("inf")
+    frames = 0
+    for _ in range(repeat):
+        sock = ReplaySocket(data, chunk)
+        t0 = time.perf_counter()
+        frames = fn(sock, len(data))
+        best = min(best, time.perf_counter() - t0)
+    mb_s = len(data) / best / 1e6
+    print(f"{name:<10} chunk={chunk:<6} frames={frames:<6} {best * 1e3:8.2f} ms  {mb_s:8.1f} MB/s  {frames / best:10.0f} frames/s")
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stream", help="回放的录制字节流文件")
+    parser.add_argument("--record", help="把合成字节流保存到该文件")
+    parser.add_argument("--seconds", type=float, default=120, help="合成音频时长(秒)")
+    parser.add_argument("--text-ratio", type=float, default=0.2, help="文本帧占比")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.stream:
+        with open(args.stream, "rb") as f:
+            data = f.read()
+    else:
+        data = make_stream(args.seconds, args.text_ratio)
+        if args.record:
+            with open(args.record, "wb") as f:
+                f.write(data)
+    print(f"stream: {len(data) / 1e6:.1f} MB")
+
+    # legacy 固定 1024 字节读取; 新解码器按 socket 实际可读量(这里取 64KiB)读取
+    expected = run("legacy", legacy_decode, data, 1024, args.repeat)
+    for chunk in (1024, 64 * 1024):
+        got = run("codec", codec_decode, data, chunk, args.repeat)
+        assert got == expected, f"frame count mismatch: {got} != {expected}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""语音协议压测驱动
+
+模拟多个并发患者会话, 每个会话依次发送若干条文本任务, 统计:
+  - 首个音频帧延迟(time-to-first-audio)
+  - 音频帧到达间隔抖动
+  - 端到端延迟(发送到收到 type-3 结束帧)
+  - 吞吐量(bytes/sec)
+结果写入 JSON, 便于对比回归。默认在进程内启动 mock_voice_server。
+
+    python benchmarks/bench_voice_load.py --sessions 200 --connections 20 --out load.json
+    python benchmarks/bench_voice_load.py --host ai.depthsdata.com --port 8009 --token <TOKEN>
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_client import VoicePool  # noqa: E402
+from mock_voice_server import MockConfig, MockVoiceServer  # noqa: E402
+
+PROMPTS = [
+    "今天天气真好，让我想起了小时候和爷爷一起放风筝的美好时光",
+    "我年轻的时候在纺织厂工作过很多年",
+    "你还记得我们家门口那棵大槐树吗",
+    "最近睡得不太好，总是想起以前的事情",
+]
+
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return {f"p{p}": None for p in points}
+    ordered = sorted(values)
+    out = {}
+    for p in points:
+        k = (len(ordered) - 1) * p / 100
+        lo = int(k)
+        hi = min(lo + 1, len(ordered) - 1)
+        out[f"p{p}"] = ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+    out["mean"] = statistics.fmean(ordered)
+    out["max"] = ordered[-1]
+    return out
+
+
+async def run_task(pool: VoicePool, text: str, stats: dict):
+    """发送一条任务并记录各项时间(毫秒), 时间戳取自消费端"""
+    t0 = time.perf_counter()
+    stream = await pool.submit(text)
+    first_audio = None
+    last_audio = None
+    gaps = []
+    async for frame in stream:
+        now = time.perf_counter()
+        stats["bytes"] += len(frame.content)
+        if frame.msg_type == 2:
+            if first_audio is None:
+                first_audio = now
+            else:
+                gaps.append((now - last_audio) * 1000)
+            last_audio = now
+    end = time.perf_counter()
+    stats["tasks"] += 1
+    stats["e2e_ms"].append((end - t0) * 1000)
+    if first_audio is not None:
+        stats["ttfa_ms"].append((first_audio - t0) * 1000)
+    if len(gaps) > 1:
+        stats["jitter_ms"].append(statistics.pstdev(gaps))
+    stats["gap_ms"].extend(gaps)
+
+
+async def run_session(pool: VoicePool, turns: int, think_ms: float, stats: dict, rng: random.Random):
+    for _ in range(turns):
+        try:
+            await run_task(pool, rng.choice(PROMPTS), stats)
+        except ConnectionError:
+            stats["errors"] += 1
+        if think_ms:
+            await asyncio.sleep(rng.uniform(0, think_ms) / 1000)
+
+
+async def run(args) -> dict:
+    server = None
+    host, port = args.host, args.port
+    if host is None:
+        server = MockVoiceServer(MockConfig(args.first_audio_ms, args.audio_seconds, args.frame_ms, args.realtime))
+        host, port = "127.0.0.1", await server.start()
+
+    stats = {"tasks": 0, "errors": 0, "bytes": 0, "ttfa_ms": [], "e2e_ms": [], "jitter_ms": [], "gap_ms": []}
+    rng = random.Random(args.seed)
+    connections = args.connections or args.sessions
+    t0 = time.perf_counter()
+    async with VoicePool(args.token, size=connections, host=host, port=port) as pool:
+        connected = time.perf_counter()
+        await asyncio.gather(*[
+            run_session(pool, args.turns, args.think_ms, stats, random.Random(rng.random()))
+            for _ in range(args.sessions)
+        ])
+        elapsed = time.perf_counter() - connected
+    if server is not None:
+        await server.close()
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("token", "out")},
+        "platform": {"python": platform.python_version(), "machine": platform.machine()},
+        "connect_s": connected - t0,
+        "elapsed_s": elapsed,
+        "tasks": stats["tasks"],
+        "errors": stats["errors"],
+        "bytes_per_sec": stats["bytes"] / elapsed if elapsed else 0,
+        "tasks_per_sec": stats["tasks"] / elapsed if elapsed else 0,
+        "time_to_first_audio_ms": percentiles(stats["ttfa_ms"]),
+        "end_to_end_ms": percentiles(stats["e2e_ms"]),
+        "inter_frame_gap_ms": percentiles(stats["gap_ms"]),
+        "per_task_jitter_ms": percentiles(stats["jitter_ms"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", help="目标服务地址, 不填则启动本地 mock 服务")
+    parser.add_argument("--port", type=int, default=8009)
+    parser.add_argument("--token", default="bench-token")
+    parser.add_argument("--sessions", type=int, default=50, help="并发会话(模拟患者)数")
+    parser.add_argument("--connections", type=int, default=0, help="TCP 连接数, 默认每个会话一个")
+    parser.add_argument("--turns", type=int, default=3, help="每个会话发送的任务数")
+    parser.add_argument("--think-ms", type=float, default=200, help="两次任务之间的最大随机间隔")
+    parser.add_argument("--first-audio-ms", type=float, default=150.0, help="mock: 首帧合成延迟")
+    parser.add_argument("--audio-seconds", type=float, default=2.0, help="mock: 每个回复的音频时长")
+    parser.add_argument("--frame-ms", type=int, default=200, help="mock: 每个音频帧时长")
+    parser.add_argument("--realtime", type=float, default=1.0, help="mock: 推送速度倍数, 0 为不限速")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="结果 JSON 文件")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
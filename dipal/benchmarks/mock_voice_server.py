@@ -0,0 +1,129 @@
+"""本地语音服务替身
+
+与线上服务使用相同的 ##START/##END 帧格式: 收到 type-1 认证帧后回复
+type-5 状态; 每个任务收到 type-4 文本和 type-3 结束帧后, 先回一个 type-4
+文本帧, 再按实时速度推送 type-2 PCM 音频帧, 最后发送 type-3 结束帧。
+
+    python benchmarks/mock_voice_server.py --port 8009 --audio-seconds 3
+"""
+import argparse
+import asyncio
+import os
+import sys
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_codec import FrameDecoder, encode_frame  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+@dataclass
+class MockConfig:
+    first_audio_ms: float = 150.0  # 收到任务到第一个音频帧的模拟合成延迟
+    audio_seconds: float = 2.0     # 每个回复的音频时长
+    frame_ms: int = 200            # 每个音频帧的时长
+    realtime: float = 1.0          # 推送速度相对实时的倍数, 0 表示不限速
+
+
+class MockVoiceServer:
+    def __init__(self, config: MockConfig = None):
+        self.config = config or MockConfig()
+        self.connections = 0
+        self.tasks = 0
+        self._server = None
+        frame_samples = SAMPLE_RATE * self.config.frame_ms // 1000
+        # 低幅度正弦波, 不会被客户端当作静音跳过
+        t = [int(3000 * ((i % 80) - 40) / 40) for i in range(frame_samples)]
+        self._pcm = b''.join(v.to_bytes(2, 'little', signed=True) for v in t)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        decoder = FrameDecoder()
+        authed = False
+        pending = {}
+        replies = set()
+        try:
+            while True:
+                data = await reader.read(64 * 1024)
+                if not data:
+                    break
+                decoder.feed(data)
+                for frame in decoder.frames():
+                    content = bytes(frame.content)
+                    if frame.msg_type == 1:
+                        authed = b"##voiceid:" in content
+                        status = "AUTH_OK" if authed else "AUTH_FAILED"
+                        writer.write(encode_frame(5, "00000000", "0000", status))
+                    elif not authed:
+                        continue
+                    elif frame.msg_type == 5 and content == b"##DISCONNECT":
+                        writer.close()
+                        return
+                    elif frame.msg_type == 4:
+                        pending[frame.task_id] = content.decode("utf-8", errors="ignore")
+                    elif frame.msg_type == 3 and frame.task_id in pending:
+                        text = pending.pop(frame.task_id)
+                        task = asyncio.ensure_future(self._reply(writer, frame.task_id, text))
+                        replies.add(task)
+                        task.add_done_callback(replies.discard)
+        except ConnectionError:
+            pass
+        finally:
+            for task in replies:
+                task.cancel()
+            writer.close()
+
+    async def _reply(self, writer: asyncio.StreamWriter, task_id: str, text: str):
+        cfg = self.config
+        self.tasks += 1
+        await asyncio.sleep(cfg.first_audio_ms / 1000)
+        writer.write(encode_frame(4, task_id, "0000", f"收到: {text}"))
+        frames = max(1, int(cfg.audio_seconds * 1000 / cfg.frame_ms))
+        interval = cfg.frame_ms / 1000 / cfg.realtime if cfg.realtime else 0
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        for seq in range(frames):
+            writer.write(encode_frame(2, task_id, str((seq + 1) % 10000), self._pcm))
+            await writer.drain()
+            # 按绝对时间对齐, 避免 sleep 误差累积
+            delay = t0 + (seq + 1) * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        writer.write(encode_frame(3, task_id, str((frames + 1) % 10000), ""))
+        await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8009)
+    parser.add_argument("--first-audio-ms", type=float, default=150.0)
+    parser.add_argument("--audio-seconds", type=float, default=2.0)
+    parser.add_argument("--frame-ms", type=int, default=200)
+    parser.add_argument("--realtime", type=float, default=1.0)
+    args = parser.parse_args()
+
+    async def serve():
+        server = MockVoiceServer(MockConfig(args.first_audio_ms, args.audio_seconds, args.frame_ms, args.realtime))
+        port = await server.start(args.host, args.port)
+        print(f"mock voice server listening on {args.host}:{port}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
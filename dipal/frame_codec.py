@@ -0,0 +1,171 @@
+import socket
+from dataclasses import dataclass
+from typing import Iterator, Optional, Union
+
+START_MARK = b'##START'
+END_MARK = b'##END'
+
+# 帧头: 1字节消息类型 + 8字节task_id + 4字节seq_num
+HEADER_LEN = 13
+MIN_FRAME_LEN = len(START_MARK) + HEADER_LEN + len(END_MARK)
+VALID_MSG_TYPES = range(1, 6)
+
+@dataclass
+class Frame:
+    """消息帧数据类
+
+    由 FrameDecoder 解出的帧, content 是指向接收缓冲区的 memoryview,
+    只在下一次 feed()/recv_into() 之前有效; 需要长期保存时请先 bytes() 拷贝。
+    """
+    msg_type: int
+    task_id: str
+    seq_num: str
+    content: Union[str, bytes, memoryview]
+
+def encode_frame(msg_type: int, task_id: str, seq_num: str, content: Union[str, bytes]) -> bytes:
+    """创建消息帧"""
+    frame = bytearray()
+    frame.extend(START_MARK)
+    # 添加消息类型 (1-5)
+    frame.extend(bytes([msg_type]))
+    # 添加其他内容
+    frame.extend(task_id.encode().ljust(8))
+    frame.extend(seq_num.zfill(4).encode())
+    if content:
+        frame.extend(content if isinstance(content, bytes) else content.encode())
+    # 添加帧结束标记
+    frame.extend(END_MARK)
+    return bytes(frame)
+
+def encode_auth_frame(token: str, voice_id: str, lang: str = "chinese", fmt: str = "pcm") -> bytes:
+    """创建认证帧: token##voiceid:<id>##lang:<lang>##format:<fmt>"""
+    auth_content = f"{token}##voiceid:{voice_id}##lang:{lang}##format:{fmt}"
+    return encode_frame(1, "00000000", "0000", auth_content)
+
+class FrameDecoder:
+    """增量式 ##START/##END 帧解码器
+
+    数据直接 recv_into 预分配的 bytearray, 用读/写游标代替每帧重新切片,
+    只在尾部空间不足时把未消费的残余数据搬到缓冲区开头(压缩),
+    帧内容以 memoryview 返回, 不产生拷贝。
+    """
+    def __init__(self, capacity: int = 64 * 1024):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0  # 读游标: 第一个未消费的字节
+        self._end = 0    # 写游标: 最后一个有效字节之后
+        self._scan = 0   # 下一次查找结束标记的起点, 避免重复扫描未完成的帧
+        self.frames_decoded = 0
+        self.bytes_discarded = 0
+        self.invalid_frames = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def __len__(self) -> int:
+        """缓冲区中尚未消费的字节数"""
+        return self._end - self._start
+
+    def writable(self, min_free: int = 1) -> memoryview:
+        """返回可写入的尾部空间, 必要时先压缩或扩容"""
+        if self._start == self._end:
+            # 全部消费完, 直接复位游标, 无需搬移
+            self._start = self._end = self._scan = 0
+        if len(self._buf) - self._end < min_free:
+            self._compact(min_free)
+        return self._view[self._end:]
+
+    def commit(self, n: int):
+        """确认写入了 n 个字节"""
+        self._end += n
+
+    def feed(self, data: Union[bytes, bytearray, memoryview]):
+        """拷贝一段已读取的数据到缓冲区"""
+        n = len(data)
+        self.writable(n)[:n] = data
+        self.commit(n)
+
+    def recv_into(self, sock: socket.socket) -> int:
+        """从 socket 直接读入缓冲区, 返回读到的字节数(0 表示连接关闭)"""
+        n = sock.recv_into(self.writable())
+        self.commit(n)
+        return n
+
+    def frames(self) -> Iterator[Frame]:
+        """依次解出缓冲区中所有完整的帧"""
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def _next_frame(self) -> Optional[Frame]:
+        buf = self._buf
+        while self._end - self._start >= MIN_FRAME_LEN:
+            # 查找起始标记
+            start_index = buf.find(START_MARK, self._start, self._end)
+            if start_index < 0:
+                # 没找到起始标记, 只保留可能是半个标记的尾部
+                keep = self._end - len(START_MARK) + 1
+                if keep > self._start:
+                    self._discard(keep)
+                return None
+
+            # 如果起始标记前有数据，丢弃
+            if start_index > self._start:
+                print(f"丢弃起始标记前的数据: {start_index - self._start} 字节")
+                self._discard(start_index)
+
+            # 在起始标记之后查找结束标记
+            body_start = self._start + len(START_MARK)
+            end_index = buf.find(END_MARK, max(body_start, self._scan), self._end)
+            if end_index < 0:
+                # 没找到结束标记, 记住已扫描的位置等待更多数据
+                self._scan = max(body_start, self._end - len(END_MARK) + 1)
+                return None
+
+            self._start = self._scan = end_index + len(END_MARK)
+
+            # 验证帧格式
+            frame_len = end_index - body_start
+            msg_type = buf[body_start] if frame_len else None
+            if frame_len < HEADER_LEN or msg_type not in VALID_MSG_TYPES:
+                print(f"无效帧格式或长度不足: 长度={frame_len}, 帧头={hex(msg_type) if msg_type is not None else 'None'}")
+                self.invalid_frames += 1
+                continue
+
+            try:
+                task_id = buf[body_start + 1:body_start + 9].decode()
+                seq_num = buf[body_start + 9:body_start + HEADER_LEN].decode()
+            except UnicodeDecodeError as e:
+                print(f"解析帧错误: {e}")
+                self.invalid_frames += 1
+                continue
+
+            self.frames_decoded += 1
+            return Frame(msg_type, task_id, seq_num, self._view[body_start + HEADER_LEN:end_index])
+        return None
+
+    def _discard(self, index: int):
+        self.bytes_discarded += index - self._start
+        self._start = index
+        self._scan = max(self._scan, index)
+
+    def _compact(self, min_free: int):
+        """把未消费数据搬到缓冲区开头, 空间仍不足时扩容"""
+        pending = self._end - self._start
+        scan = self._scan - self._start
+        if pending + min_free > len(self._buf):
+            # 扩容: 已导出的 memoryview 仍引用旧缓冲区, 不能原地 resize
+            new_buf = bytearray(max(len(self._buf) * 2, pending + min_free))
+            new_buf[:pending] = self._view[self._start:self._end]
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
+        elif pending:
+            src = self._view[self._start:self._end]
+            # 源和目标重叠时先拷贝出来, 残余数据通常只是半个帧
+            self._view[:pending] = src if self._start >= pending else src.tobytes()
+        self._start = 0
+        self._end = pending
+        self._scan = max(scan, 0)
@@ -0,0 +1,20 @@
+"""流式韵律特征提取(客户端入口)
+
+实现只有一份, 在 backend/app/emotion/prosody.py, 只依赖 NumPy。这里按文件路径
+直接加载那个模块并导出客户端用到的名字: 不经过 backend/app 包, 不会导入 Flask 等
+后端依赖, 也不改动 sys.path。
+"""
+import importlib.util
+import os
+import sys
+
+_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     "backend", "app", "emotion", "prosody.py")
+_spec = importlib.util.spec_from_file_location("_ris_prosody", _PATH)
+_module = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = _module
+_spec.loader.exec_module(_module)
+
+ProsodyTracker = _module.ProsodyTracker
+arousal_from_features = _module.arousal_from_features
+SILENCE_DBFS = _module.SILENCE_DBFS